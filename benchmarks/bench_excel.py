@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Excel export benchmark: pandas ``to_excel`` versus the streaming writer.
+
+Each variant runs in a fresh process so peak RSS is measured in isolation::
+
+    python benchmarks/bench_excel.py --rows 100000 1000000 --out excel.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+FIELDS = ["sku", "title", "price", "currency", "in_stock", "url"]
+
+
+def synthetic_rows(count: int) -> Iterator[Dict[str, Any]]:
+    for index in range(count):
+        yield {
+            "sku": f"SKU-{index:08d}",
+            "title": f"Product {index % 5000} with a reasonably long marketing title",
+            "price": f"{(index % 997) * 1.37:.2f}",
+            "currency": "EUR",
+            "in_stock": "yes" if index % 3 else "no",
+            "url": f"https://shop.example/p/{index}",
+        }
+
+
+def _run_variant(variant: str, rows: int, directory: str, queue: "multiprocessing.Queue[Any]") -> None:
+    output = Path(directory) / f"{variant}-{rows}.xlsx"
+    started = time.perf_counter()
+    if variant == "pandas":
+        import pandas as pd
+
+        pd.DataFrame(list(synthetic_rows(rows))).to_excel(output, index=False)
+    else:
+        from deepscraper.exporters.excel_exporter import ExcelWriter
+        from deepscraper.exporters.streaming import write_rows
+
+        write_rows(ExcelWriter(output, FIELDS), synthetic_rows(rows))
+    elapsed = time.perf_counter() - started
+    queue.put(
+        {
+            "variant": variant,
+            "rows": rows,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "file_mb": round(output.stat().st_size / 1024 / 1024, 2),
+        }
+    )
+
+
+def run(rows: List[int], variants: List[str]) -> List[Dict[str, Any]]:
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for count in rows:
+            for variant in variants:
+                queue = context.Queue()
+                process = context.Process(target=_run_variant, args=(variant, count, directory, queue))
+                process.start()
+                result = queue.get()
+                process.join()
+                print(json.dumps(result), flush=True)
+                results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--variants", nargs="+", default=["pandas", "streaming"], choices=["pandas", "streaming"])
+    parser.add_argument("--out", type=Path, default=None, help="Write results as JSON")
+    args = parser.parse_args()
+    results = run(args.rows, args.variants)
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Local fixture website for benchmarks.
+
+Serves deterministic pages that resemble the sites deepscraper is pointed at:
+
+* ``/catalog/{page}?size=N`` – a large product grid with pagination links
+* ``/scroll`` – an infinite-scroll page that loads items over XHR
+* ``/api/items?page=N&size=M`` – the JSON endpoint behind ``/scroll``
+* ``/slow?delay=MS`` – a page whose script and image take ``MS`` to load
+* ``/captcha`` – a reCAPTCHA v2 stub for the detector
+
+Run standalone with ``python benchmarks/fixtures.py --port 8080``; with
+``--port 0`` the chosen port is printed on the first line of stdout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+API_PAGES = 50
+FILLER = "<p class=\"copy\">" + "Free delivery on orders over 50 EUR. Returns within 30 days. " * 8 + "</p>"
+
+
+def product(index: int) -> Dict[str, Any]:
+    return {
+        "sku": f"SKU-{index:08d}",
+        "title": f"Product {index} with a reasonably long marketing title",
+        "price": round((index % 997) * 1.37 + 0.99, 2),
+        "currency": "EUR",
+        "in_stock": index % 3 != 0,
+        "url": f"/product/{index}",
+    }
+
+
+def _product_html(item: Dict[str, Any]) -> str:
+    return (
+        f'<div class="product" data-sku="{item["sku"]}">'
+        f'<img src="/static/{item["sku"]}.jpg" alt="" loading="lazy">'
+        f'<a class="title" href="{item["url"]}">{item["title"]}</a>'
+        f'<span class="price">{item["price"]:.2f} {item["currency"]}</span>'
+        f'<span class="sku">{item["sku"]}</span>'
+        f'<span class="stock">{"in stock" if item["in_stock"] else "sold out"}</span>'
+        f"{FILLER}</div>"
+    )
+
+
+def _page(title: str, body: str, head: str = "") -> str:
+    nav = "".join(f'<li><a href="/category/{n}">Category {n}</a></li>' for n in range(40))
+    return (
+        f"<!doctype html><html><head><meta charset=\"utf-8\"><title>{title}</title>{head}</head>"
+        f"<body><nav><ul>{nav}</ul></nav><main>{body}</main><footer>{FILLER}</footer></body></html>"
+    )
+
+
+async def catalog(request: web.Request) -> web.Response:
+    page = int(request.match_info["page"])
+    size = int(request.query.get("size", "200"))
+    items = "".join(_product_html(product(page * size + n)) for n in range(size))
+    pager = f'<a class="next" href="/catalog/{page + 1}?size={size}">Next</a>'
+    html = _page(f"Catalog page {page}", f'<div class="grid">{items}</div>{pager}')
+    etag = '"' + hashlib.blake2b(html.encode(), digest_size=8).hexdigest() + '"'
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers={"ETag": etag})
+    return web.Response(text=html, content_type="text/html", headers={"ETag": etag})
+
+
+async def api_items(request: web.Request) -> web.Response:
+    page = int(request.query.get("page", "1"))
+    size = int(request.query.get("size", "50"))
+    items: List[Dict[str, Any]] = [] if page > API_PAGES else [product((page - 1) * size + n) for n in range(size)]
+    return web.json_response({"data": {"items": items, "page": page}, "next": page + 1 if items else None})
+
+
+SCROLL_SCRIPT = """
+<script>
+let page = 1;
+async function load() {
+  const response = await fetch(`/api/items?page=${page}&size=50`);
+  const payload = await response.json();
+  const grid = document.querySelector('.grid');
+  for (const item of payload.data.items) {
+    const el = document.createElement('div');
+    el.className = 'product';
+    el.innerHTML = `<a class="title" href="${item.url}">${item.title}</a><span class="price">${item.price}</span>`;
+    grid.appendChild(el);
+  }
+  page += 1;
+}
+window.addEventListener('scroll', () => {
+  if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 200) load();
+});
+load();
+</script>
+"""
+
+
+async def scroll(request: web.Request) -> web.Response:
+    return web.Response(text=_page("Infinite scroll", '<div class="grid"></div>' + SCROLL_SCRIPT), content_type="text/html")
+
+
+async def slow(request: web.Request) -> web.Response:
+    delay = int(request.query.get("delay", "500"))
+    head = f'<script src="/asset/slow.js?delay={delay}"></script>'
+    body = f'<img src="/asset/slow.png?delay={delay}"><div class="grid">{_product_html(product(1))}</div>'
+    return web.Response(text=_page("Slow resources", body, head), content_type="text/html")
+
+
+async def slow_asset(request: web.Request) -> web.Response:
+    await asyncio.sleep(int(request.query.get("delay", "500")) / 1000.0)
+    if request.match_info["name"].endswith(".js"):
+        return web.Response(text="window.slowLoaded = true;", content_type="application/javascript")
+    return web.Response(body=b"\x89PNG\r\n\x1a\n", content_type="image/png")
+
+
+async def captcha(request: web.Request) -> web.Response:
+    body = (
+        '<form method="post"><div class="g-recaptcha" data-sitekey="bench-site-key"></div>'
+        '<textarea id="g-recaptcha-response" name="g-recaptcha-response" style="display:none"></textarea>'
+        '<button type="submit">Continue</button></form>'
+    )
+    head = '<script src="https://www.google.com/recaptcha/api.js" async defer></script>'
+    return web.Response(text=_page("Verify you are human", body, head), content_type="text/html")
+
+
+def build_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/catalog/{page}", catalog)
+    app.router.add_get("/api/items", api_items)
+    app.router.add_get("/scroll", scroll)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/asset/{name}", slow_asset)
+    app.router.add_get("/captcha", captcha)
+    return app
+
+
+class FixtureServer:
+    """Runs the fixture site on ``127.0.0.1`` inside the current event loop."""
+
+    def __init__(self, port: int = 0) -> None:
+        self._port = port
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    async def __aenter__(self) -> "FixtureServer":
+        self._runner = web.AppRunner(build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self._port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+async def _serve(port: int) -> None:
+    async with FixtureServer(port) as server:
+        print(json.dumps({"base_url": server.base_url}), flush=True)
+        await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
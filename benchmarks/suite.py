@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""Benchmark suite against the local fixture website.
+
+Each scenario runs in a fresh process so CPU time and peak RSS are its own;
+the fixture server runs in a separate process as well. Results are written
+as JSON keyed by the current commit so runs can be compared::
+
+    python benchmarks/suite.py --out benchmarks/results/$(git rev-parse --short HEAD).json
+    python benchmarks/suite.py --scenarios http extract_dom --compare benchmarks/results/abc1234.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+# (operations, per-operation latencies in seconds, extra fields)
+Outcome = Tuple[int, List[float], Dict[str, Any]]
+
+CATALOG_FIELDS = [
+    {"name": "title", "selector": ".product .title"},
+    {"name": "price", "selector": ".product .price"},
+    {"name": "sku", "selector": ".product .sku"},
+    {"name": "url", "selector": ".product .title", "attr": "href"},
+]
+# Delay of the scripts and images on the fixture's /slow page.
+SLOW_ASSET_MS = 1000
+JSON_FIELDS = [
+    {"name": "sku", "json_path": "$.data.items[*].sku"},
+    {"name": "title", "json_path": "$.data.items[*].title"},
+    {"name": "price", "json_path": "$.data.items[*].price"},
+]
+
+
+class Meter:
+    """Wall and CPU time between :meth:`start` and :meth:`stop`, so setup is not measured."""
+
+    def start(self) -> None:
+        self._wall = time.perf_counter()
+        self._usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    def stop(self) -> None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = (usage.ru_utime - self._usage.ru_utime) + (usage.ru_stime - self._usage.ru_stime)
+
+
+Scenario = Callable[[str, argparse.Namespace, Meter], Awaitable[Outcome]]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+async def _timed_gather(count: int, concurrency: int, op: Callable[[int], Awaitable[Any]]) -> List[float]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def _one(index: int) -> None:
+        async with slots:
+            started = time.perf_counter()
+            await op(index)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(_one(index) for index in range(count)))
+    return latencies
+
+
+async def scenario_http(base_url: str, args: argparse.Namespace, meter: Meter) -> Outcome:
+    """Catalog HTML over a pooled HTTP client."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+
+        async def _fetch(index: int) -> None:
+            (await client.get(f"/catalog/{index}", params={"size": args.page_size})).raise_for_status()
+
+        meter.start()
+        latencies = await _timed_gather(args.pages, args.concurrency, _fetch)
+        meter.stop()
+    return args.pages, latencies, {}
+
+
+async def scenario_replay(base_url: str, args: argparse.Namespace, meter: Meter) -> Outcome:
+    """JSON pages through :class:`ApiReplayer`, the browserless HTTP path."""
+    from deepscraper.runner.replay import ApiReplayer, RequestTemplate
+
+    template = RequestTemplate(url=f"{base_url}/api/items", params={"size": "50"})
+    async with ApiReplayer(template, max_connections=args.concurrency) as replayer:
+        meter.start()
+        latencies = await _timed_gather(
+            args.pages, args.concurrency, lambda index: replayer.fetch({"page": 1 + index % 50})
+        )
+        meter.stop()
+    return args.pages, latencies, {}
+
+
+async def scenario_extract_dom(base_url: str, args: argparse.Namespace, meter: Meter) -> Outcome:
+    import httpx
+
+    from deepscraper.extractor.dom import extract_with_selectors
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        html = (await client.get("/catalog/1", params={"size": args.page_size})).text
+    latencies = []
+    meter.start()
+    for _ in range(args.pages):
+        started = time.perf_counter()
+        extract_with_selectors(html, CATALOG_FIELDS)
+        latencies.append(time.perf_counter() - started)
+    meter.stop()
+    return args.pages, latencies, {"html_kb": round(len(html) / 1024, 1)}
+
+
+async def scenario_extract_json(base_url: str, args: argparse.Namespace, meter: Meter) -> Outcome:
+    import httpx
+
+    from deepscraper.runner.replay import extract_document
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        document = (await client.get("/api/items", params={"page": 1, "size": args.page_size})).json()
+    latencies = []
+    meter.start()
+    for _ in range(args.pages):
+        started = time.perf_counter()
+        extract_document(document, JSON_FIELDS)
+        latencies.append(time.perf_counter() - started)
+    meter.stop()
+    return args.pages, latencies, {}
+
+
+async def scenario_db(base_url: str, args: argparse.Namespace, meter: Meter) -> Outcome:
+    """One commit of ``page_size`` items per page into a fresh SQLite database."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from deepscraper.pipeline.diff import make_item
+    from deepscraper.pipeline.models import Base, Project, Run
+    from fixtures import product
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{directory}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        latencies = []
+        async with sessions() as session:
+            project = Project(name="bench")
+            session.add(project)
+            await session.flush()
+            run = Run(project_id=project.id, plan={})
+            session.add(run)
+            await session.commit()
+            meter.start()
+            for page in range(args.pages):
+                started = time.perf_counter()
+                session.add_all(
+                    make_item(run.id, product(page * args.page_size + n), ["sku"]) for n in range(args.page_size)
+                )
+                await session.commit()
+                latencies.append(time.perf_counter() - started)
+            meter.stop()
+        await engine.dispose()
+    return args.pages, latencies, {"rows": args.pages * args.page_size}
+
+
+def _export_scenario(fmt: str) -> Scenario:
+    async def _run(base_url: str, args: argparse.Namespace, meter: Meter) -> Outcome:
+        from deepscraper.exporters.streaming import WRITERS, write_rows
+        from fixtures import product
+
+        rows = args.pages * args.page_size
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / f"bench.{fmt}"
+            meter.start()
+            write_rows(WRITERS[fmt](path), (product(index) for index in range(rows)))
+            meter.stop()
+            size = path.stat().st_size
+        return rows, [], {"file_mb": round(size / 1024 / 1024, 2)}
+
+    _run.__doc__ = f"Stream {fmt} rows to disk."
+    return _run
+
+
+async def scenario_browser(base_url: str, args: argparse.Namespace, meter: Meter) -> Outcome:
+    """Navigate and extract catalog pages, then slow resources, scrolling and captcha detection, in one browser."""
+    from deepscraper.runner.browser import BrowserRunner
+
+    runner = BrowserRunner()
+    latencies = []
+    async with runner.context() as page:
+        meter.start()
+        for index in range(args.browser_pages):
+            started = time.perf_counter()
+            await runner.navigate(page, f"{base_url}/catalog/{index}?size={args.page_size}", wait_until="load")
+            await runner.extract_fields(page, CATALOG_FIELDS)
+            latencies.append(time.perf_counter() - started)
+        # Content that is ready before its scripts and images: extraction should not wait for them.
+        started = time.perf_counter()
+        await runner.navigate(page, f"{base_url}/slow?delay={SLOW_ASSET_MS}", wait_until="commit")
+        await page.wait_for_selector(".product .price")
+        await runner.extract_fields(page, CATALOG_FIELDS)
+        slow_ms = (time.perf_counter() - started) * 1000
+        await runner.navigate(page, f"{base_url}/scroll", wait_until="networkidle")
+        for _ in range(5):
+            await page.mouse.wheel(0, 4000)
+            await page.wait_for_load_state("networkidle")
+        scrolled = await page.eval_on_selector_all(".product", "elements => elements.length")
+        await runner.navigate(page, f"{base_url}/captcha", wait_until="domcontentloaded")
+        detection = await runner.captcha_detector.detect(page)
+        meter.stop()
+    extra = {"slow_page_ms": round(slow_ms, 1), "scrolled_items": scrolled, "captcha": detection.kind}
+    return args.browser_pages, latencies, extra
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "http": scenario_http,
+    "replay": scenario_replay,
+    "extract_dom": scenario_extract_dom,
+    "extract_json": scenario_extract_json,
+    "db": scenario_db,
+    "export_jsonl": _export_scenario("jsonl"),
+    "export_csv": _export_scenario("csv"),
+    "browser": scenario_browser,
+}
+
+
+def _browser_missing(exc: Exception) -> bool:
+    """Whether ``exc`` means Chromium is not installed, the only reason a scenario is skipped."""
+    from playwright.async_api import Error as PlaywrightError
+
+    return isinstance(exc, PlaywrightError) and "Executable doesn't exist" in str(exc)
+
+
+def _run_scenario(name: str, base_url: str, args: argparse.Namespace, queue: "multiprocessing.Queue[Any]") -> None:
+    # Measure raw throughput against the fixture site, not the per-domain limiter.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    meter = Meter()
+    try:
+        ops, latencies, extra = asyncio.run(SCENARIOS[name](base_url, args, meter))
+    except Exception as exc:
+        reason = str(exc).strip().splitlines()[0] if str(exc).strip() else ""
+        outcome = "skipped" if _browser_missing(exc) else "failed"
+        queue.put({"scenario": name, outcome: f"{exc.__class__.__name__}: {reason}"})
+        return
+    elapsed, cpu = meter.seconds, meter.cpu_seconds
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    p50, p95 = percentile(latencies, 0.5), percentile(latencies, 0.95)
+    queue.put(
+        {
+            "scenario": name,
+            "ops": ops,
+            "seconds": round(elapsed, 3),
+            "ops_per_sec": round(ops / elapsed, 1) if elapsed else None,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+            "cpu_seconds": round(cpu, 3),
+            "cpu_percent": round(cpu / elapsed * 100, 1) if elapsed else None,
+            "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+            "children_cpu_seconds": round(children.ru_utime + children.ru_stime, 3),
+            "children_peak_rss_mb": round(children.ru_maxrss / 1024, 1),
+            **extra,
+        }
+    )
+
+
+def _start_fixtures() -> Tuple[subprocess.Popen, str]:
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "benchmarks" / "fixtures.py"), "--port", "0"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = process.stdout.readline() if process.stdout else ""
+    if not line:
+        process.kill()
+        raise RuntimeError("Fixture server did not start")
+    return process, json.loads(line)["base_url"]
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    fixtures, base_url = _start_fixtures()
+    context = multiprocessing.get_context("spawn")
+    results = []
+    try:
+        for name in args.scenarios:
+            queue = context.Queue()
+            process = context.Process(target=_run_scenario, args=(name, base_url, args, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            print(json.dumps(result), flush=True)
+            results.append(result)
+    finally:
+        fixtures.terminate()
+        fixtures.wait()
+    return {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Failed scenarios, and those whose throughput dropped or p95 grew by more than ``tolerance`` percent."""
+    previous = {result["scenario"]: result for result in baseline.get("results", []) if "ops" in result}
+    regressions = []
+    for result in current["results"]:
+        if "failed" in result:
+            line = f"{result['scenario']:<14} failed: {result['failed']}"
+            print(line)
+            regressions.append(line)
+            continue
+        before = previous.get(result["scenario"])
+        if before is None or "skipped" in result:
+            continue
+        for key, worse_when_higher in (("ops_per_sec", False), ("p95_ms", True)):
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            line = f"{result['scenario']:<14} {key:<12} {old:>10} -> {new:<10} ({change:+.1f}%)"
+            print(line)
+            if (change > tolerance) if worse_when_higher else (change < -tolerance):
+                regressions.append(line)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--pages", type=int, default=200, help="Pages/operations per scenario")
+    parser.add_argument("--browser-pages", type=int, default=20, help="Pages for the browser scenario")
+    parser.add_argument("--page-size", type=int, default=200, help="Products per catalog page")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--out", type=Path, default=None, help="Write results as JSON")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline results to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance}% or failure(s)", file=sys.stderr)
+            sys.exit(1)
+    failed = [result["scenario"] for result in report["results"] if "failed" in result]
+    if failed:
+        print(f"Failed scenario(s): {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,9 @@ from typing import Optional, Dict, Any
 class CaptchaSolver(ABC):
     """Abstract base class for captcha solving services."""
 
+    # False when no provider is configured and every solve would raise.
+    configured = True
+
     @abstractmethod
     async def solve_recaptcha_v2(
         self,
@@ -66,6 +69,8 @@ class CaptchaSolver(ABC):
 class NullCaptchaSolver(CaptchaSolver):
     """Fallback solver that raises helpful errors."""
 
+    configured = False
+
     async def solve_recaptcha_v2(self, site_key: str, url: str, invisible: bool = False) -> str:
         raise RuntimeError("Captcha solving requested but no provider configured.")
 
@@ -85,14 +90,43 @@ class NullCaptchaSolver(CaptchaSolver):
         raise RuntimeError("Captcha solving requested but no provider configured.")
 
 
-def get_solver(provider: str, api_key: Optional[str]) -> CaptchaSolver:
+def _build_solver(provider: str, api_key: Optional[str]) -> Optional[CaptchaSolver]:
     if provider == "twocaptcha" and api_key:
         from .twocaptcha import TwoCaptchaSolver
         return TwoCaptchaSolver(api_key)
     if provider == "capsolver" and api_key:
         from .capsolver import CapSolver
         return CapSolver(api_key)
-    return NullCaptchaSolver()
+    return None
+
+
+def get_solver(
+    provider: str,
+    api_key: Optional[str],
+    api_keys: Optional[Dict[str, str]] = None,
+    prices: Optional[Dict[str, float]] = None,
+    strategy: str = "failover",
+) -> CaptchaSolver:
+    """Build a solver for ``provider``.
+
+    A comma-separated provider list (``"twocaptcha,capsolver"``) yields a
+    :class:`~deepscraper.captcha.router.RoutingCaptchaSolver`; per-provider keys
+    come from ``api_keys`` and fall back to ``api_key``.
+    """
+    names = [name.strip() for name in provider.split(",") if name.strip()]
+    if len(names) <= 1:
+        return _build_solver(names[0] if names else "", api_key) or NullCaptchaSolver()
+
+    from .router import ProviderRoute, RoutingCaptchaSolver
+
+    routes = []
+    for name in names:
+        solver = _build_solver(name, (api_keys or {}).get(name) or api_key)
+        if solver is not None:
+            routes.append(ProviderRoute(name, solver, (prices or {}).get(name, 0.0)))
+    if not routes:
+        return NullCaptchaSolver()
+    return RoutingCaptchaSolver(routes, strategy=strategy)
 
 
 __all__ = ["CaptchaSolver", "NullCaptchaSolver", "get_solver"]
\ No newline at end of file
@@ -1,55 +1,108 @@
-"""CapSolver adapter stub."""
+"""CapSolver.com service implementation."""
 
 from __future__ import annotations
 
 import asyncio
+import base64
+from typing import Any, Dict, Optional
+
 import httpx
 
 from .base import CaptchaSolver
 
 
 class CapSolver(CaptchaSolver):
+    """CapSolver.com captcha solving service."""
+
     API_URL = "https://api.capsolver.com"
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        polling_interval: float = 5.0,
+        max_polls: int = 24,
+    ) -> None:
         self._api_key = api_key
-        self._client = httpx.AsyncClient(base_url=self.API_URL, timeout=30.0)
+        self._polling_interval = polling_interval
+        self._max_polls = max_polls
+        self._client = httpx.AsyncClient(base_url=base_url or self.API_URL, timeout=30.0)
 
-    async def _solve(self, payload: dict) -> str:
-        response = await self._client.post("/createTask", json={"clientKey": self._api_key, **payload})
+    async def _solve(self, task: Dict[str, Any]) -> str:
+        response = await self._client.post("/createTask", json={"clientKey": self._api_key, "task": task})
         data = response.json()
         task_id = data.get("taskId")
-        if not task_id:
-            raise RuntimeError(f"CapSolver error: {data}")
-        for _ in range(24):
-            await asyncio.sleep(5)
+        if data.get("errorId") or not task_id:
+            raise RuntimeError(f"CapSolver error: {data.get('errorDescription') or data}")
+        for _ in range(self._max_polls):
+            await asyncio.sleep(self._polling_interval)
             result = await self._client.post("/getTaskResult", json={"clientKey": self._api_key, "taskId": task_id})
             body = result.json()
+            if body.get("errorId") or body.get("status") == "failed":
+                raise RuntimeError(f"CapSolver error: {body.get('errorDescription') or body}")
             if body.get("status") == "ready":
-                return body["solution"].get("gRecaptchaResponse", "") or body["solution"].get("text", "")
+                solution = body.get("solution", {})
+                return solution.get("gRecaptchaResponse", "") or solution.get("text", "")
         raise RuntimeError("CapSolver timeout")
 
-    async def solve_image(self, image_base64: str, captcha_type: str = "image") -> str:
-        payload = {
-            "task": {
-                "type": "ImageToTextTask",
-                "body": image_base64,
+    async def solve_recaptcha_v2(self, site_key: str, url: str, invisible: bool = False) -> str:
+        """Solve reCAPTCHA v2."""
+        return await self._solve(
+            {
+                "type": "ReCaptchaV2TaskProxyLess",
+                "websiteURL": url,
+                "websiteKey": site_key,
+                "isInvisible": invisible,
             }
-        }
-        return await self._solve(payload)
+        )
 
-    async def solve_sitekey(self, site_key: str, url: str, captcha_type: str = "RecaptchaV2TaskProxyless") -> str:
-        payload = {
-            "task": {
-                "type": captcha_type,
+    async def solve_recaptcha_v3(
+        self, site_key: str, url: str, action: str = "verify", min_score: float = 0.5
+    ) -> str:
+        """Solve reCAPTCHA v3."""
+        return await self._solve(
+            {
+                "type": "ReCaptchaV3TaskProxyLess",
                 "websiteURL": url,
                 "websiteKey": site_key,
+                "pageAction": action,
+                "minScore": min_score,
             }
-        }
-        return await self._solve(payload)
+        )
 
-    async def close(self) -> None:
+    async def solve_image_captcha(self, image_url: str, **kwargs: Any) -> str:
+        """Solve image-based captcha from URL."""
+        response = await self._client.get(image_url)
+        return await self.solve_image_captcha_base64(base64.b64encode(response.content).decode("utf-8"), **kwargs)
+
+    async def solve_image_captcha_base64(self, image_base64: str, **kwargs: Any) -> str:
+        """Solve image-based captcha from base64 string."""
+        return await self._solve({"type": "ImageToTextTask", "body": image_base64, **kwargs})
+
+    async def solve_hcaptcha(self, site_key: str, url: str) -> str:
+        """Solve hCaptcha."""
+        return await self._solve({"type": "HCaptchaTaskProxyLess", "websiteURL": url, "websiteKey": site_key})
+
+    async def get_balance(self) -> float:
+        """Get account balance."""
+        response = await self._client.post("/getBalance", json={"clientKey": self._api_key})
+        data = response.json()
+        if data.get("errorId"):
+            raise RuntimeError(f"CapSolver balance error: {data.get('errorDescription') or data}")
+        return float(data.get("balance", 0.0))
+
+    async def solve_image(self, image_base64: str, captcha_type: str = "image") -> str:
+        return await self.solve_image_captcha_base64(image_base64)
+
+    async def solve_sitekey(self, site_key: str, url: str, captcha_type: str = "ReCaptchaV2TaskProxyLess") -> str:
+        return await self._solve({"type": captcha_type, "websiteURL": url, "websiteKey": site_key})
+
+    async def aclose(self) -> None:
+        """Close HTTP client."""
         await self._client.aclose()
 
+    async def close(self) -> None:
+        await self.aclose()
+
 
 __all__ = ["CapSolver"]
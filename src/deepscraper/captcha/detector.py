@@ -0,0 +1,217 @@
+"""Single-evaluate captcha detection."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from playwright.async_api import Page
+
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+CAPTCHA_KINDS = ("none", "recaptcha_v2", "recaptcha_v3", "hcaptcha", "image", "cloudflare")
+
+# One round trip: a combined selector rules out clean pages before any
+# classification work, otherwise the page is classified and the site key and
+# input elements are resolved in the same call. Elements without a stable
+# selector are tagged with a data attribute so Python can address them later.
+#
+# Cloudflare's challenge-platform script and Turnstile widgets are embedded in
+# plenty of ordinary pages (bot scoring, login forms), so only the interstitial
+# itself counts as a challenge; the widget and script just supply its site key.
+# reCAPTCHA, hCaptcha and image captchas are just as common on pages whose
+# content is all there (invisible v3 scoring, a widget on a login or contact
+# form), so they are reported as ``gated`` only when the page is the challenge:
+# its title says so, or it has hardly any text and no login form. Invisible v3
+# never blocks rendering and needs the title.
+CHALLENGE_MARKERS = "#challenge-form, #challenge-running, #cf-challenge-running"
+CHALLENGE_TITLE = r"/^(just a moment|attention required!? \| cloudflare)/i"
+GATE_TITLE = r"/captcha|are you (a )?(human|robot)|verify (that )?you are (a )?human|security check|unusual traffic/i"
+GATE_TEXT_CHARS = 1500
+
+DETECT_SCRIPT = """
+() => {
+    const CHALLENGE = '__CHALLENGE_MARKERS__';
+    const MARKERS = [
+        'iframe[src*="/recaptcha/"]', '.g-recaptcha', 'script[src*="/recaptcha/api.js"]',
+        'iframe[src*="hcaptcha.com"]', '.h-captcha',
+        'img[src*="captcha" i]', 'img[alt*="captcha" i]', CHALLENGE
+    ].join(',');
+    const challengeTitle = __CHALLENGE_TITLE__.test(document.title || '');
+    if (!challengeTitle && !document.querySelector(MARKERS)) {
+        return { kind: 'none' };
+    }
+    const gateTitle = __GATE_TITLE__.test(document.title || '');
+    const bare = () => !document.querySelector('input[type="password"]') &&
+        ((document.body && document.body.innerText) || '').trim().length < __GATE_TEXT_CHARS__;
+    const mark = (el, name) => {
+        if (!el) return null;
+        if (el.id) return '#' + CSS.escape(el.id);
+        el.setAttribute('data-deepscraper-captcha', name);
+        return '[data-deepscraper-captcha="' + name + '"]';
+    };
+    const param = (src, name) => {
+        const match = (src || '').match(new RegExp('[&?]' + name + '=([^&#]+)'));
+        return match ? decodeURIComponent(match[1]) : null;
+    };
+
+    if (challengeTitle || document.querySelector(CHALLENGE)) {
+        const turnstile = document.querySelector('.cf-turnstile[data-sitekey]');
+        const script = document.querySelector(
+            'script[src*="challenges.cloudflare.com/turnstile/"], script[src*="/cdn-cgi/challenge-platform/"]'
+        );
+        const siteKey = turnstile
+            ? turnstile.getAttribute('data-sitekey')
+            : (script ? param(script.src, 'sitekey') || param(script.src, 'render') : null);
+        return { kind: 'cloudflare', site_key: siteKey, gated: true };
+    }
+
+    const recaptchaFrame = document.querySelector('iframe[src*="/recaptcha/"]');
+    const recaptchaWidget = document.querySelector('.g-recaptcha[data-sitekey]');
+    const recaptchaScript = document.querySelector('script[src*="/recaptcha/api.js"]');
+    const renderKey = recaptchaScript ? param(recaptchaScript.src, 'render') : null;
+    if (recaptchaWidget || recaptchaFrame || (renderKey && renderKey !== 'explicit')) {
+        const response = document.querySelector('#g-recaptcha-response, [name="g-recaptcha-response"]');
+        let siteKey = recaptchaWidget ? recaptchaWidget.getAttribute('data-sitekey') : null;
+        siteKey = siteKey || (recaptchaFrame ? param(recaptchaFrame.src, 'k') : null);
+        const v3 = !recaptchaWidget && renderKey && renderKey !== 'explicit';
+        return {
+            kind: v3 ? 'recaptcha_v3' : 'recaptcha_v2',
+            site_key: v3 ? renderKey : siteKey,
+            gated: gateTitle || (!v3 && bare()),
+            invisible: Boolean(
+                (recaptchaWidget && recaptchaWidget.getAttribute('data-size') === 'invisible') ||
+                (recaptchaFrame && param(recaptchaFrame.src, 'size') === 'invisible')
+            ),
+            action: recaptchaWidget ? recaptchaWidget.getAttribute('data-action') : null,
+            response_selector: mark(response, 'response'),
+        };
+    }
+
+    const hcaptchaWidget = document.querySelector('.h-captcha[data-sitekey]');
+    const hcaptchaFrame = document.querySelector('iframe[src*="hcaptcha.com"]');
+    if (hcaptchaWidget || hcaptchaFrame) {
+        const response = document.querySelector('[name="h-captcha-response"]');
+        return {
+            kind: 'hcaptcha',
+            gated: gateTitle || bare(),
+            site_key: hcaptchaWidget
+                ? hcaptchaWidget.getAttribute('data-sitekey')
+                : param(hcaptchaFrame.src, 'sitekey'),
+            response_selector: mark(response, 'response'),
+        };
+    }
+
+    const image = document.querySelector('img[src*="captcha" i], img[alt*="captcha" i]');
+    if (image) {
+        const scope = image.closest('form') || document;
+        const input = scope.querySelector('input[name*="captcha" i]') ||
+            scope.querySelector('input[type="text"], input:not([type])');
+        return {
+            kind: 'image',
+            gated: Boolean(input) && (gateTitle || bare()),
+            image_selector: mark(image, 'image'),
+            input_selector: mark(input, 'input'),
+        };
+    }
+    return { kind: 'none' };
+}
+"""
+for _name, _value in (
+    ("__CHALLENGE_MARKERS__", CHALLENGE_MARKERS),
+    ("__CHALLENGE_TITLE__", CHALLENGE_TITLE),
+    ("__GATE_TITLE__", GATE_TITLE),
+    ("__GATE_TEXT_CHARS__", str(GATE_TEXT_CHARS)),
+):
+    DETECT_SCRIPT = DETECT_SCRIPT.replace(_name, _value)
+
+
+@dataclass(frozen=True)
+class CaptchaDetection:
+    """Result of classifying a page.
+
+    ``kind`` names any captcha found on the page; only ``gated`` ones stand
+    between the scraper and the content and are worth solving.
+    """
+
+    kind: str = "none"
+    gated: bool = False
+    site_key: Optional[str] = None
+    invisible: bool = False
+    action: Optional[str] = None
+    response_selector: Optional[str] = None
+    image_selector: Optional[str] = None
+    input_selector: Optional[str] = None
+
+    @property
+    def detected(self) -> bool:
+        return self.kind != "none" and self.gated
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict[str, Any]]) -> "CaptchaDetection":
+        payload = payload or {}
+        kind = payload.get("kind") or "none"
+        if kind not in CAPTCHA_KINDS:
+            kind = "none"
+        return cls(
+            kind=kind,
+            gated=kind != "none" and bool(payload.get("gated", False)),
+            site_key=payload.get("site_key"),
+            invisible=bool(payload.get("invisible", False)),
+            action=payload.get("action"),
+            response_selector=payload.get("response_selector"),
+            image_selector=payload.get("image_selector"),
+            input_selector=payload.get("input_selector"),
+        )
+
+
+NO_CAPTCHA = CaptchaDetection()
+
+
+class CaptchaDetector:
+    """Classifies pages with one ``page.evaluate`` call.
+
+    Clean pages cost one ``querySelector`` inside the page. Callers that know
+    the page is identical to one seen before (the same URL and ``ETag``) can
+    pass a ``cache_key`` to :meth:`detect`; keys of pages found clean are
+    remembered and skip even that round trip.
+    """
+
+    def __init__(self, clean_cache_size: int = 4096) -> None:
+        self._clean: "OrderedDict[str, None]" = OrderedDict()
+        self._clean_cache_size = clean_cache_size
+
+    async def detect(self, page: Page, cache_key: Optional[str] = None) -> CaptchaDetection:
+        if cache_key is not None and cache_key in self._clean:
+            self._clean.move_to_end(cache_key)
+            return NO_CAPTCHA
+        detection = CaptchaDetection.from_payload(await page.evaluate(DETECT_SCRIPT))
+        if detection.detected:
+            logger.info("captcha_detected", kind=detection.kind, site_key=detection.site_key)
+        else:
+            if detection.kind != "none":
+                logger.debug("captcha_embedded", kind=detection.kind, url=page.url)
+            if cache_key is not None:
+                self._remember_clean(cache_key)
+        return detection
+
+    def _remember_clean(self, cache_key: str) -> None:
+        self._clean[cache_key] = None
+        if len(self._clean) > self._clean_cache_size:
+            self._clean.popitem(last=False)
+
+
+__all__ = [
+    "CaptchaDetection",
+    "CaptchaDetector",
+    "CAPTCHA_KINDS",
+    "CHALLENGE_MARKERS",
+    "CHALLENGE_TITLE",
+    "DETECT_SCRIPT",
+    "GATE_TEXT_CHARS",
+    "GATE_TITLE",
+    "NO_CAPTCHA",
+]
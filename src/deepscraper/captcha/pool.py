@@ -0,0 +1,202 @@
+"""Pre-solved captcha token pool keyed by provider, captcha kind, site key, action and domain."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from ..config import get_settings
+from ..logging import event_dict_from_exc, get_logger
+from .base import CaptchaSolver, get_solver
+
+logger = get_logger(__name__)
+
+PoolKey = Tuple[str, str, str, str, str]
+
+# Token kinds that are bound to a site key and stay valid for a short period.
+TOKEN_KINDS = ("recaptcha_v2", "recaptcha_v3", "hcaptcha")
+# Hits within the demand window before a key is solved ahead; a one-off captcha is never presolved.
+MIN_RECURRING_DEMAND = 2
+
+
+@dataclass
+class _PoolEntry:
+    kind: str
+    site_key: str
+    url: str
+    action: Optional[str] = None
+    tokens: Deque[Tuple[float, str]] = field(default_factory=deque)
+    demand: Deque[float] = field(default_factory=deque)
+    pending: Set["asyncio.Task[None]"] = field(default_factory=set)
+
+
+class TokenPool:
+    """Keeps a few solved tokens per ``(provider, kind, site_key, action, domain)`` ready for use.
+
+    Tokens are single-use and expire ``ttl_seconds`` after they were solved. The
+    number of tokens solved ahead of time follows the demand observed during the
+    last ``demand_window`` seconds and never exceeds ``size``; a key is only
+    refilled once it was hit ``MIN_RECURRING_DEMAND`` times within that window. A v2 token does not pass a v3 check, and a v3
+    token is only accepted for the action it was solved for, so both are part
+    of the key.
+    """
+
+    def __init__(
+        self,
+        solver: CaptchaSolver,
+        provider: str,
+        size: int = 2,
+        ttl_seconds: float = 110.0,
+        demand_window: float = 300.0,
+        min_remaining: float = 15.0,
+    ) -> None:
+        self._solver = solver
+        self._provider = provider
+        self._size = max(size, 0)
+        self._ttl = ttl_seconds
+        self._demand_window = demand_window
+        self._min_remaining = min_remaining
+        self._entries: Dict[PoolKey, _PoolEntry] = {}
+
+    @property
+    def solver(self) -> CaptchaSolver:
+        return self._solver
+
+    def key_for(self, kind: str, site_key: str, url: str, action: Optional[str] = None) -> PoolKey:
+        action = (action or "verify") if kind == "recaptcha_v3" else ""
+        return (self._provider, kind, site_key, action, urlsplit(url).netloc.lower())
+
+    async def acquire(self, kind: str, site_key: str, url: str, action: Optional[str] = None) -> str:
+        """Return a valid token, solving one on demand if none is pooled.
+
+        ``action`` is the reCAPTCHA v3 action; it is ignored for other kinds.
+        """
+
+        if kind not in TOKEN_KINDS:
+            raise ValueError(f"Unsupported token kind: {kind}")
+        entry = self._entry(kind, site_key, url, action)
+        now = time.monotonic()
+        entry.demand.append(now)
+        entry.url = url
+
+        token = self._pop_valid(entry, now)
+        while token is None and entry.pending:
+            await asyncio.wait(set(entry.pending), return_when=asyncio.FIRST_COMPLETED)
+            token = self._pop_valid(entry, time.monotonic())
+
+        if token is not None:
+            logger.info("captcha_token_pool_hit", kind=kind, site_key=site_key, pooled=len(entry.tokens))
+        else:
+            logger.info("captcha_token_pool_miss", kind=kind, site_key=site_key)
+            token = await self._solve(entry)
+        self._refill(entry)
+        return token
+
+    def available(self, kind: str, site_key: str, url: str, action: Optional[str] = None) -> int:
+        entry = self._entries.get(self.key_for(kind, site_key, url, action))
+        if entry is None:
+            return 0
+        self._drop_expired(entry, time.monotonic())
+        return len(entry.tokens)
+
+    async def aclose(self) -> None:
+        tasks = [task for entry in self._entries.values() for task in entry.pending]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._entries.clear()
+
+    def _entry(self, kind: str, site_key: str, url: str, action: Optional[str]) -> _PoolEntry:
+        key = self.key_for(kind, site_key, url, action)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _PoolEntry(kind=kind, site_key=site_key, url=url, action=key[3] or None)
+            self._entries[key] = entry
+        return entry
+
+    def _drop_expired(self, entry: _PoolEntry, now: float) -> None:
+        while entry.tokens and entry.tokens[0][0] - now < self._min_remaining:
+            entry.tokens.popleft()
+        while entry.demand and now - entry.demand[0] > self._demand_window:
+            entry.demand.popleft()
+
+    def _pop_valid(self, entry: _PoolEntry, now: float) -> Optional[str]:
+        self._drop_expired(entry, now)
+        if not entry.tokens:
+            return None
+        return entry.tokens.popleft()[1]
+
+    def _target(self, entry: _PoolEntry) -> int:
+        if not self._size or len(entry.demand) < MIN_RECURRING_DEMAND:
+            return 0
+        expected_per_ttl = len(entry.demand) * self._ttl / self._demand_window
+        return min(self._size, math.ceil(expected_per_ttl))
+
+    def _refill(self, entry: _PoolEntry) -> None:
+        missing = self._target(entry) - len(entry.tokens) - len(entry.pending)
+        for _ in range(max(missing, 0)):
+            task = asyncio.create_task(self._presolve(entry))
+            entry.pending.add(task)
+            task.add_done_callback(entry.pending.discard)
+
+    async def _presolve(self, entry: _PoolEntry) -> None:
+        try:
+            token = await self._solve(entry)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("captcha_presolve_failed", site_key=entry.site_key, **event_dict_from_exc(exc))
+            return
+        entry.tokens.append((time.monotonic() + self._ttl, token))
+
+    async def _solve(self, entry: _PoolEntry) -> str:
+        if entry.kind == "recaptcha_v3":
+            return await self._solver.solve_recaptcha_v3(entry.site_key, entry.url, action=entry.action or "verify")
+        solve: Callable[[str, str], Awaitable[str]] = {
+            "recaptcha_v2": self._solver.solve_recaptcha_v2,
+            "hcaptcha": self._solver.solve_hcaptcha,
+        }[entry.kind]
+        return await solve(entry.site_key, entry.url)
+
+
+# Process-wide pool: tokens solved ahead for one run stay usable by the next
+# runner in the same worker. Its refill tasks belong to the running event loop,
+# so whoever owns the loop calls close_token_pool() before the loop ends.
+_token_pool: Optional[TokenPool] = None
+
+
+def get_token_pool() -> TokenPool:
+    """The shared pool, built from the captcha settings on first use."""
+    global _token_pool
+    if _token_pool is None:
+        settings = get_settings()
+        solver = get_solver(
+            settings.captcha_provider,
+            settings.captcha_api_key,
+            api_keys=settings.captcha_api_keys,
+            prices=settings.captcha_prices,
+            strategy=settings.captcha_routing,
+        )
+        _token_pool = TokenPool(
+            solver,
+            settings.captcha_provider,
+            size=settings.captcha_pool_size,
+            ttl_seconds=settings.captcha_token_ttl,
+        )
+    return _token_pool
+
+
+async def close_token_pool() -> None:
+    """Cancel pending pre-solves and drop the shared pool; the next use builds a new one."""
+    global _token_pool
+    pool, _token_pool = _token_pool, None
+    if pool is not None:
+        await pool.aclose()
+
+
+__all__ = ["MIN_RECURRING_DEMAND", "TokenPool", "TOKEN_KINDS", "close_token_pool", "get_token_pool"]
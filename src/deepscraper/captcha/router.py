@@ -0,0 +1,217 @@
+"""Cost- and latency-aware routing across several captcha providers."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from ..logging import event_dict_from_exc, get_logger
+from .base import CaptchaSolver
+
+logger = get_logger(__name__)
+
+SolveCall = Callable[[CaptchaSolver], Awaitable[str]]
+
+
+def _percentile(values: Iterable[float], quantile: float) -> Optional[float]:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(int(round(quantile * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+@dataclass
+class ProviderStats:
+    """Rolling solve statistics for a single provider."""
+
+    window: int = 100
+    latencies: Deque[float] = field(default_factory=deque)
+    outcomes: Deque[bool] = field(default_factory=deque)
+    solves: int = 0
+    failures: int = 0
+    spent: float = 0.0
+
+    def record(self, ok: bool, latency: float, price: float) -> None:
+        self.outcomes.append(ok)
+        if len(self.outcomes) > self.window:
+            self.outcomes.popleft()
+        if ok:
+            self.solves += 1
+            self.spent += price
+            self.latencies.append(latency)
+            if len(self.latencies) > self.window:
+                self.latencies.popleft()
+        else:
+            self.failures += 1
+
+    @property
+    def p50(self) -> Optional[float]:
+        return _percentile(self.latencies, 0.5)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return _percentile(self.latencies, 0.95)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+
+@dataclass
+class ProviderRoute:
+    """A provider together with its configured price per solve (USD)."""
+
+    name: str
+    solver: CaptchaSolver
+    price_per_solve: float = 0.0
+    stats: ProviderStats = field(default_factory=ProviderStats)
+
+
+class RoutingCaptchaSolver(CaptchaSolver):
+    """Routes solves to the provider with the lowest expected cost.
+
+    The expected cost of a provider is its price plus ``latency_weight`` USD per
+    second of expected latency (between p50 and p95), divided by its recent
+    success rate. ``strategy="failover"`` tries providers one after another in
+    that order; ``strategy="race"`` starts the best ``race_width`` providers at
+    once, keeps the first token and falls back to the rest if all of them fail.
+    """
+
+    def __init__(
+        self,
+        routes: Iterable[ProviderRoute],
+        strategy: str = "failover",
+        latency_weight: float = 0.0001,
+        race_width: int = 2,
+        default_latency: float = 30.0,
+    ) -> None:
+        self._routes: List[ProviderRoute] = list(routes)
+        if not self._routes:
+            raise ValueError("RoutingCaptchaSolver needs at least one provider")
+        if strategy not in ("failover", "race"):
+            raise ValueError(f"Unknown captcha routing strategy: {strategy}")
+        self._strategy = strategy
+        self._latency_weight = latency_weight
+        self._race_width = max(race_width, 1)
+        self._default_latency = default_latency
+
+    @property
+    def routes(self) -> List[ProviderRoute]:
+        return list(self._routes)
+
+    def score(self, route: ProviderRoute) -> float:
+        stats = route.stats
+        p50 = stats.p50 if stats.p50 is not None else self._default_latency
+        p95 = stats.p95 if stats.p95 is not None else p50
+        expected_latency = p50 + 0.5 * (p95 - p50)
+        success_rate = max(1.0 - stats.error_rate, 0.05)
+        return (route.price_per_solve + self._latency_weight * expected_latency) / success_rate
+
+    def ranked(self) -> List[ProviderRoute]:
+        return sorted(self._routes, key=self.score)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider routing metrics."""
+        return {
+            route.name: {
+                "solves": route.stats.solves,
+                "failures": route.stats.failures,
+                "error_rate": route.stats.error_rate,
+                "p50_seconds": route.stats.p50,
+                "p95_seconds": route.stats.p95,
+                "price_per_solve": route.price_per_solve,
+                "spent": route.stats.spent,
+                "score": self.score(route),
+            }
+            for route in self._routes
+        }
+
+    async def _attempt(self, route: ProviderRoute, call: SolveCall) -> str:
+        started = time.monotonic()
+        try:
+            token = await call(route.solver)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            route.stats.record(False, time.monotonic() - started, route.price_per_solve)
+            logger.warning("captcha_provider_failed", provider=route.name, **event_dict_from_exc(exc))
+            raise
+        latency = time.monotonic() - started
+        route.stats.record(True, latency, route.price_per_solve)
+        logger.info("captcha_provider_solved", provider=route.name, latency=round(latency, 3))
+        return token
+
+    async def _route(self, call: SolveCall) -> str:
+        ranked = self.ranked()
+        errors: List[str] = []
+        if self._strategy == "race" and len(ranked) > 1:
+            racers, ranked = ranked[: self._race_width], ranked[self._race_width :]
+            token = await self._race(racers, call, errors)
+            if token is not None:
+                return token
+        for route in ranked:
+            try:
+                return await self._attempt(route, call)
+            except Exception as exc:
+                errors.append(f"{route.name}: {exc}")
+        raise RuntimeError("All captcha providers failed: " + "; ".join(errors))
+
+    async def _race(self, racers: List[ProviderRoute], call: SolveCall, errors: List[str]) -> Optional[str]:
+        tasks = {asyncio.create_task(self._attempt(route, call)): route for route in racers}
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(f"{tasks[task].name}: {task.exception()}")
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def solve_recaptcha_v2(self, site_key: str, url: str, invisible: bool = False) -> str:
+        return await self._route(lambda solver: solver.solve_recaptcha_v2(site_key, url, invisible))
+
+    async def solve_recaptcha_v3(
+        self, site_key: str, url: str, action: str = "verify", min_score: float = 0.5
+    ) -> str:
+        return await self._route(lambda solver: solver.solve_recaptcha_v3(site_key, url, action, min_score))
+
+    async def solve_image_captcha(self, image_url: str, **kwargs: Any) -> str:
+        return await self._route(lambda solver: solver.solve_image_captcha(image_url, **kwargs))
+
+    async def solve_image_captcha_base64(self, image_base64: str, **kwargs: Any) -> str:
+        return await self._route(lambda solver: solver.solve_image_captcha_base64(image_base64, **kwargs))
+
+    async def solve_hcaptcha(self, site_key: str, url: str) -> str:
+        return await self._route(lambda solver: solver.solve_hcaptcha(site_key, url))
+
+    async def get_balance(self) -> float:
+        """Total balance across providers that answered."""
+        balances = await self.balances()
+        return sum(balance for balance in balances.values() if balance is not None)
+
+    async def balances(self) -> Dict[str, Optional[float]]:
+        results = await asyncio.gather(*(route.solver.get_balance() for route in self._routes), return_exceptions=True)
+        return {
+            route.name: None if isinstance(result, BaseException) else float(result)
+            for route, result in zip(self._routes, results)
+        }
+
+    async def aclose(self) -> None:
+        for route in self._routes:
+            close = getattr(route.solver, "aclose", None)
+            if close is not None:
+                await close()
+
+
+__all__ = ["ProviderRoute", "ProviderStats", "RoutingCaptchaSolver"]
@@ -2,6 +2,7 @@
 """2Captcha.com service implementation."""
 from __future__ import annotations
 
+import asyncio
 import base64
 import time
 from typing import Optional, Dict, Any
@@ -15,8 +16,15 @@ class TwoCaptchaSolver(CaptchaSolver):
 
     BASE_URL = "https://2captcha.com"
 
-    def __init__(self, api_key: str, timeout: int = 120, polling_interval: int = 5):
+    def __init__(
+        self,
+        api_key: str,
+        timeout: int = 120,
+        polling_interval: float = 5,
+        base_url: Optional[str] = None,
+    ):
         self.api_key = api_key
+        self.base_url = base_url or self.BASE_URL
         self.timeout = timeout
         self.polling_interval = polling_interval
         self._client = httpx.AsyncClient(timeout=timeout)
@@ -42,7 +50,7 @@ class TwoCaptchaSolver(CaptchaSolver):
             params["invisible"] = 1
 
         # Send captcha to service
-        response = await self._client.post(f"{self.BASE_URL}/in.php", data=params)
+        response = await self._client.post(f"{self.base_url}/in.php", data=params)
         result = response.json()
 
         if result["status"] != 1:
@@ -72,7 +80,7 @@ class TwoCaptchaSolver(CaptchaSolver):
             "json": 1
         }
 
-        response = await self._client.post(f"{self.BASE_URL}/in.php", data=params)
+        response = await self._client.post(f"{self.base_url}/in.php", data=params)
         result = response.json()
 
         if result["status"] != 1:
@@ -123,7 +131,7 @@ class TwoCaptchaSolver(CaptchaSolver):
         if "calc" in kwargs:
             params["calc"] = kwargs["calc"]
 
-        response = await self._client.post(f"{self.BASE_URL}/in.php", data=params)
+        response = await self._client.post(f"{self.base_url}/in.php", data=params)
         result = response.json()
 
         if result["status"] != 1:
@@ -146,7 +154,7 @@ class TwoCaptchaSolver(CaptchaSolver):
             "json": 1
         }
 
-        response = await self._client.post(f"{self.BASE_URL}/in.php", data=params)
+        response = await self._client.post(f"{self.base_url}/in.php", data=params)
         result = response.json()
 
         if result["status"] != 1:
@@ -162,7 +170,7 @@ class TwoCaptchaSolver(CaptchaSolver):
         while time.time() - start_time < self.timeout:
             # Check solution status
             response = await self._client.get(
-                f"{self.BASE_URL}/res.php",
+                f"{self.base_url}/res.php",
                 params={
                     "key": self.api_key,
                     "action": "get",
@@ -186,7 +194,7 @@ class TwoCaptchaSolver(CaptchaSolver):
     async def get_balance(self) -> float:
         """Get account balance."""
         response = await self._client.get(
-            f"{self.BASE_URL}/res.php",
+            f"{self.base_url}/res.php",
             params={
                 "key": self.api_key,
                 "action": "getbalance",
@@ -2,85 +2,84 @@
 from __future__ import annotations
 
 import asyncio
-from itertools import zip_longest
+from itertools import chain, repeat
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import typer
 from sqlalchemy import select
 
+from .captcha.pool import close_token_pool
 from .config import get_settings
 from .exporters.csv_exporter import export_to_csv
 from .exporters.excel_exporter import export_to_excel
 from .exporters.json_exporter import export_to_json
+from .exporters.jsonl_exporter import export_to_jsonl
+from .exporters.parquet_exporter import ArrowWriter, ParquetWriter, column_types, export_to_arrow, export_to_parquet
+from .exporters.streaming import COMPRESSION_SUFFIXES, aexport
 from .logging import configure_logging, get_logger
 from .pipeline.db import init_db, session_scope
-from .pipeline.models import Item, Project, Run
+from .pipeline.diff import CHANGES, diff_counts, make_item, previous_run, stream_diff
+from .pipeline.export import parse_filters, resolve_runs, stream_items
+from .pipeline.models import Project, Run
+from .pipeline.pages import PageRecorder
+from .pipeline.runs import create_run, ensure_project
 from .planner.deepseek_client import DeepSeekClient
-from .planner.schema import PlanDocument
-from .proxy.manager import ProxyManager
-from .runner.browser import BrowserRunner
+from .planner.schema import ExtractionField, PlanDocument
+from .runner.executor import execute_plan
+from .utils.profiling import RunProfiler
+from .utils.ratelimit import get_rate_limiter
+from .utils.snapshots import get_snapshot_store
+from .utils.tracing import critical_path, load_spans, span, spans_for_run, summarize
 
 app = typer.Typer(help="AI-assisted universal scraping platform")
 logger = get_logger(__name__)
 
 
-async def _ensure_project(session, name: str) -> Project:
-    result = await session.execute(select(Project).where(Project.name == name))
-    project_obj = result.scalar_one_or_none()
-    if project_obj:
-        return project_obj
-    project = Project(name=name)
-    session.add(project)
-    await session.flush()
-    return project
-
-
-async def _create_run(session, project: Project, plan: PlanDocument) -> Run:
-    run = Run(project_id=project.id, plan=plan.model_dump())
-    session.add(run)
-    await session.flush()
-    return run
-
-
-async def _execute_plan(plan: PlanDocument, limit: int) -> List[dict]:
-    settings = get_settings()
-    proxy_manager = ProxyManager(settings.proxy_list) if settings.proxy_list else None
-    runner = BrowserRunner(proxy_manager)
-    extracted_rows: List[dict] = []
-    async with runner.context() as page:
-        for step in plan.steps:
-            if step.action == "navigate" and step.target:
-                await runner.navigate(page, step.target)
-            elif step.action == "click" and step.target:
-                await page.click(step.target)
-            elif step.action == "fill" and step.target and step.value is not None:
-                await page.fill(step.target, step.value)
-            elif step.action == "wait" and step.wait:
-                await runner.wait(page, step.wait.model_dump())
-            elif step.action == "extract":
-                extracted = await runner.extract_fields(page, [field.model_dump() for field in plan.fields])
-                field_names = [field["name"] for field in extracted]
-                field_values = [field["values"] for field in extracted]
-                for row_values in zip_longest(*field_values, fillvalue=""):
-                    item = {name: value for name, value in zip(field_names, row_values)}
-                    extracted_rows.append(item)
-                    if len(extracted_rows) >= limit:
-                        break
-            if len(extracted_rows) >= limit:
-                break
-        if plan.pagination.type != "none":
-            await runner.paginate(page, plan.pagination.model_dump())
-    return extracted_rows[:limit]
-
-
-def _export(rows: List[dict], export: str, project: str) -> Path:
-    filename = f"{project}." + ("csv" if export == "csv" else "json" if export == "json" else "xlsx")
+EXPORT_EXTENSIONS = {
+    "csv": "csv",
+    "json": "json",
+    "jsonl": "jsonl",
+    "excel": "xlsx",
+    "parquet": "parquet",
+    "arrow": "arrow",
+}
+
+COMPRESS_HELP = "Compression: gzip|zstd; parquet also snappy|brotli|lz4, arrow only lz4|zstd (both default to zstd)"
+
+
+def _check_compression(export: Optional[str], compression: Optional[str]) -> None:
+    """Reject a compression the chosen format cannot write before any work starts."""
+    if compression is None or export in (None, "excel"):
+        return
+    supported = {"parquet": ParquetWriter.COMPRESSIONS, "arrow": ArrowWriter.COMPRESSIONS}.get(
+        export, tuple(name for name in COMPRESSION_SUFFIXES if name)
+    )
+    if compression not in supported:
+        raise typer.BadParameter(f"{export} export supports compression {'|'.join(supported)}, not {compression}")
+
+
+def _export(
+    rows: List[dict],
+    export: str,
+    project: str,
+    compression: Optional[str] = None,
+    fields: Optional[List[ExtractionField]] = None,
+) -> Path:
+    if export not in EXPORT_EXTENSIONS:
+        raise typer.BadParameter(f"Unknown export format: {export}")
+    filename = f"{project}.{EXPORT_EXTENSIONS[export]}"
     if export == "csv":
-        return export_to_csv(rows, filename)
+        return export_to_csv(rows, filename, compression)
     if export == "excel":
-        return export_to_excel(rows, filename)
-    return export_to_json(rows, filename)
+        return export_to_excel(rows, filename, [field.name for field in fields] if fields else None)
+    if export == "jsonl":
+        return export_to_jsonl(rows, filename, compression)
+    if export == "parquet":
+        return export_to_parquet(rows, filename, column_types(fields or []), compression)
+    if export == "arrow":
+        return export_to_arrow(rows, filename, column_types(fields or []), compression)
+    return export_to_json(rows, filename, compression)
 
 
 @app.command()
@@ -108,25 +107,61 @@ def parse(
     plan: Path = typer.Option(..., help="Path to plan JSON file"),
     project: str = typer.Option(..., help="Project name"),
     limit: int = typer.Option(100, help="Maximum items to extract"),
-    export: str = typer.Option("json", help="Export format: csv|excel|json")
+    export: str = typer.Option("json", help="Export format: csv|excel|json|jsonl|parquet|arrow"),
+    compress: Optional[str] = typer.Option(None, help=COMPRESS_HELP),
+    incremental: bool = typer.Option(False, help="Skip pages unchanged since the previous run of the project"),
+    profile: bool = typer.Option(False, help="Write a sampling profile and asyncio task breakdown next to the export"),
 ):
     """Execute a scraping plan and persist the results."""
 
-    configure_logging(get_settings().log_level)
+    settings = get_settings()
+    configure_logging(settings.log_level)
+    _check_compression(export, compress)
+    run_id: Optional[int] = None
 
     async def _parse() -> None:
+        try:
+            with span("cli.parse", project=project) as root:
+                await _parse_run(root)
+        finally:
+            await close_token_pool()
+
+    async def _parse_run(root) -> None:
+        nonlocal run_id
         await init_db()
         plan_doc = PlanDocument.model_validate_json(plan.read_text())
         async with session_scope() as session:
-            project_obj = await _ensure_project(session, project)
-            run = await _create_run(session, project_obj, plan_doc)
-            rows = await _execute_plan(plan_doc, limit)
-            for row in rows:
-                session.add(Item(run_id=run.id, data=row))
-        export_path = _export(rows, export, project)
+            project_obj = await ensure_project(session, project)
+            run = await create_run(session, project_obj, plan_doc)
+            run_id = run.id
+            root.set_attribute("run_id", run.id)
+            recorder = PageRecorder(
+                session,
+                run,
+                project,
+                get_snapshot_store(),
+                incremental=incremental,
+                max_distance=get_settings().incremental_max_distance,
+            )
+            try:
+                rows = await execute_plan(plan_doc, limit, recorder)
+            finally:
+                await recorder.close()
+            session.add_all(
+                make_item(run.id, row, plan_doc.item_key, page)
+                for row, page in zip(rows, chain(recorder.row_pages, repeat(None)))
+            )
+        export_path = _export(rows, export, project, compress, plan_doc.fields)
         logger.info("parse_complete", items=len(rows), export=str(export_path))
 
-    asyncio.run(_parse())
+    if not profile:
+        asyncio.run(_parse())
+        return
+    profiler = RunProfiler(settings.profile_interval)
+    try:
+        asyncio.run(profiler.run(_parse()))
+    finally:
+        profiler.write(settings.export_dir, f"{project}-run{run_id}.profile")
 
 
 @app.command()
@@ -149,9 +184,16 @@ def resume(project: str = typer.Option(..., help="Project name to resume")):
                 logger.info("no_pending_runs", project=project)
                 return
             plan_doc = PlanDocument.model_validate(run.plan)
-            rows = await _execute_plan(plan_doc, limit=100)
-            for item in rows:
-                session.add(Item(run_id=run.id, data=item))
+            recorder = PageRecorder(session, run, project, get_snapshot_store())
+            try:
+                rows = await execute_plan(plan_doc, limit=100, recorder=recorder)
+            finally:
+                await recorder.close()
+                await close_token_pool()
+            session.add_all(
+                make_item(run.id, item, plan_doc.item_key, page)
+                for item, page in zip(rows, chain(recorder.row_pages, repeat(None)))
+            )
             run.status = "completed"
         logger.info("resume_complete", project=project)
 
@@ -183,7 +225,137 @@ def report(project: str = typer.Option(..., help="Project name to report on")):
     asyncio.run(_report())
 
 
+@app.command("export")
+def export_items(
+    project: str = typer.Option(..., help="Project name"),
+    run: str = typer.Option("latest", help="Run id, 'latest' or 'all'"),
+    format: str = typer.Option("jsonl", "--format", help="Export format: csv|excel|json|jsonl|parquet|arrow"),
+    where: Optional[List[str]] = typer.Option(None, "--where", help="Filter on item fields: key=value, key!=value, key~text"),
+    compress: Optional[str] = typer.Option(None, help=COMPRESS_HELP),
+    out: Optional[str] = typer.Option(None, help="Output file name inside EXPORT_DIR"),
+):
+    """Export stored items straight from the database."""
+
+    configure_logging(get_settings().log_level)
+    if format not in EXPORT_EXTENSIONS:
+        raise typer.BadParameter(f"Unknown export format: {format}")
+    _check_compression(format, compress)
+    try:
+        filters = parse_filters(where)
+    except ValueError as exc:
+        raise typer.BadParameter(str(exc)) from exc
+
+    async def _export_items() -> None:
+        async with session_scope() as session:
+            try:
+                run_ids = await resolve_runs(session, project, run)
+            except ValueError as exc:
+                raise typer.BadParameter(str(exc)) from exc
+            if not run_ids:
+                typer.echo("No matching runs.")
+                return
+            filename = out or f"{project}-{run}.{EXPORT_EXTENSIONS[format]}"
+            export_path = await aexport(stream_items(session, run_ids, filters), format, filename, compress)
+        logger.info("export_complete", project=project, runs=run_ids, export=str(export_path))
+        typer.echo(str(export_path))
+
+    asyncio.run(_export_items())
+
+
+@app.command()
+def diff(
+    project: str = typer.Option(..., help="Project name"),
+    head: str = typer.Option("latest", help="Run to compare: a run id or 'latest'"),
+    base: Optional[str] = typer.Option(None, help="Run to compare against (default: the run before head)"),
+    key: Optional[List[str]] = typer.Option(None, "--key", help="Natural key fields to match items on instead of the plan's item_key"),
+    change: Optional[List[str]] = typer.Option(None, "--change", help="Limit to added|removed|modified"),
+    format: Optional[str] = typer.Option(None, "--format", help="Stream the changes to csv|excel|json|jsonl|parquet|arrow"),
+    compress: Optional[str] = typer.Option(None, help=COMPRESS_HELP),
+    out: Optional[str] = typer.Option(None, help="Output file name inside EXPORT_DIR"),
+):
+    """Show items added, removed or modified between two runs."""
+
+    configure_logging(get_settings().log_level)
+    if format is not None and format not in EXPORT_EXTENSIONS:
+        raise typer.BadParameter(f"Unknown export format: {format}")
+    _check_compression(format, compress)
+    changes = change or list(CHANGES)
+    unknown = [name for name in changes if name not in CHANGES]
+    if unknown:
+        raise typer.BadParameter(f"Unknown change type: {', '.join(unknown)}")
+
+    async def _diff() -> None:
+        async with session_scope() as session:
+            try:
+                head_ids = await resolve_runs(session, project, head)
+                base_ids = await resolve_runs(session, project, base) if base else []
+            except ValueError as exc:
+                raise typer.BadParameter(str(exc)) from exc
+            if not head_ids:
+                typer.echo("No matching runs.")
+                return
+            head_id = head_ids[0]
+            base_id = base_ids[0] if base_ids else await previous_run(session, project, head_id)
+            if base_id is None:
+                typer.echo(f"Run {head_id} has no earlier run to compare with.")
+                return
+            counts = await diff_counts(session, base_id, head_id, key)
+            typer.echo(f"Run {base_id} -> {head_id}: " + " ".join(f"{name}={counts[name]}" for name in changes))
+            if format is not None:
+                filename = out or f"{project}-diff-{base_id}-{head_id}.{EXPORT_EXTENSIONS[format]}"
+                rows = stream_diff(session, base_id, head_id, changes, key_fields=key)
+                export_path = await aexport(rows, format, filename, compress)
+                logger.info("diff_exported", project=project, base=base_id, head=head_id, export=str(export_path))
+                typer.echo(str(export_path))
+
+    asyncio.run(_diff())
+
+
+@app.command()
+def trace(
+    run: int = typer.Option(..., help="Run id to summarize"),
+    file: Optional[Path] = typer.Option(None, help="Span file (default: TRACING_FILE)"),
+):
+    """Summarize where a run's wall time went along its critical path."""
+
+    path = file or get_settings().tracing_file
+    if not path.exists():
+        raise typer.BadParameter(f"No span file at {path}; set TRACING_EXPORTER=file")
+    spans = spans_for_run(load_spans(path), run)
+    if not spans:
+        typer.echo(f"No spans recorded for run {run}.")
+        return
+    rows = summarize(critical_path(spans))
+    total = sum(seconds for _, seconds, _ in rows)
+    typer.echo(f"Run {run}: {total:.3f}s on the critical path across {len(spans)} spans")
+    width = max(len(name) for name, _, _ in rows)
+    for name, seconds, count in rows:
+        typer.echo(f"  {name:<{width}}  {seconds:9.3f}s  {seconds / total * 100 if total else 0:5.1f}%  x{count}")
+
+
+@app.command()
+def rates():
+    """Show the adaptive limiter's current request rate per domain."""
+
+    current = asyncio.run(_rates())
+    if not current:
+        typer.echo("No domains have been rate limited yet.")
+        return
+    width = max(len(domain) for domain in current)
+    for domain, state in current.items():
+        blocked = f"  blocked {state['blocked_for']}s" if state["blocked_for"] else ""
+        latencies = ", ".join(
+            f"{kind} {latency:.0f}ms (baseline {state['baseline_ms'][kind]:.0f}ms)"
+            for kind, latency in state["latency_ms"].items()
+        )
+        typer.echo(f"  {domain:<{width}}  {state['rate']:7.2f} req/s  {latencies or 'no latency yet'}{blocked}")
+
+
+async def _rates() -> dict:
+    return await get_rate_limiter().rates()
+
+
 if __name__ == "__main__":
     app()
 
-__all__ = ["app", "plan", "parse", "resume", "report"]
+__all__ = ["app", "plan", "parse", "resume", "report", "export_items", "diff", "trace", "rates"]
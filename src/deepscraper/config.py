@@ -4,11 +4,13 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import Field
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .utils.fingerprints import choose_profile
+
 
 class Settings(BaseSettings):
     """Central configuration for the scraping platform."""
@@ -32,18 +34,74 @@ class Settings(BaseSettings):
     minio_secret_key: str = Field(alias="MINIO_SECRET_KEY")
     minio_bucket: str = Field(alias="MINIO_BUCKET")
     minio_secure: bool = Field(default=False, alias="MINIO_SECURE")
+    snapshot_backend: str = Field(default="none", alias="SNAPSHOT_BACKEND")
+    snapshot_dir: Path = Field(default=Path("./snapshots"), alias="SNAPSHOT_DIR")
+    snapshot_upload_concurrency: int = Field(default=8, alias="SNAPSHOT_UPLOAD_CONCURRENCY")
+    snapshot_dict_samples: int = Field(default=200, alias="SNAPSHOT_DICT_SAMPLES")
+    job_timeout: int = Field(default=3600, alias="JOB_TIMEOUT")
+    progress_interval: float = Field(default=1.0, alias="PROGRESS_INTERVAL")
+    live_progress: bool = Field(default=True, alias="LIVE_PROGRESS")
+    stream_idle_timeout: float = Field(default=300.0, alias="STREAM_IDLE_TIMEOUT")
+    stream_max_duration: float = Field(default=3600.0, alias="STREAM_MAX_DURATION")
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+    metrics_port: int = Field(default=9108, alias="METRICS_PORT")
+    metrics_dir: Path = Field(default=Path("./.metrics"), alias="METRICS_DIR")
+    tracing_exporter: str = Field(default="none", alias="TRACING_EXPORTER")
+    tracing_file: Path = Field(default=Path("./traces.jsonl"), alias="TRACING_FILE")
+    tracing_endpoint: str = Field(default="http://localhost:4318/v1/traces", alias="TRACING_ENDPOINT")
+    profile_runs: bool = Field(default=False, alias="PROFILE_RUNS")
+    profile_interval: float = Field(default=0.005, alias="PROFILE_INTERVAL")
+    memory_check_interval: float = Field(default=30.0, alias="MEMORY_CHECK_INTERVAL")
+    tracemalloc_top: int = Field(default=10, alias="TRACEMALLOC_TOP")
+    browser_max_rss_mb: int = Field(default=1536, alias="BROWSER_MAX_RSS_MB")
+    browser_recycle_pages: int = Field(default=500, alias="BROWSER_RECYCLE_PAGES")
+    browser_tabs: int = Field(default=4, alias="BROWSER_TABS")
+    browser_cpu_high: float = Field(default=0.85, alias="BROWSER_CPU_HIGH")
+    browser_cpu_low: float = Field(default=0.6, alias="BROWSER_CPU_LOW")
+    browser_cpu_interval: float = Field(default=2.0, alias="BROWSER_CPU_INTERVAL")
+    worker_max_rss_mb: int = Field(default=1024, alias="WORKER_MAX_RSS_MB")
+    worker_max_jobs: int = Field(default=0, alias="WORKER_MAX_JOBS")
+    rate_limit_enabled: bool = Field(default=True, alias="RATE_LIMIT_ENABLED")
+    rate_limit_backend: str = Field(default="redis", alias="RATE_LIMIT_BACKEND")
+    rate_limit_initial: float = Field(default=1.0, alias="RATE_LIMIT_INITIAL")
+    rate_limit_min: float = Field(default=0.1, alias="RATE_LIMIT_MIN")
+    rate_limit_max: float = Field(default=10.0, alias="RATE_LIMIT_MAX")
+    rate_limit_increase: float = Field(default=0.2, alias="RATE_LIMIT_INCREASE")
+    rate_limit_decrease: float = Field(default=0.5, alias="RATE_LIMIT_DECREASE")
+    rate_limit_burst: float = Field(default=2.0, alias="RATE_LIMIT_BURST")
+    rate_limit_latency_factor: float = Field(default=2.0, alias="RATE_LIMIT_LATENCY_FACTOR")
+    rate_limit_cooldown: float = Field(default=5.0, alias="RATE_LIMIT_COOLDOWN")
+    discovery_cache_dir: Path = Field(default=Path("./.discovery-cache"), alias="DISCOVERY_CACHE_DIR")
+    discovery_cache_ttl: float = Field(default=86400.0, alias="DISCOVERY_CACHE_TTL")
+    robots_user_agent: str = Field(default="deepscraper", alias="ROBOTS_USER_AGENT")
+    incremental_max_distance: int = Field(default=0, alias="INCREMENTAL_MAX_DISTANCE")
 
     proxy_list_path: Path = Field(default=Path("./proxies.txt"), alias="PROXY_LIST_PATH")
     playwright_stealth: bool = Field(default=True, alias="PLAYWRIGHT_STEALTH")
+    fingerprint_profile: str = Field(default="random", alias="FINGERPRINT_PROFILE")
     captcha_provider: str = Field(default="twocaptcha", alias="CAPTCHA_PROVIDER")
     captcha_api_key: Optional[str] = Field(default=None, alias="CAPTCHA_API_KEY")
+    captcha_api_keys: Dict[str, str] = Field(default_factory=dict, alias="CAPTCHA_API_KEYS")
+    captcha_prices: Dict[str, float] = Field(default_factory=dict, alias="CAPTCHA_PRICES")
+    captcha_routing: str = Field(default="failover", alias="CAPTCHA_ROUTING")
+    captcha_pool_size: int = Field(default=2, alias="CAPTCHA_POOL_SIZE")
+    captcha_token_ttl: float = Field(default=110.0, alias="CAPTCHA_TOKEN_TTL")
 
     headless: bool = Field(default=True, alias="HEADLESS")
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     page_timeout: int = Field(default=30_000, alias="PAGE_TIMEOUT")
     max_concurrency: int = Field(default=4, alias="MAX_CONCURRENCY")
+    network_capture_max_bytes: int = Field(default=64 * 1024 * 1024, alias="NETWORK_CAPTURE_MAX_BYTES")
     export_dir: Path = Field(default=Path("./exports"), alias="EXPORT_DIR")
 
+    @field_validator("fingerprint_profile")
+    @classmethod
+    def _known_profile(cls, value: str) -> str:
+        # A typo should stop the CLI, API or worker when it starts, not the first browser launch.
+        if value != "random":
+            choose_profile(value)
+        return value
+
     @property
     def proxy_list(self) -> List[str]:
         if not self.proxy_list_path.exists():
@@ -0,0 +1,292 @@
+"""Seed URLs from robots.txt and sitemaps.
+
+robots.txt and every sitemap are fetched once per ``DISCOVERY_CACHE_TTL``
+into ``DISCOVERY_CACHE_DIR`` (one directory per host) and revalidated with
+ETag/Last-Modified afterwards. Bodies are streamed to disk and parsed with
+``iterparse`` straight from the (possibly gzipped) file, clearing each
+``<url>`` as soon as it has been read, so a 50k-URL sitemap never sits in
+memory as a tree. Sitemap indexes are followed breadth-first; children whose
+``lastmod`` predates the plan's cutoff are skipped without being fetched.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, AsyncIterator, Deque, Dict, FrozenSet, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+
+from ..config import get_settings
+from ..logging import get_logger
+from ..planner.schema import DiscoveryInstruction
+from ..utils.ratelimit import RateLimiter, get_rate_limiter
+
+logger = get_logger(__name__)
+
+ROBOTS_MAX_BYTES = 512 * 1024
+MAX_SITEMAP_DEPTH = 4
+YIELD_EVERY = 1000
+
+
+@dataclass
+class SitemapEntry:
+    kind: str  # "url" or "sitemap"
+    loc: str
+    lastmod: Optional[datetime] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """W3C datetime (date, minutes, seconds or fractions; ``Z`` or an offset) as aware UTC."""
+
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+def _open(path: Path) -> IO[bytes]:
+    with path.open("rb") as fh:
+        magic = fh.read(2)
+    return gzip.open(path, "rb") if magic == b"\x1f\x8b" else path.open("rb")
+
+
+def host_aliases(host: str) -> FrozenSet[str]:
+    """``host`` with and without a leading ``www.``; sitemaps routinely list the other one."""
+
+    host = host.lower().rstrip(".")
+    apex = host[4:] if host.startswith("www.") else host
+    return frozenset({host, apex, "www." + apex})
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_sitemap(path: Path) -> Iterator[SitemapEntry]:
+    """Entries of an XML urlset/sitemapindex or a plain-text sitemap, read incrementally."""
+
+    with _open(path) as fh:
+        head = fh.peek(64)[:64] if hasattr(fh, "peek") else b""
+        if head.lstrip()[:1] not in (b"<", b"\xef"):
+            for line in fh:
+                loc = line.decode("utf-8", "replace").strip()
+                if loc:
+                    yield SitemapEntry("url", loc)
+            return
+        root = None
+        for event, elem in ET.iterparse(fh, events=("start", "end")):
+            if root is None:
+                root = elem
+                continue
+            if event != "end" or _local(elem.tag) not in ("url", "sitemap"):
+                continue
+            loc = lastmod = None
+            for child in elem:
+                name = _local(child.tag)
+                if name == "loc":
+                    loc = (child.text or "").strip()
+                elif name == "lastmod":
+                    lastmod = child.text
+            if loc:
+                yield SitemapEntry(_local(elem.tag), loc, parse_lastmod(lastmod))
+            # Drop everything read so far; the root would otherwise keep every <url>.
+            root.clear()
+
+
+class HttpCache:
+    """Body files on disk per URL, revalidated with conditional requests once stale."""
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl: float,
+        client: httpx.AsyncClient,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self._directory = directory
+        self._ttl = ttl
+        self._client = client
+        self._rate_limiter = rate_limiter or get_rate_limiter()
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        host = urlsplit(url).hostname or "_"
+        key = hashlib.sha1(url.encode()).hexdigest()
+        folder = self._directory / host
+        return folder / f"{key}.body", folder / f"{key}.json"
+
+    async def fetch(self, url: str, max_bytes: Optional[int] = None) -> Optional[Path]:
+        """Path of the cached body, or ``None`` when the resource does not exist."""
+
+        body, meta_path = self._paths(url)
+        meta: Dict[str, object] = {}
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if time.time() - float(meta.get("fetched_at", 0)) < self._ttl:
+                return body if meta.get("status") == 200 and body.exists() else None
+        headers = {}
+        if meta.get("status") == 200 and body.exists():
+            if meta.get("etag"):
+                headers["If-None-Match"] = str(meta["etag"])
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = str(meta["last_modified"])
+
+        body.parent.mkdir(parents=True, exist_ok=True)
+        tmp = body.with_suffix(".part")
+        await self._rate_limiter.acquire(url)
+        started = time.monotonic()
+        try:
+            async with self._client.stream("GET", url, headers=headers) as response:
+                status = response.status_code
+                if status == 200:
+                    written = 0
+                    with tmp.open("wb") as fh:
+                        # Raw bytes: gzip sitemaps stay compressed on disk and are inflated while parsing.
+                        async for chunk in response.aiter_raw():
+                            fh.write(chunk)
+                            written += len(chunk)
+                            if max_bytes is not None and written >= max_bytes:
+                                break
+                    tmp.replace(body)
+                response_headers = response.headers
+        except httpx.HTTPError as exc:
+            await self._rate_limiter.feedback(url, error=True)
+            logger.warning("discovery_fetch_failed", url=url, error=str(exc))
+            return body if body.exists() and meta.get("status") == 200 else None
+        await self._rate_limiter.feedback(
+            url, status=status, latency=time.monotonic() - started, headers=response_headers
+        )
+        if status == 304:
+            status = 200
+        else:
+            meta = {"etag": response_headers.get("etag"), "last_modified": response_headers.get("last-modified")}
+        meta.update({"url": url, "status": status, "fetched_at": time.time()})
+        meta_path.write_text(json.dumps(meta), encoding="utf-8")
+        logger.info("discovery_fetch", url=url, status=status, cached=bool(headers) and status == 200)
+        return body if status == 200 else None
+
+
+class SitemapDiscovery:
+    """Yields page URLs for a plan from robots.txt-declared and configured sitemaps."""
+
+    def __init__(
+        self,
+        instruction: DiscoveryInstruction,
+        client: Optional[httpx.AsyncClient] = None,
+        cache_dir: Optional[Path] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        settings = get_settings()
+        self._instruction = instruction
+        self._agent = settings.robots_user_agent
+        self._own_client = client is None
+        self._client = client or httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=30.0,
+            headers={"User-Agent": f"Mozilla/5.0 (compatible; {self._agent})", "Accept-Encoding": "identity"},
+        )
+        self._cache = HttpCache(
+            cache_dir or settings.discovery_cache_dir, settings.discovery_cache_ttl, self._client, rate_limiter
+        )
+        self._include = [re.compile(pattern) for pattern in instruction.include]
+        self._exclude = [re.compile(pattern) for pattern in instruction.exclude]
+        self._robots: Dict[str, RobotFileParser] = {}
+
+    async def robots(self, origin: str) -> RobotFileParser:
+        parser = self._robots.get(origin)
+        if parser is None:
+            parser = self._robots[origin] = RobotFileParser(origin + "/robots.txt")
+            path = await self._cache.fetch(origin + "/robots.txt", max_bytes=ROBOTS_MAX_BYTES)
+            lines = path.read_bytes()[:ROBOTS_MAX_BYTES].decode("utf-8", "replace").splitlines() if path else []
+            # A missing robots.txt allows everything, which is what parsing no lines gives.
+            parser.parse(lines)
+        return parser
+
+    def _wanted(self, entry: SitemapEntry, hosts: FrozenSet[str], robots: RobotFileParser) -> bool:
+        if urlsplit(entry.loc).hostname not in hosts:
+            return False
+        cutoff = self._instruction.lastmod_after
+        if cutoff is not None and entry.lastmod is not None and entry.lastmod < _aware(cutoff):
+            return False
+        if self._include and not any(pattern.search(entry.loc) for pattern in self._include):
+            return False
+        if any(pattern.search(entry.loc) for pattern in self._exclude):
+            return False
+        return not self._instruction.respect_robots or robots.can_fetch(self._agent, entry.loc)
+
+    async def discover(self, seed_url: str) -> AsyncIterator[str]:
+        parts = urlsplit(seed_url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        robots = await self.robots(origin)
+        declared = list(robots.site_maps() or []) + [urljoin(origin + "/", url) for url in self._instruction.sitemaps]
+        queue: Deque[Tuple[str, int]] = deque((url, 0) for url in (declared or [origin + "/sitemap.xml"]))
+        seen = {url for url, _ in queue}
+        cutoff = _aware(self._instruction.lastmod_after) if self._instruction.lastmod_after else None
+        hosts = host_aliases(parts.hostname or "")
+        found = 0
+        while queue:
+            sitemap_url, depth = queue.popleft()
+            path = await self._cache.fetch(sitemap_url)
+            if path is None:
+                continue
+            try:
+                for index, entry in enumerate(iter_sitemap(path)):
+                    if index % YIELD_EVERY == YIELD_EVERY - 1:
+                        await asyncio.sleep(0)
+                    if entry.kind == "sitemap":
+                        stale = cutoff is not None and entry.lastmod is not None and entry.lastmod < cutoff
+                        if depth + 1 < MAX_SITEMAP_DEPTH and entry.loc not in seen and not stale:
+                            seen.add(entry.loc)
+                            queue.append((entry.loc, depth + 1))
+                    elif self._wanted(entry, hosts, robots):
+                        yield entry.loc
+                        found += 1
+                        if found >= self._instruction.max_urls:
+                            return
+            except (ET.ParseError, OSError, EOFError) as exc:
+                logger.warning("sitemap_parse_failed", url=sitemap_url, error=str(exc))
+        logger.info("discovery_complete", origin=origin, urls=found, sitemaps=len(seen))
+
+    async def aclose(self) -> None:
+        if self._own_client:
+            await self._client.aclose()
+
+    async def __aenter__(self) -> "SitemapDiscovery":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        await self.aclose()
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def discover_urls(instruction: DiscoveryInstruction, seed_url: str) -> List[str]:
+    async with SitemapDiscovery(instruction) as discovery:
+        return [url async for url in discovery.discover(seed_url)]
+
+
+__all__ = [
+    "HttpCache",
+    "SitemapDiscovery",
+    "SitemapEntry",
+    "discover_urls",
+    "host_aliases",
+    "iter_sitemap",
+    "parse_lastmod",
+]
@@ -0,0 +1,67 @@
+"""URLs waiting to be visited by a run."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import AsyncIterable, Deque, Iterable, Iterator, Optional, Tuple
+
+from .seen import SeenSet
+from .urls import normalize_url
+
+
+class Frontier:
+    """FIFO of ``(url, depth)`` in which every canonical URL is accepted at most once.
+
+    URLs are normalized before the duplicate check, so tracking parameters,
+    query order, fragments and default ports do not cause revisits. Accepted
+    URLs are remembered in a :class:`SeenSet` rather than an in-memory set.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, seen: Optional[SeenSet] = None) -> None:
+        self._queue: Deque[Tuple[str, int]] = deque()
+        self._seen = seen if seen is not None else SeenSet()
+        self._max_size = max_size
+        self.accepted = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, url: str) -> bool:
+        canonical = normalize_url(url)
+        return canonical is not None and canonical in self._seen
+
+    def add(self, url: str, depth: int = 0) -> bool:
+        """Queue ``url`` unless it was seen before, is not HTTP(S) or the frontier is full."""
+
+        if self._max_size is not None and self.accepted >= self._max_size:
+            return False
+        canonical = normalize_url(url)
+        if canonical is None or not self._seen.add(canonical):
+            return False
+        self.accepted += 1
+        self._queue.append((canonical, depth))
+        return True
+
+    def extend(self, urls: Iterable[str], depth: int = 0) -> int:
+        return sum(self.add(url, depth) for url in urls)
+
+    async def feed(self, urls: AsyncIterable[str], depth: int = 0) -> int:
+        added = 0
+        async for url in urls:
+            added += self.add(url, depth)
+        return added
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        return self._queue.popleft() if self._queue else None
+
+    def drain(self) -> Iterator[Tuple[str, int]]:
+        """Yield queued ``(url, depth)`` in order, including ones added while iterating."""
+
+        while self._queue:
+            yield self._queue.popleft()
+
+    def close(self) -> None:
+        self._seen.close()
+
+
+__all__ = ["Frontier"]
@@ -0,0 +1,147 @@
+"""Compact "have we visited this URL" index for large crawls.
+
+A scalable bloom filter answers most lookups from a few bits per URL. Every
+accepted URL is also written as a 16-byte BLAKE2 digest to a SQLite table on
+disk, which is consulted only when the filter says "maybe" — so false
+positives never drop a page, and memory stays at a couple of megabytes per
+million URLs instead of holding every URL string in a Python ``set``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+DIGEST_SIZE = 16
+COMMIT_EVERY = 10000
+
+
+def url_digest(url: str) -> bytes:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+def _hashes(digest: bytes) -> Tuple[int, int]:
+    # Kirsch–Mitzenmacher: two independent halves of the digest generate all k positions.
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """Fixed-capacity bloom filter over precomputed digests."""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be positive and error_rate in (0, 1)")
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: bytes) -> List[int]:
+        first, second = _hashes(digest)
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def add(self, digest: bytes) -> None:
+        for pos in self._positions(digest):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class ScalableBloomFilter:
+    """Chain of bloom filters that grows geometrically as it fills.
+
+    Each new stage doubles the capacity and halves the error rate, keeping the
+    compound false-positive rate below ``error_rate`` however many URLs arrive.
+    """
+
+    def __init__(self, initial_capacity: int = 100000, error_rate: float = 0.001) -> None:
+        self._error_rate = error_rate
+        self._stages: List[BloomFilter] = [BloomFilter(initial_capacity, error_rate / 2)]
+
+    def __contains__(self, digest: bytes) -> bool:
+        return any(digest in stage for stage in self._stages)
+
+    def __len__(self) -> int:
+        return sum(stage.count for stage in self._stages)
+
+    def add(self, digest: bytes) -> None:
+        stage = self._stages[-1]
+        if stage.count >= stage.capacity:
+            stage = BloomFilter(stage.capacity * 2, self._error_rate / 2 ** (len(self._stages) + 1))
+            self._stages.append(stage)
+        stage.add(digest)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(stage.nbytes for stage in self._stages)
+
+
+class SeenSet:
+    """Set of URLs with bloom-filter lookups and an exact on-disk fallback.
+
+    ``path`` of ``None`` uses a private temporary SQLite file that is removed
+    on :meth:`close`; pass a path to keep the index between runs.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        capacity: int = 100000,
+        error_rate: float = 0.001,
+    ) -> None:
+        self._bloom = ScalableBloomFilter(capacity, error_rate)
+        self._db = sqlite3.connect("" if path is None else str(path))
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+        self._pending = 0
+        self.false_positives = 0
+        for (digest,) in self._db.execute("SELECT digest FROM seen"):
+            self._bloom.add(digest)
+
+    def __len__(self) -> int:
+        return len(self._bloom)
+
+    def _stored(self, digest: bytes) -> bool:
+        return self._db.execute("SELECT 1 FROM seen WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def __contains__(self, url: str) -> bool:
+        digest = url_digest(url)
+        return digest in self._bloom and self._stored(digest)
+
+    def add(self, url: str) -> bool:
+        """Record ``url``; ``False`` if it had been recorded before."""
+
+        digest = url_digest(url)
+        if digest in self._bloom:
+            if self._stored(digest):
+                return False
+            self.false_positives += 1
+        self._bloom.add(digest)
+        self._db.execute("INSERT INTO seen (digest) VALUES (?)", (digest,))
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._db.commit()
+            self._pending = 0
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return self._bloom.nbytes
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+
+__all__ = ["BloomFilter", "ScalableBloomFilter", "SeenSet", "url_digest"]
@@ -0,0 +1,126 @@
+"""Canonical URL form used to decide whether two links point at the same page."""
+
+from __future__ import annotations
+
+import re
+from posixpath import normpath
+from typing import FrozenSet, Iterable, List, Optional, Pattern
+from urllib.parse import parse_qsl, quote, urlencode, urljoin, urlsplit, urlunsplit
+
+TRACKING_PARAMS: FrozenSet[str] = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "gbraid",
+        "wbraid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "_ga",
+        "_gl",
+        "_hsenc",
+        "_hsmi",
+        "mkt_tok",
+        "ref_src",
+        "spm",
+    }
+)
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Characters that never need escaping in a path; anything else is percent-encoded canonically.
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+_ESCAPE = re.compile(r"%[0-9A-Fa-f]{2}")
+
+
+def _is_tracking(name: str, extra: FrozenSet[str]) -> bool:
+    lowered = name.lower()
+    return lowered in TRACKING_PARAMS or lowered in extra or lowered.startswith(TRACKING_PREFIXES)
+
+
+def _normalize_escapes(path: str) -> str:
+    """Encode ``path`` canonically without changing what it addresses.
+
+    Escapes of unreserved characters are decoded and the rest upper-cased;
+    reserved escapes such as ``%2F`` stay encoded because decoding them would
+    turn one path segment into two. Raw characters outside ``_PATH_SAFE``
+    (spaces, non-ASCII, a stray ``%``) are percent-encoded.
+    """
+
+    chunks: List[str] = []
+    position = 0
+    for match in _ESCAPE.finditer(path):
+        chunks.append(quote(path[position : match.start()], safe=_PATH_SAFE))
+        char = chr(int(match.group()[1:], 16))
+        chunks.append(char if char in _UNRESERVED else match.group().upper())
+        position = match.end()
+    chunks.append(quote(path[position:], safe=_PATH_SAFE))
+    return "".join(chunks)
+
+
+def normalize_url(url: str, base: Optional[str] = None, drop_params: Iterable[str] = ()) -> Optional[str]:
+    """Canonical form of ``url`` (resolved against ``base``), or ``None`` for non-HTTP or malformed links.
+
+    Lower-cases scheme and host, drops default ports, fragments and tracking
+    parameters, resolves ``.``/``..`` segments, normalizes the path's
+    percent-encoding and sorts the query string.
+    """
+
+    try:
+        if base is not None:
+            url = urljoin(base, url.strip())
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        # Malformed authority: bad port, unbalanced IPv6 brackets and the like.
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"
+    else:
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = _normalize_escapes(parts.path or "/")
+    trailing = path.endswith("/")
+    path = normpath(path)
+    if path.startswith("//"):
+        path = "/" + path.lstrip("/")
+    if trailing and path != "/":
+        path += "/"
+
+    extra = frozenset(name.lower() for name in drop_params)
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(name, extra)
+    )
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+class UrlFilter:
+    """Include/exclude regexes plus an optional same-host restriction."""
+
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = (), host: Optional[str] = None) -> None:
+        self._include: List[Pattern[str]] = [re.compile(pattern) for pattern in include]
+        self._exclude: List[Pattern[str]] = [re.compile(pattern) for pattern in exclude]
+        self._host = host
+
+    def __call__(self, url: str) -> bool:
+        if self._host is not None and urlsplit(url).hostname != self._host:
+            return False
+        if self._include and not any(pattern.search(url) for pattern in self._include):
+            return False
+        return not any(pattern.search(url) for pattern in self._exclude)
+
+
+__all__ = ["TRACKING_PARAMS", "UrlFilter", "normalize_url"]
@@ -2,26 +2,17 @@
 
 from __future__ import annotations
 
-import csv
 from pathlib import Path
-from typing import Iterable, Mapping
+from typing import Any, Iterable, Mapping, Optional
 
-from ..config import get_settings
+from .streaming import CsvWriter, output_path, write_rows
 
 
-def export_to_csv(rows: Iterable[Mapping[str, str]], filename: str | None = None) -> Path:
-    settings = get_settings()
-    settings.export_dir.mkdir(parents=True, exist_ok=True)
-    output = settings.export_dir / (filename or "export.csv")
-    rows = list(rows)
-    if not rows:
-        output.write_text("")
-        return output
-    with output.open("w", newline="", encoding="utf-8") as fh:
-        writer = csv.DictWriter(fh, fieldnames=list(rows[0].keys()))
-        writer.writeheader()
-        writer.writerows(rows)
-    return output
+def export_to_csv(
+    rows: Iterable[Mapping[str, Any]], filename: str | None = None, compression: Optional[str] = None
+) -> Path:
+    output = output_path(filename, "export.csv", compression)
+    return write_rows(CsvWriter(output, compression), rows)
 
 
 __all__ = ["export_to_csv"]
@@ -1,22 +1,108 @@
-"""Excel exporter."""
+"""Excel exporter.
+
+Rows are streamed through an openpyxl write-only workbook, which serialises
+each row as it is appended instead of keeping the sheet in memory. When a sheet
+reaches the xlsx row limit the export continues on a new sheet with the same
+header.
+"""
 
 from __future__ import annotations
 
+import json
+import tempfile
 from pathlib import Path
-from typing import Iterable, Mapping
+from typing import Any, Iterable, List, Mapping, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from .streaming import BUFFER_SIZE, RowWriter, output_path, write_rows
+
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def _cell(value: Any) -> Any:
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value, ensure_ascii=False)
+    text = value if isinstance(value, str) else str(value)
+    return ILLEGAL_CHARACTERS_RE.sub("", text) if ILLEGAL_CHARACTERS_RE.search(text) else text
+
+
+class ExcelWriter(RowWriter):
+    """Write-only xlsx writer with automatic sheet rollover.
+
+    With ``fieldnames`` the rows go straight into the workbook. Without them
+    the header is only known once every row has been seen, so rows are first
+    spooled to a temporary JSON Lines file and written on close.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fieldnames: Optional[Sequence[str]] = None,
+        max_rows: int = EXCEL_MAX_ROWS,
+    ) -> None:
+        self.path = path
+        self.compression = None
+        self.rows = 0
+        self.sheets = 0
+        self._max_rows = max_rows
+        self._workbook = Workbook(write_only=True)
+        self._sheet: Any = None
+        self._sheet_rows = 0
+        self._fieldnames: List[str] = list(fieldnames or [])
+        self._spool = None if fieldnames else tempfile.TemporaryFile("w+", encoding="utf-8", buffering=BUFFER_SIZE)
+        self._known = set(self._fieldnames)
+
+    def _append(self, row: Mapping[str, Any]) -> None:
+        if self._sheet is None or self._sheet_rows >= self._max_rows:
+            self.sheets += 1
+            self._sheet = self._workbook.create_sheet(f"Sheet{self.sheets}")
+            self._sheet.append(self._fieldnames)
+            self._sheet_rows = 1
+        self._sheet.append([_cell(row.get(name)) for name in self._fieldnames])
+        self._sheet_rows += 1
+
+    def write(self, row: Mapping[str, Any]) -> None:
+        self.rows += 1
+        if self._spool is None:
+            self._append(row)
+            return
+        for key in row:
+            if key not in self._known:
+                self._known.add(key)
+                self._fieldnames.append(key)
+        self._spool.write(json.dumps(row, ensure_ascii=False, default=str))
+        self._spool.write("\n")
 
-import pandas as pd
+    def close(self) -> Path:
+        if self._spool is not None:
+            try:
+                self._spool.seek(0)
+                for line in self._spool:
+                    self._append(json.loads(line))
+            finally:
+                self._spool.close()
+        if self._sheet is None:
+            self._workbook.create_sheet("Sheet1")
+        self._workbook.save(self.path)
+        return self.path
 
-from ..config import get_settings
+    def abort(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+        self.path.unlink(missing_ok=True)
 
 
-def export_to_excel(rows: Iterable[Mapping[str, str]], filename: str | None = None) -> Path:
-    settings = get_settings()
-    settings.export_dir.mkdir(parents=True, exist_ok=True)
-    output = settings.export_dir / (filename or "export.xlsx")
-    df = pd.DataFrame(list(rows))
-    df.to_excel(output, index=False)
-    return output
+def export_to_excel(
+    rows: Iterable[Mapping[str, Any]],
+    filename: str | None = None,
+    fieldnames: Optional[Sequence[str]] = None,
+) -> Path:
+    output = output_path(filename, "export.xlsx")
+    return write_rows(ExcelWriter(output, fieldnames), rows)
 
 
-__all__ = ["export_to_excel"]
+__all__ = ["EXCEL_MAX_ROWS", "ExcelWriter", "export_to_excel"]
@@ -2,20 +2,17 @@
 
 from __future__ import annotations
 
-import json
 from pathlib import Path
-from typing import Iterable, Mapping
+from typing import Any, Iterable, Mapping, Optional
 
-from ..config import get_settings
+from .streaming import JsonArrayWriter, output_path, write_rows
 
 
-def export_to_json(rows: Iterable[Mapping[str, str]], filename: str | None = None) -> Path:
-    settings = get_settings()
-    settings.export_dir.mkdir(parents=True, exist_ok=True)
-    output = settings.export_dir / (filename or "export.json")
-    data = list(rows)
-    output.write_text(json.dumps(data, ensure_ascii=False, indent=2))
-    return output
+def export_to_json(
+    rows: Iterable[Mapping[str, Any]], filename: str | None = None, compression: Optional[str] = None
+) -> Path:
+    output = output_path(filename, "export.json", compression)
+    return write_rows(JsonArrayWriter(output, compression), rows)
 
 
 __all__ = ["export_to_json"]
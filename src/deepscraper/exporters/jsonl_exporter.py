@@ -0,0 +1,18 @@
+"""JSON Lines exporter."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Optional
+
+from .streaming import JsonLinesWriter, output_path, write_rows
+
+
+def export_to_jsonl(
+    rows: Iterable[Mapping[str, Any]], filename: str | None = None, compression: Optional[str] = None
+) -> Path:
+    output = output_path(filename, "export.jsonl", compression)
+    return write_rows(JsonLinesWriter(output, compression), rows)
+
+
+__all__ = ["export_to_jsonl"]
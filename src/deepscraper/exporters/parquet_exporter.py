@@ -0,0 +1,350 @@
+"""Columnar Parquet and Arrow IPC exporters.
+
+Rows are buffered into row groups of ``row_group_size`` and written as they
+fill up, so memory stays bounded by one row group. Column types come from the
+plan's declared :class:`~deepscraper.planner.schema.ExtractionField` types and
+are inferred from the first row group otherwise. When a later row group brings
+new keys or values an inferred type cannot hold, the schema is widened and the
+row groups written so far are rewritten under it, one at a time; values that
+do not parse as a declared type are an error. Requires ``pyarrow``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from ..logging import get_logger
+from ..planner.schema import ExtractionField
+from .streaming import RowWriter, output_path, write_rows
+
+logger = get_logger(__name__)
+
+DEFAULT_ROW_GROUP_SIZE = 50_000
+DEFAULT_COMPRESSION = "zstd"
+
+
+def _pyarrow():  # type: ignore[no-untyped-def]
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("Parquet/Arrow export requires the 'pyarrow' package") from exc
+    return pyarrow
+
+
+def column_types(fields: Iterable[ExtractionField]) -> Dict[str, str]:
+    """Declared column types of a plan's fields."""
+
+    return {field.name: field.type for field in fields if field.type}
+
+
+def _coerce(value: Any, declared: str) -> Any:
+    """``value`` as ``declared``; raises ``ValueError`` when it does not parse."""
+
+    if value is None or value == "":
+        return None
+    try:
+        if declared == "integer":
+            return int(value) if not isinstance(value, str) else int(float(value.replace(",", "").strip()))
+        if declared == "float":
+            return float(value) if not isinstance(value, str) else float(value.replace(",", "").strip())
+        if declared == "boolean":
+            if isinstance(value, str):
+                return value.strip().lower() in ("1", "true", "yes", "y")
+            return bool(value)
+        if declared == "datetime":
+            return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"{value!r} is not a valid {declared}") from exc
+    return value if isinstance(value, str) else str(value)
+
+
+def _fits(value: Any, inferred: str) -> bool:
+    """Whether an inferred column of type ``inferred`` holds ``value`` without loss."""
+
+    if value is None or inferred == "string":
+        return True
+    if inferred == "boolean":
+        return isinstance(value, bool)
+    if isinstance(value, bool):
+        return False
+    if inferred == "integer":
+        return isinstance(value, int)
+    return isinstance(value, (int, float))
+
+
+class ColumnarWriter(RowWriter, ABC):
+    """Shared row-group buffering and schema evolution for the Parquet and Arrow IPC writers."""
+
+    FORMAT = ""
+    COMPRESSIONS: Tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        path: Path,
+        compression: Optional[str] = DEFAULT_COMPRESSION,
+        declared_types: Optional[Mapping[str, str]] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    ) -> None:
+        compression = compression or DEFAULT_COMPRESSION
+        if compression not in self.COMPRESSIONS:
+            raise ValueError(
+                f"Unsupported {self.FORMAT} compression: {compression}; expected one of {', '.join(self.COMPRESSIONS)}"
+            )
+        self.path = path
+        self.compression = compression
+        self.rows = 0
+        self._pa = _pyarrow()
+        self._declared = dict(declared_types or {})
+        self._inferred: Dict[str, str] = {}
+        self._row_group_size = row_group_size
+        self._buffer: List[Mapping[str, Any]] = []
+        self._schema: Any = None
+        self._written = 0
+
+    def _arrow_type(self, declared: str) -> Any:
+        pa = self._pa
+        return {
+            "string": pa.string(),
+            "integer": pa.int64(),
+            "float": pa.float64(),
+            "boolean": pa.bool_(),
+            "datetime": pa.timestamp("us"),
+        }[declared]
+
+    def _infer_field(self, name: str, values: List[Any]) -> Any:
+        pa = self._pa
+        try:
+            inferred = pa.array(values).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            inferred = pa.string()
+        if pa.types.is_null(inferred):
+            inferred = pa.string()
+        kind = self._declared_name(inferred)
+        if kind:
+            self._inferred[name] = kind
+        return pa.field(name, inferred)
+
+    def _infer_schema(self, batch: List[Mapping[str, Any]]) -> Any:
+        pa = self._pa
+        names: Dict[str, None] = dict.fromkeys(self._declared)
+        for row in batch:
+            names.update(dict.fromkeys(row))
+        fields = []
+        for name in names:
+            if name in self._declared:
+                fields.append(pa.field(name, self._arrow_type(self._declared[name])))
+            else:
+                fields.append(self._infer_field(name, [row.get(name) for row in batch]))
+        return pa.schema(fields)
+
+    def _declared_name(self, arrow_type: Any) -> Optional[str]:
+        types = self._pa.types
+        if types.is_string(arrow_type):
+            return "string"
+        if types.is_integer(arrow_type):
+            return "integer"
+        if types.is_floating(arrow_type):
+            return "float"
+        if types.is_boolean(arrow_type):
+            return "boolean"
+        return None
+
+    def _widened(self, batch: List[Mapping[str, Any]]) -> Optional[Any]:
+        """The schema ``batch`` needs, or ``None`` when the current one holds it."""
+
+        pa = self._pa
+        fields = list(self._schema)
+        changed = False
+        for index, field in enumerate(fields):
+            kind = self._inferred.get(field.name)
+            if kind is None or field.name in self._declared:
+                continue
+            values = [row.get(field.name) for row in batch]
+            if all(_fits(value, kind) for value in values):
+                continue
+            wider = "float" if kind == "integer" and all(_fits(value, "float") for value in values) else "string"
+            self._inferred[field.name] = wider
+            fields[index] = pa.field(field.name, self._arrow_type(wider))
+            changed = True
+        known = set(self._schema.names)
+        new_names: Dict[str, None] = {}
+        for row in batch:
+            new_names.update((key, None) for key in row if key not in known)
+        for name in new_names:
+            fields.append(self._infer_field(name, [row.get(name) for row in batch]))
+            changed = True
+        return pa.schema(fields) if changed else None
+
+    def _evolve(self, schema: Any) -> None:
+        previous_types = {field.name: field.type for field in self._schema}
+        changed = {field.name: str(field.type) for field in schema if previous_types.get(field.name) != field.type}
+        logger.info("columnar_export_schema_widened", path=str(self.path), columns=changed, rewritten_rows=self._written)
+        self._close()
+        self._schema = schema
+        if not self._written:
+            self._open(schema)
+            return
+        previous = self.path.with_name(self.path.name + ".previous")
+        self.path.replace(previous)
+        self._open(schema)
+        try:
+            for batch in self._read_batches(previous):
+                self._write_table(self._cast(self._pa.Table.from_batches([batch])))
+        finally:
+            previous.unlink()
+
+    def _cast(self, table: Any) -> Any:
+        pa = self._pa
+        columns = [
+            table.column(field.name).cast(field.type) if field.name in table.column_names
+            else pa.nulls(table.num_rows, field.type)
+            for field in self._schema
+        ]
+        return pa.Table.from_arrays(columns, schema=self._schema)
+
+    def _table(self, batch: List[Mapping[str, Any]]) -> Any:
+        if self._schema is None:
+            self._schema = self._infer_schema(batch)
+            self._open(self._schema)
+        else:
+            widened = self._widened(batch)
+            if widened is not None:
+                self._evolve(widened)
+        columns = {}
+        for name in self._schema.names:
+            values = [row.get(name) for row in batch]
+            kind = self._declared.get(name) or self._inferred.get(name)
+            if kind is not None:
+                try:
+                    values = [_coerce(value, kind) for value in values]
+                except ValueError as exc:
+                    raise ValueError(f"Column {name!r} of {self.path}: {exc}") from exc
+            columns[name] = values
+        return self._pa.table(columns, schema=self._schema)
+
+    def write(self, row: Mapping[str, Any]) -> None:
+        self._buffer.append(row)
+        self.rows += 1
+        if len(self._buffer) >= self._row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        table = self._table(self._buffer)
+        self._write_table(table)
+        self._written += table.num_rows
+        self._buffer = []
+
+    def close(self) -> Path:
+        self._flush()
+        if self._schema is None:
+            self._schema = self._pa.schema([])
+            self._open(self._schema)
+        self._close()
+        return self.path
+
+    def abort(self) -> None:
+        if self._schema is not None:
+            with contextlib.suppress(Exception):
+                self._close()
+        self.path.unlink(missing_ok=True)
+
+    @abstractmethod
+    def _open(self, schema: Any) -> None:
+        """Start a file at ``self.path`` with ``schema``."""
+
+    @abstractmethod
+    def _write_table(self, table: Any) -> None:
+        """Append ``table`` as one or more row groups."""
+
+    @abstractmethod
+    def _close(self) -> None:
+        """Finish the file."""
+
+    @abstractmethod
+    def _read_batches(self, path: Path) -> Iterator[Any]:
+        """Record batches of a finished file, one row group at a time."""
+
+
+class ParquetWriter(ColumnarWriter):
+    FORMAT = "parquet"
+    COMPRESSIONS = ("none", "snappy", "gzip", "brotli", "lz4", "zstd")
+
+    def _open(self, schema: Any) -> None:
+        self._writer = self._pa.parquet.ParquetWriter(
+            str(self.path), schema, compression=self.compression, use_dictionary=True
+        )
+
+    def _write_table(self, table: Any) -> None:
+        self._writer.write_table(table, row_group_size=self._row_group_size)
+
+    def _close(self) -> None:
+        self._writer.close()
+
+    def _read_batches(self, path: Path) -> Iterator[Any]:
+        with self._pa.parquet.ParquetFile(str(path)) as parquet:
+            for index in range(parquet.num_row_groups):
+                yield from parquet.read_row_group(index).to_batches()
+
+
+class ArrowWriter(ColumnarWriter):
+    FORMAT = "arrow"
+    # The IPC format only compresses buffers with LZ4 frames or zstd.
+    COMPRESSIONS = ("none", "lz4", "zstd")
+
+    def _open(self, schema: Any) -> None:
+        compression = None if self.compression == "none" else self.compression
+        options = self._pa.ipc.IpcWriteOptions(compression=compression)
+        self._writer = self._pa.ipc.new_file(str(self.path), schema, options=options)
+
+    def _write_table(self, table: Any) -> None:
+        self._writer.write_table(table, max_chunksize=self._row_group_size)
+
+    def _close(self) -> None:
+        self._writer.close()
+
+    def _read_batches(self, path: Path) -> Iterator[Any]:
+        with self._pa.memory_map(str(path)) as source:
+            reader = self._pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index)
+
+
+def export_to_parquet(
+    rows: Iterable[Mapping[str, Any]],
+    filename: str | None = None,
+    declared_types: Optional[Mapping[str, str]] = None,
+    compression: Optional[str] = DEFAULT_COMPRESSION,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> Path:
+    output = output_path(filename, "export.parquet")
+    return write_rows(ParquetWriter(output, compression, declared_types, row_group_size), rows)
+
+
+def export_to_arrow(
+    rows: Iterable[Mapping[str, Any]],
+    filename: str | None = None,
+    declared_types: Optional[Mapping[str, str]] = None,
+    compression: Optional[str] = DEFAULT_COMPRESSION,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> Path:
+    output = output_path(filename, "export.arrow")
+    return write_rows(ArrowWriter(output, compression, declared_types, row_group_size), rows)
+
+
+__all__ = [
+    "DEFAULT_COMPRESSION",
+    "ArrowWriter",
+    "ColumnarWriter",
+    "ParquetWriter",
+    "column_types",
+    "export_to_arrow",
+    "export_to_parquet",
+]
@@ -0,0 +1,223 @@
+"""Incremental row writers shared by the exporters.
+
+Writers accept rows one at a time and write them through a large buffer, so
+exports of any size run in constant memory. Output can be compressed with
+gzip or, when the ``zstandard`` package is installed, zstd.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, AsyncIterable, Dict, Iterable, List, Mapping, Optional, TextIO, Type, Union
+
+from ..config import get_settings
+
+BUFFER_SIZE = 1 << 20
+COMPRESSION_SUFFIXES: Dict[Optional[str], str] = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+Rows = Union[Iterable[Mapping[str, Any]], AsyncIterable[Mapping[str, Any]]]
+
+
+def output_path(filename: Optional[str], default: str, compression: Optional[str] = None) -> Path:
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    settings = get_settings()
+    settings.export_dir.mkdir(parents=True, exist_ok=True)
+    name = filename or default
+    suffix = COMPRESSION_SUFFIXES[compression]
+    if suffix and not name.endswith(suffix):
+        name += suffix
+    return settings.export_dir / name
+
+
+def open_text(path: Path, compression: Optional[str] = None) -> TextIO:
+    """Open ``path`` for buffered text writing with optional compression."""
+
+    if compression is None:
+        return path.open("w", encoding="utf-8", newline="", buffering=BUFFER_SIZE)
+    if compression == "gzip":
+        raw: Any = gzip.GzipFile(filename=str(path), mode="wb", compresslevel=6)
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("zstd compression requires the 'zstandard' package") from exc
+        raw = zstandard.ZstdCompressor(level=3).stream_writer(path.open("wb"), closefd=True)
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return io.TextIOWrapper(io.BufferedWriter(raw, BUFFER_SIZE), encoding="utf-8", newline="")
+
+
+class RowWriter:
+    """Base class for incremental exporters; use as a context manager.
+
+    Leaving the ``with`` block normally finalizes the file with :meth:`close`;
+    an exception, raised by the body or by ``close`` itself, calls
+    :meth:`abort` instead so no truncated export is left behind.
+    """
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        self.path = path
+        self.compression = compression
+        self.rows = 0
+        self._fh = open_text(path, compression)
+
+    def write(self, row: Mapping[str, Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> Path:
+        self._fh.close()
+        return self.path
+
+    def abort(self) -> None:
+        """Release the output without finalizing it and remove the partial file."""
+
+        with contextlib.suppress(Exception):
+            self._fh.close()
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        if exc_type is not None:
+            self.abort()
+            return
+        try:
+            self.close()
+        except BaseException:
+            self.abort()
+            raise
+
+
+class JsonLinesWriter(RowWriter):
+    def write(self, row: Mapping[str, Any]) -> None:
+        self._fh.write(json.dumps(row, ensure_ascii=False, default=str))
+        self._fh.write("\n")
+        self.rows += 1
+
+
+class JsonArrayWriter(RowWriter):
+    def write(self, row: Mapping[str, Any]) -> None:
+        self._fh.write(",\n  " if self.rows else "[\n  ")
+        self._fh.write(json.dumps(row, ensure_ascii=False, default=str))
+        self.rows += 1
+
+    def close(self) -> Path:
+        self._fh.write("\n]\n" if self.rows else "[]\n")
+        return super().close()
+
+
+class CsvWriter(RowWriter):
+    """CSV writer whose header grows as new keys show up.
+
+    Rows are spooled to a temporary file while the header is still growing;
+    on close the final header is written followed by the spooled rows, padded
+    to the full width if columns were added after they were written.
+    """
+
+    def __init__(self, path: Path, compression: Optional[str] = None) -> None:
+        super().__init__(path, compression)
+        self.fieldnames: List[str] = []
+        self._known: set[str] = set()
+        self._width_changed = False
+        self._spool = tempfile.TemporaryFile("w+", encoding="utf-8", newline="", buffering=BUFFER_SIZE)
+        self._writer = csv.writer(self._spool)
+
+    def write(self, row: Mapping[str, Any]) -> None:
+        for key in row:
+            if key not in self._known:
+                self._known.add(key)
+                self.fieldnames.append(key)
+                self._width_changed = self.rows > 0
+        self._writer.writerow([row.get(name, "") for name in self.fieldnames])
+        self.rows += 1
+
+    def close(self) -> Path:
+        try:
+            if self.rows:
+                self._spool.seek(0)
+                out = csv.writer(self._fh)
+                out.writerow(self.fieldnames)
+                if self._width_changed:
+                    width = len(self.fieldnames)
+                    for values in csv.reader(self._spool):
+                        out.writerow(values + [""] * (width - len(values)))
+                else:
+                    shutil.copyfileobj(self._spool, self._fh, BUFFER_SIZE)
+        finally:
+            self._spool.close()
+        return super().close()
+
+    def abort(self) -> None:
+        self._spool.close()
+        super().abort()
+
+
+WRITERS: Dict[str, Type[RowWriter]] = {
+    "csv": CsvWriter,
+    "json": JsonArrayWriter,
+    "jsonl": JsonLinesWriter,
+}
+
+
+def write_rows(writer: RowWriter, rows: Iterable[Mapping[str, Any]]) -> Path:
+    with writer:
+        for row in rows:
+            writer.write(row)
+    return writer.path
+
+
+async def awrite_rows(writer: RowWriter, rows: Rows) -> Path:
+    """Like :func:`write_rows` but also accepts async iterables."""
+
+    with writer:
+        if hasattr(rows, "__aiter__"):
+            async for row in rows:  # type: ignore[union-attr]
+                writer.write(row)
+        else:
+            for row in rows:  # type: ignore[union-attr]
+                writer.write(row)
+    return writer.path
+
+
+async def aexport(
+    rows: Rows, fmt: str, filename: Optional[str] = None, compression: Optional[str] = None
+) -> Path:
+    """Stream ``rows`` into a ``csv``, ``json``, ``jsonl``, ``excel``, ``parquet`` or ``arrow`` export."""
+
+    if fmt in ("parquet", "arrow"):
+        from .parquet_exporter import ArrowWriter, ParquetWriter
+
+        writer_class = ParquetWriter if fmt == "parquet" else ArrowWriter
+        path = output_path(filename, f"export.{fmt}")
+        return await awrite_rows(writer_class(path, compression), rows)
+    if fmt == "excel":
+        from .excel_exporter import ExcelWriter
+
+        return await awrite_rows(ExcelWriter(output_path(filename, "export.xlsx")), rows)
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported streaming export format: {fmt}")
+    path = output_path(filename, f"export.{fmt}", compression)
+    return await awrite_rows(WRITERS[fmt](path, compression), rows)
+
+
+__all__ = [
+    "CsvWriter",
+    "JsonArrayWriter",
+    "JsonLinesWriter",
+    "RowWriter",
+    "WRITERS",
+    "aexport",
+    "awrite_rows",
+    "open_text",
+    "output_path",
+    "write_rows",
+]
@@ -0,0 +1,113 @@
+"""Minimal JSONPath-style expressions for extracting values from JSON payloads.
+
+Supported syntax: ``$`` (root), ``.key``, ``['key']``, ``[0]``, ``[-1]``,
+``[*]`` / ``.*`` (all children) and ``..key`` (recursive descent), e.g.
+``$.data.products[*].price`` or ``$..sku``.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Any, Iterator, List, Tuple
+
+_TOKEN = re.compile(
+    r"""
+    \.\.(?P<descend>[A-Za-z_$][\w$-]*|\*)      # ..key / ..*
+    | \.(?P<key>[A-Za-z_$][\w$-]*|\*)          # .key / .*
+    | \[\s*(?P<index>-?\d+)\s*\]               # [0]
+    | \[\s*\*\s*\]                             # [*]
+    | \[\s*(?P<quote>['"])(?P<qkey>.*?)(?P=quote)\s*\]   # ['key']
+    """,
+    re.VERBOSE,
+)
+
+Step = Tuple[str, Any]
+
+
+class JsonPath:
+    """A compiled expression; use :func:`compile_path` to build one."""
+
+    def __init__(self, expression: str, steps: Tuple[Step, ...]) -> None:
+        self.expression = expression
+        self._steps = steps
+
+    def find(self, document: Any) -> List[Any]:
+        nodes: List[Any] = [document]
+        for kind, arg in self._steps:
+            nodes = [child for node in nodes for child in _apply(kind, arg, node)]
+            if not nodes:
+                break
+        return nodes
+
+    def __repr__(self) -> str:
+        return f"JsonPath({self.expression!r})"
+
+
+def _children(node: Any) -> Iterator[Any]:
+    if isinstance(node, dict):
+        yield from node.values()
+    elif isinstance(node, list):
+        yield from node
+
+
+def _descendants(node: Any) -> Iterator[Any]:
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(reversed(list(_children(current))))
+
+
+def _apply(kind: str, arg: Any, node: Any) -> Iterator[Any]:
+    if kind == "key":
+        if isinstance(node, dict) and arg in node:
+            yield node[arg]
+    elif kind == "index":
+        if isinstance(node, list) and -len(node) <= arg < len(node):
+            yield node[arg]
+    elif kind == "wildcard":
+        yield from _children(node)
+    elif kind == "descend":
+        for descendant in _descendants(node):
+            if arg == "*":
+                yield from _children(descendant)
+            elif isinstance(descendant, dict) and arg in descendant:
+                yield descendant[arg]
+
+
+@lru_cache(maxsize=512)
+def compile_path(expression: str) -> JsonPath:
+    """Parse ``expression`` once; compiled paths are cached."""
+
+    text = expression.strip()
+    if text.startswith("$"):
+        text = text[1:]
+    elif text and not text.startswith((".", "[")):
+        text = "." + text
+    steps: List[Step] = []
+    position = 0
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match:
+            raise ValueError(f"Invalid JSONPath expression {expression!r} at position {position}")
+        if match.group("descend") is not None:
+            steps.append(("descend", match.group("descend")))
+        elif match.group("key") is not None:
+            key = match.group("key")
+            steps.append(("wildcard", None) if key == "*" else ("key", key))
+        elif match.group("index") is not None:
+            steps.append(("index", int(match.group("index"))))
+        elif match.group("quote") is not None:
+            steps.append(("key", match.group("qkey")))
+        else:
+            steps.append(("wildcard", None))
+        position = match.end()
+    return JsonPath(expression, tuple(steps))
+
+
+def find_values(expression: str, document: Any) -> List[Any]:
+    return compile_path(expression).find(document)
+
+
+__all__ = ["JsonPath", "compile_path", "find_values"]
@@ -2,24 +2,206 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import asyncio
+import fnmatch
+import json
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Set
+
+from playwright.async_api import Page, Response
+
+from ..logging import event_dict_from_exc, get_logger
+from .jsonpath import compile_path
+
+logger = get_logger(__name__)
+
+
+def _compile_pattern(pattern: str) -> Pattern[str]:
+    """Glob patterns match the whole URL; plain strings match as substrings."""
+
+    if not any(char in pattern for char in "*?["):
+        pattern = f"*{pattern}*"
+    return re.compile(fnmatch.translate(pattern))
+
+
+@dataclass
+class CapturedResponse:
+    url: str
+    json: Any
+    status: int = 200
+    method: str = "GET"
+    request_headers: Dict[str, str] = field(default_factory=dict)
+    post_data: Optional[str] = None
+    size: int = 0
+    patterns: tuple[str, ...] = ()
+    captured_at: float = field(default_factory=time.time)
 
 
 class NetworkCapture:
-    """Collects network responses for later parsing."""
+    """Collects JSON responses for later parsing.
 
-    def __init__(self) -> None:
-        self._payloads: List[Dict[str, Any]] = []
+    Responses are indexed by the declared URL patterns they match and kept in a
+    store bounded by ``max_entries`` and ``max_bytes``; the oldest responses are
+    evicted first. Without declared patterns every recorded response is kept.
+    """
 
-    def record(self, request_url: str, response_json: Dict[str, Any]) -> None:
-        self._payloads.append({"url": request_url, "json": response_json})
+    def __init__(
+        self,
+        patterns: Iterable[str] = (),
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 1_000,
+    ) -> None:
+        self._patterns: Dict[str, Pattern[str]] = {pattern: _compile_pattern(pattern) for pattern in patterns}
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[int, CapturedResponse]" = OrderedDict()
+        self._index: Dict[str, "OrderedDict[int, CapturedResponse]"] = {
+            pattern: OrderedDict() for pattern in self._patterns
+        }
+        self._events: Dict[str, asyncio.Event] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._next_id = 0
+        self._bytes = 0
+
+    def matches(self, url: str) -> tuple[str, ...]:
+        return tuple(pattern for pattern, regex in self._patterns.items() if regex.match(url))
+
+    def record(self, request_url: str, response_json: Any, **details: Any) -> Optional[CapturedResponse]:
+        patterns = self.matches(request_url)
+        if self._patterns and not patterns:
+            return None
+        size = details.pop("size", None)
+        if size is None:
+            size = len(json.dumps(response_json, ensure_ascii=False).encode("utf-8"))
+        if size > self._max_bytes:
+            logger.warning("network_capture_oversized", url=request_url, size=size)
+            return None
+        entry = CapturedResponse(url=request_url, json=response_json, size=size, patterns=patterns, **details)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        for pattern in patterns:
+            self._index[pattern][entry_id] = entry
+            self._event(pattern).set()
+        self._bytes += size
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self._max_entries or self._bytes > self._max_bytes):
+            entry_id, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            for pattern in entry.patterns:
+                self._index[pattern].pop(entry_id, None)
+
+    def _event(self, pattern: str) -> asyncio.Event:
+        event = self._events.get(pattern)
+        if event is None:
+            event = self._events[pattern] = asyncio.Event()
+        return event
+
+    def find(self, pattern: str) -> List[CapturedResponse]:
+        """Responses captured for a declared pattern, oldest first."""
+
+        return list(self._index.get(pattern, {}).values())
 
     def find_by_keyword(self, keyword: str) -> List[Dict[str, Any]]:
-        return [payload for payload in self._payloads if keyword in payload["url"]]
+        if keyword in self._index:
+            entries = self.find(keyword)
+        else:
+            entries = [entry for entry in self._entries.values() if keyword in entry.url]
+        return [{"url": entry.url, "json": entry.json} for entry in entries]
+
+    def latest(self, pattern: Optional[str] = None) -> Optional[CapturedResponse]:
+        entries = self._index.get(pattern, {}) if pattern is not None else self._entries
+        if not entries:
+            return None
+        return next(reversed(entries.values()))
+
+    def extract(self, json_path: str, pattern: Optional[str] = None) -> List[Any]:
+        """Evaluate ``json_path`` against every captured response in order."""
+
+        path = compile_path(json_path)
+        entries = self._index.get(pattern, {}) if pattern is not None else self._entries
+        values: List[Any] = []
+        for entry in entries.values():
+            values.extend(path.find(entry.json))
+        return values
+
+    def extract_fields(self, fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Same shape as ``BrowserRunner.extract_fields`` for fields with ``json_path``."""
+
+        return [{"name": field["name"], "values": self.extract(field["json_path"])} for field in fields]
+
+    def attach(self, page: Page) -> "NetworkCapture":
+        """Record matching JSON responses of ``page`` as they arrive."""
+
+        page.on("response", self._on_response)
+        return self
+
+    def _on_response(self, response: Response) -> None:
+        if self._patterns and not self.matches(response.url):
+            return
+        task = asyncio.create_task(self._capture(response))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _capture(self, response: Response) -> None:
+        if "json" not in response.headers.get("content-type", ""):
+            return
+        try:
+            body = await response.body()
+            payload = json.loads(body)
+        except Exception as exc:
+            logger.debug("network_capture_skipped", url=response.url, **event_dict_from_exc(exc))
+            return
+        request = response.request
+        self.record(
+            response.url,
+            payload,
+            status=response.status,
+            method=request.method,
+            request_headers=dict(request.headers),
+            post_data=request.post_data,
+            size=len(body),
+        )
+
+    async def wait_for(self, pattern: Optional[str] = None, timeout_ms: int = 10_000) -> bool:
+        """Wait until a response for ``pattern`` (or any declared pattern) has been captured."""
+
+        patterns = [pattern] if pattern is not None else list(self._patterns)
+        if any(self._index.get(name) for name in patterns):
+            return True
+        waiters = [asyncio.create_task(self._event(name).wait()) for name in patterns]
+        if not waiters:
+            return bool(self._entries)
+        done, pending = await asyncio.wait(waiters, timeout=timeout_ms / 1000.0, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        return bool(done)
+
+    def clear(self) -> None:
+        """Drop everything captured so far, so the next extraction only sees new responses."""
+
+        self._entries.clear()
+        for entries in self._index.values():
+            entries.clear()
+        for event in self._events.values():
+            event.clear()
+        self._bytes = 0
 
     @property
     def payloads(self) -> List[Dict[str, Any]]:
-        return list(self._payloads)
+        return [{"url": entry.url, "json": entry.json} for entry in self._entries.values()]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
 
 
-__all__ = ["NetworkCapture"]
+__all__ = ["CapturedResponse", "NetworkCapture"]
@@ -9,6 +9,8 @@ from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_asyn
 
 from ..config import get_settings
 from ..logging import get_logger
+from ..utils.metrics import DB_FLUSH_SECONDS
+from ..utils.tracing import span
 from .models import Base
 
 logger = get_logger(__name__)
@@ -32,7 +34,8 @@ async def session_scope() -> AsyncIterator[AsyncSession]:
     session = _session_factory()
     try:
         yield session
-        await session.commit()
+        with span("db.commit"), DB_FLUSH_SECONDS.time():
+            await session.commit()
     except Exception:
         await session.rollback()
         raise
@@ -0,0 +1,255 @@
+"""Item-level diff between two runs of a project.
+
+Every item is stored with two hashes: ``key_hash`` over the plan's natural
+key (``item_key``) and ``content_hash`` over the whole payload. Added, removed
+and modified items are then found with indexed anti-joins and joins on the
+key hash inside the database and streamed out, so comparing millions of items
+never loads either run into memory.
+
+A run's items include those of pages an incremental run skipped as
+unchanged: such pages resolve to the items of the run that last fetched them.
+Diffing on a different key (``key_fields``) hashes both runs' items into a
+temporary table for the session and leaves the stored hashes alone.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Select,
+    String,
+    Subquery,
+    Table,
+    delete,
+    exists,
+    func,
+    insert,
+    select,
+    union,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from ..logging import get_logger
+from .models import Item, Page, Project, Run
+
+logger = get_logger(__name__)
+
+CHANGES = ("added", "removed", "modified")
+
+# Hashes for an ad-hoc key, filled per session by _rekey(); never persisted.
+_rekeyed = Table(
+    "diff_rekeyed_items",
+    MetaData(),
+    Column("item_id", Integer, primary_key=True),
+    Column("key_hash", String(32)),
+    Column("content_hash", String(32)),
+    prefixes=["TEMPORARY"],
+)
+
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def item_hashes(data: Dict[str, Any], key_fields: Sequence[str] = ()) -> Tuple[str, str]:
+    """``(key_hash, content_hash)`` for an item; without a key the content is the key."""
+
+    content_hash = _digest(data)
+    key_hash = _digest([data.get(name) for name in key_fields]) if key_fields else content_hash
+    return key_hash, content_hash
+
+
+def make_item(run_id: int, data: Dict[str, Any], key_fields: Sequence[str] = (), page: Optional[Page] = None) -> Item:
+    key_hash, content_hash = item_hashes(data, key_fields)
+    return Item(run_id=run_id, data=data, key_hash=key_hash, content_hash=content_hash, page=page)
+
+
+async def previous_run(session: AsyncSession, project: str, run_id: int) -> Optional[int]:
+    """The run of ``project`` created just before ``run_id``."""
+
+    current = await session.get(Run, run_id)
+    if current is None:
+        return None
+    result = await session.execute(
+        select(Run.id)
+        .join(Project, Run.project_id == Project.id)
+        .where(
+            Project.name == project,
+            (Run.created_at < current.created_at) | ((Run.created_at == current.created_at) & (Run.id < run_id)),
+        )
+        .order_by(Run.created_at.desc(), Run.id.desc())
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+def run_items(run_id: int) -> Select[Any]:
+    """``(id, data)`` of the items that make up ``run_id``.
+
+    That is its own items plus, for every page it marked unchanged, the items
+    of the latest earlier fetch of that URL within the project.
+    """
+
+    seen, fetch, run, fetch_run = aliased(Page), aliased(Page), aliased(Run), aliased(Run)
+    last_fetch = (
+        select(func.max(fetch.id))
+        .join(fetch_run, fetch.run_id == fetch_run.id)
+        .where(
+            fetch.url == seen.url,
+            fetch.unchanged.is_(False),
+            fetch.id < seen.id,
+            fetch_run.project_id == run.project_id,
+        )
+        .scalar_subquery()
+    )
+    own = select(Item.id, Item.data).where(Item.run_id == run_id)
+    carried = (
+        select(Item.id, Item.data)
+        .select_from(seen)
+        .join(run, run.id == seen.run_id)
+        .join(Item, Item.page_id == last_fetch)
+        .where(seen.run_id == run_id, seen.unchanged.is_(True))
+    )
+    return union_all(own, carried)
+
+
+async def _rekey(
+    session: AsyncSession, base: int, head: int, key_fields: Sequence[str], batch_size: int = 1_000
+) -> None:
+    """Fill the session's temporary hash table with both runs' items hashed on ``key_fields``."""
+
+    marker = (base, head, tuple(key_fields))
+    if session.info.get("diff_rekeyed") == marker:
+        return
+    await session.run_sync(lambda sync: _rekeyed.create(sync.connection(), checkfirst=True))
+    await session.execute(delete(_rekeyed))
+    ids = union(*(select(items.c.id) for items in (run_items(base).subquery(), run_items(head).subquery())))
+    last_id = 0
+    rekeyed = 0
+    while True:
+        result = await session.execute(
+            select(Item.id, Item.data)
+            .where(Item.id.in_(ids), Item.id > last_id)
+            .order_by(Item.id)
+            .limit(batch_size)
+        )
+        batch = result.all()
+        if not batch:
+            break
+        params = []
+        for item_id, data in batch:
+            key_hash, content_hash = item_hashes(data, key_fields)
+            params.append({"item_id": item_id, "key_hash": key_hash, "content_hash": content_hash})
+        await session.execute(insert(_rekeyed), params)
+        rekeyed += len(batch)
+        last_id = batch[-1][0]
+    session.info["diff_rekeyed"] = marker
+    logger.info("items_rekeyed", base=base, head=head, items=rekeyed, key=list(key_fields))
+
+
+def _hashed(run_id: int, rekeyed: bool) -> Subquery:
+    items = run_items(run_id).subquery()
+    if rekeyed:
+        hashes = _rekeyed.alias()
+        return (
+            select(items.c.id, items.c.data, hashes.c.key_hash, hashes.c.content_hash)
+            .join(hashes, hashes.c.item_id == items.c.id)
+            .subquery()
+        )
+    return (
+        select(items.c.id, items.c.data, Item.key_hash, Item.content_hash)
+        .join(Item, Item.id == items.c.id)
+        .subquery()
+    )
+
+
+def _queries(base: int, head: int, rekeyed: bool = False) -> Dict[str, Select[Any]]:
+    old = _hashed(base, rekeyed)
+    new = _hashed(head, rekeyed)
+    old_match, new_match = old.alias(), new.alias()
+    same_key_in_head = exists().where(new_match.c.key_hash == old.c.key_hash)
+    same_key_in_base = exists().where(old_match.c.key_hash == new.c.key_hash)
+    return {
+        "added": select(new.c.data).where(~same_key_in_base).order_by(new.c.id),
+        "removed": select(old.c.data).where(~same_key_in_head).order_by(old.c.id),
+        "modified": (
+            select(old.c.data, new.c.data)
+            .join(new, new.c.key_hash == old.c.key_hash)
+            .where(old.c.content_hash != new.c.content_hash)
+            .order_by(new.c.id)
+        ),
+    }
+
+
+async def _prepared(
+    session: AsyncSession, base: int, head: int, key_fields: Optional[Sequence[str]]
+) -> Dict[str, Select[Any]]:
+    if key_fields is None:
+        return _queries(base, head)
+    await _rekey(session, base, head, key_fields)
+    return _queries(base, head, rekeyed=True)
+
+
+def modified_row(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Flat row for a modified item: current values plus ``<field>__before`` for changed fields."""
+
+    row: Dict[str, Any] = {"change": "modified", **after}
+    for name in list(after) + [name for name in before if name not in after]:
+        if before.get(name) != after.get(name):
+            row[f"{name}__before"] = before.get(name)
+    return row
+
+
+async def diff_counts(
+    session: AsyncSession, base: int, head: int, key_fields: Optional[Sequence[str]] = None
+) -> Dict[str, int]:
+    """Number of added, removed and modified items; ``key_fields`` overrides the stored key."""
+
+    counts: Dict[str, int] = {}
+    for change, query in (await _prepared(session, base, head, key_fields)).items():
+        result = await session.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+        counts[change] = result.scalar_one()
+    return counts
+
+
+async def stream_diff(
+    session: AsyncSession,
+    base: int,
+    head: int,
+    changes: Sequence[str] = CHANGES,
+    batch_size: int = 1_000,
+    key_fields: Optional[Sequence[str]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield ``{"change": ..., **item}`` rows for items that differ between ``base`` and ``head``."""
+
+    queries = await _prepared(session, base, head, key_fields)
+    for change in changes:
+        if change not in queries:
+            raise ValueError(f"Unknown change type {change!r}; expected one of {', '.join(CHANGES)}")
+        result = await session.stream(queries[change].execution_options(yield_per=batch_size))
+        async for row in result:
+            if change == "modified":
+                yield modified_row(row[0], row[1])
+            else:
+                yield {"change": change, **row[0]}
+
+
+__all__ = [
+    "CHANGES",
+    "diff_counts",
+    "item_hashes",
+    "make_item",
+    "modified_row",
+    "previous_run",
+    "run_items",
+    "stream_diff",
+]
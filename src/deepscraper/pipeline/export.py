@@ -0,0 +1,82 @@
+"""Stream stored items out of the database for export."""
+
+from __future__ import annotations
+
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..logging import get_logger
+from .models import Item, Project, Run
+
+logger = get_logger(__name__)
+
+_FILTER = re.compile(r"^(?P<key>[^=!~]+?)\s*(?P<op>!=|=|~)\s*(?P<value>.*)$")
+
+Filter = Tuple[str, str, str]
+
+
+def parse_filters(expressions: Optional[List[str]]) -> List[Filter]:
+    """Parse ``key=value``, ``key!=value`` and ``key~substring`` expressions."""
+
+    filters: List[Filter] = []
+    for expression in expressions or []:
+        match = _FILTER.match(expression.strip())
+        if not match:
+            raise ValueError(f"Invalid filter {expression!r}; expected key=value, key!=value or key~text")
+        filters.append((match.group("key").strip(), match.group("op"), match.group("value")))
+    return filters
+
+
+async def resolve_runs(session: AsyncSession, project: str, run: str) -> List[int]:
+    """Run ids selected by ``run``: a run id, ``latest`` or ``all``."""
+
+    stmt = (
+        select(Run.id)
+        .join(Project, Run.project_id == Project.id)
+        .where(Project.name == project)
+        .order_by(Run.created_at.desc(), Run.id.desc())
+    )
+    if run == "latest":
+        stmt = stmt.limit(1)
+    elif run != "all":
+        if not run.isdigit():
+            raise ValueError(f"Invalid run selector {run!r}; expected a run id, 'latest' or 'all'")
+        stmt = stmt.where(Run.id == int(run))
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+def items_query(run_ids: List[int], filters: Optional[List[Filter]] = None) -> Select[Tuple[Dict[str, Any]]]:
+    stmt = select(Item.data).where(Item.run_id.in_(run_ids)).order_by(Item.id)
+    for key, op, value in filters or []:
+        column = Item.data[key].as_string()
+        if op == "=":
+            stmt = stmt.where(column == value)
+        elif op == "!=":
+            stmt = stmt.where(column.is_(None) | (column != value))
+        else:
+            stmt = stmt.where(column.contains(value, autoescape=True))
+    return stmt
+
+
+async def stream_items(
+    session: AsyncSession,
+    run_ids: List[int],
+    filters: Optional[List[Filter]] = None,
+    batch_size: int = 1_000,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield item payloads through a server-side cursor, ``batch_size`` rows at a time."""
+
+    stmt = items_query(run_ids, filters).execution_options(yield_per=batch_size)
+    result = await session.stream(stmt)
+    count = 0
+    async for data in result.scalars():
+        count += 1
+        yield data
+    logger.info("items_streamed", runs=run_ids, items=count)
+
+
+__all__ = ["parse_filters", "resolve_runs", "items_query", "stream_items"]
@@ -0,0 +1,12 @@
+-- Content-addressed snapshot blobs referenced from pages
+CREATE TABLE IF NOT EXISTS snapshot_blobs (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    key TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    codec VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE pages ADD COLUMN IF NOT EXISTS snapshot_sha256 VARCHAR(64) REFERENCES snapshot_blobs(sha256);
+CREATE INDEX IF NOT EXISTS ix_pages_snapshot_sha256 ON pages (snapshot_sha256);
@@ -0,0 +1,7 @@
+-- Validators and fingerprints for incremental recrawls
+ALTER TABLE pages ADD COLUMN IF NOT EXISTS etag TEXT;
+ALTER TABLE pages ADD COLUMN IF NOT EXISTS last_modified VARCHAR(64);
+ALTER TABLE pages ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(16);
+ALTER TABLE pages ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
+ALTER TABLE pages ADD COLUMN IF NOT EXISTS unchanged BOOLEAN NOT NULL DEFAULT FALSE;
+CREATE INDEX IF NOT EXISTS ix_pages_url ON pages (url);
@@ -0,0 +1,5 @@
+-- Natural-key and content hashes for diffing items between runs
+ALTER TABLE items ADD COLUMN IF NOT EXISTS page_id INTEGER REFERENCES pages(id) ON DELETE SET NULL;
+ALTER TABLE items ADD COLUMN IF NOT EXISTS key_hash VARCHAR(32);
+ALTER TABLE items ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
+CREATE INDEX IF NOT EXISTS ix_items_run_key ON items (run_id, key_hash);
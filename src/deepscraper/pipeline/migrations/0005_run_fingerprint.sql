@@ -0,0 +1,2 @@
+-- Browser fingerprint profile each run presented
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS fingerprint_profile VARCHAR(64);
@@ -5,7 +5,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from sqlalchemy import JSON, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, Boolean, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -31,6 +31,7 @@ class Run(Base):
     project_id: Mapped[int] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"))
     plan: Mapped[Dict[str, Any]] = mapped_column(JSON)
     status: Mapped[str] = mapped_column(String(50), default="pending")
+    fingerprint_profile: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     project: Mapped[Project] = relationship(back_populates="runs")
@@ -38,28 +39,53 @@ class Run(Base):
     items: Mapped[list["Item"]] = relationship(back_populates="run", cascade="all, delete-orphan")
 
 
+class SnapshotBlob(Base):
+    __tablename__ = "snapshot_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(Text)
+    size: Mapped[int] = mapped_column(Integer)
+    stored_size: Mapped[int] = mapped_column(Integer)
+    codec: Mapped[str] = mapped_column(String(20))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class Page(Base):
     __tablename__ = "pages"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("runs.id", ondelete="CASCADE"))
-    url: Mapped[str] = mapped_column(Text)
+    url: Mapped[str] = mapped_column(Text, index=True)
     snapshot_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    snapshot_sha256: Mapped[Optional[str]] = mapped_column(
+        ForeignKey("snapshot_blobs.sha256"), nullable=True, index=True
+    )
+    etag: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    last_modified: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    fingerprint: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    unchanged: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     run: Mapped[Run] = relationship(back_populates="pages")
+    snapshot: Mapped[Optional[SnapshotBlob]] = relationship()
     failures: Mapped[list["Failure"]] = relationship(back_populates="page", cascade="all, delete-orphan")
 
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (Index("ix_items_run_key", "run_id", "key_hash"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     run_id: Mapped[int] = mapped_column(ForeignKey("runs.id", ondelete="CASCADE"))
+    page_id: Mapped[Optional[int]] = mapped_column(ForeignKey("pages.id", ondelete="SET NULL"), nullable=True)
     data: Mapped[Dict[str, Any]] = mapped_column(JSON)
+    key_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     run: Mapped[Run] = relationship(back_populates="items")
+    page: Mapped[Optional[Page]] = relationship()
 
 
 class Failure(Base):
@@ -87,6 +113,7 @@ __all__ = [
     "Project",
     "Run",
     "Page",
+    "SnapshotBlob",
     "Item",
     "Failure",
     "Checkpoint",
@@ -0,0 +1,212 @@
+"""Persist visited pages and their snapshots.
+
+In incremental mode the recorder also remembers what each URL looked like on
+the previous run of the project: its HTTP validators (ETag/Last-Modified) for
+conditional requests and a fingerprint of the extracted region. Pages that did
+not change are still recorded, flagged ``unchanged``, so the run knows it saw
+them, but their items are not extracted or written again.
+
+A page only references its snapshot once the blob is durably stored: while a
+background upload is in flight the page waits, and if the upload fails the
+page is kept without a snapshot rather than pointing at a missing object.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..logging import get_logger
+from ..utils.simhash import fingerprint, unchanged
+from ..utils.snapshots import SnapshotRef, SnapshotStore
+from .models import Page, Run, SnapshotBlob
+
+logger = get_logger(__name__)
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def region_text(extracted: List[Dict[str, Any]]) -> List[str]:
+    """Flatten extracted ``{"name", "values"}`` fields into fingerprintable lines."""
+
+    return [f"{field['name']}\t{json.dumps(field['values'], ensure_ascii=False, default=str)}" for field in extracted]
+
+
+class PageRecorder:
+    """Adds a :class:`Page` row per visited URL, referencing its snapshot blob."""
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        run: Run,
+        project: str,
+        store: Optional[SnapshotStore] = None,
+        incremental: bool = False,
+        max_distance: int = 0,
+    ) -> None:
+        self._session = session
+        self._run = run
+        self._project = project
+        self._store = store
+        self._blobs: Dict[str, bool] = {}
+        self._uploads: Dict[str, Tuple[SnapshotRef, "asyncio.Task[None]", List[Page]]] = {}
+        self._previous: Dict[str, Optional[Page]] = {}
+        self.row_pages: List[Optional[Page]] = []
+        self.incremental = incremental
+        self.max_distance = max_distance
+        self.stored_bytes = 0
+        self.deduplicated = 0
+        self.unchanged = 0
+        self.detached = 0
+
+    @property
+    def snapshots(self) -> bool:
+        return self._store is not None
+
+    async def previous(self, url: str) -> Optional[Page]:
+        """The latest page recorded for ``url`` by an earlier run of the project."""
+
+        if url not in self._previous:
+            result = await self._session.execute(
+                select(Page)
+                .join(Run, Page.run_id == Run.id)
+                .where(Run.project_id == self._run.project_id, Page.url == url, Page.run_id != self._run.id)
+                .order_by(Page.id.desc())
+                .limit(1)
+            )
+            self._previous[url] = result.scalar_one_or_none()
+        return self._previous[url]
+
+    async def record(
+        self,
+        url: str,
+        html: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> Page:
+        await self._settle()
+        ref = await self._store.store(self._project, html) if self._store and html is not None else None
+        page = Page(run_id=self._run.id, url=url, unchanged=False)
+        if headers:
+            page.etag = headers.get("etag")
+            page.last_modified = headers.get("last-modified")
+        if ref is not None:
+            if ref.created:
+                self.stored_bytes += ref.stored_size
+            else:
+                self.deduplicated += 1
+            upload = self._store.pending_upload(ref.key)
+            if upload is None:
+                await self._attach(page, ref)
+            else:
+                self._uploads.setdefault(ref.sha256, (ref, upload, []))[2].append(page)
+        self._session.add(page)
+        return page
+
+    def note_fingerprint(self, profile: Optional[str]) -> None:
+        """Record on the run which browser fingerprint profile its pages were fetched with."""
+
+        self._run.fingerprint_profile = profile
+
+    def attribute(self, page: Optional[Page], rows: int) -> None:
+        """Remember that the next ``rows`` extracted rows came from ``page``."""
+
+        self.row_pages.extend([page] * rows)
+
+    def mark_unchanged(self, url: str, previous: Page) -> Page:
+        """Record ``url`` as seen without re-fetching it, carrying the previous state forward."""
+
+        page = Page(
+            run_id=self._run.id,
+            url=url,
+            snapshot_path=previous.snapshot_path,
+            snapshot_sha256=previous.snapshot_sha256,
+            etag=previous.etag,
+            last_modified=previous.last_modified,
+            fingerprint=previous.fingerprint,
+            content_hash=previous.content_hash,
+            unchanged=True,
+        )
+        self._session.add(page)
+        self.unchanged += 1
+        logger.info("page_unchanged", url=url, reason="not_modified")
+        return page
+
+    async def region_unchanged(self, page: Page, extracted: List[Dict[str, Any]]) -> bool:
+        """Fingerprint the extracted region of ``page``; true when it matches the previous run.
+
+        An identical content hash always counts as unchanged. With
+        ``max_distance`` above zero, SimHash fingerprints within that Hamming
+        distance do too, which tolerates volatile noise such as counters.
+        """
+
+        parts = region_text(extracted)
+        page.content_hash = hashlib.blake2b("\n".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+        page.fingerprint = fingerprint(parts)
+        if not self.incremental:
+            return False
+        previous = await self.previous(page.url)
+        if previous is None:
+            return False
+        same = previous.content_hash == page.content_hash or (
+            self.max_distance > 0 and unchanged(previous.fingerprint, page.fingerprint, self.max_distance)
+        )
+        if same:
+            page.unchanged = True
+            self.unchanged += 1
+            logger.info("page_unchanged", url=page.url, reason="fingerprint")
+        return same
+
+    async def _settle(self, wait: bool = False) -> None:
+        """Point pages at snapshots whose uploads finished; with ``wait``, wait for all of them."""
+
+        if wait and self._uploads:
+            await asyncio.gather(*(upload for _, upload, _ in self._uploads.values()), return_exceptions=True)
+        for sha256, (ref, upload, pages) in list(self._uploads.items()):
+            if not upload.done():
+                continue
+            del self._uploads[sha256]
+            if upload.cancelled() or upload.exception() is not None:
+                self.detached += len(pages)
+                logger.warning("snapshot_detached", key=ref.key, pages=len(pages))
+                continue
+            for page in pages:
+                await self._attach(page, ref)
+
+    async def _attach(self, page: Page, ref: SnapshotRef) -> None:
+        await self._ensure_blob(ref)
+        page.snapshot_path = ref.key
+        page.snapshot_sha256 = ref.sha256
+
+    async def _ensure_blob(self, ref: SnapshotRef) -> None:
+        if ref.sha256 in self._blobs:
+            return
+        # Another worker may store the same content at the same time; the first row wins.
+        insert = _INSERTS[self._session.bind.dialect.name]
+        await self._session.execute(
+            insert(SnapshotBlob)
+            .values(sha256=ref.sha256, key=ref.key, size=ref.size, stored_size=ref.stored_size, codec=ref.codec)
+            .on_conflict_do_nothing(index_elements=[SnapshotBlob.sha256])
+        )
+        self._blobs[ref.sha256] = True
+
+    async def close(self) -> None:
+        await self._settle(wait=True)
+        if self._store is not None:
+            await self._store.aclose()
+        logger.info(
+            "pages_recorded",
+            run_id=self._run.id,
+            stored_bytes=self.stored_bytes,
+            deduplicated=self.deduplicated,
+            unchanged=self.unchanged,
+            detached=self.detached,
+        )
+
+
+__all__ = ["PageRecorder", "region_text"]
@@ -0,0 +1,62 @@
+"""Project and run bookkeeping shared by the CLI, API and queue jobs."""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..planner.schema import PlanDocument
+from .models import Item, Page, Project, Run
+
+RUN_FINISHED = ("completed", "failed")
+
+
+async def ensure_project(session: AsyncSession, name: str) -> Project:
+    result = await session.execute(select(Project).where(Project.name == name))
+    project_obj = result.scalar_one_or_none()
+    if project_obj:
+        return project_obj
+    project = Project(name=name)
+    session.add(project)
+    await session.flush()
+    return project
+
+
+async def create_run(
+    session: AsyncSession,
+    project: Project,
+    plan: PlanDocument | Dict[str, Any],
+    status: str = "pending",
+) -> Run:
+    run = Run(project_id=project.id, plan=plan.model_dump() if isinstance(plan, PlanDocument) else plan, status=status)
+    session.add(run)
+    await session.flush()
+    return run
+
+
+async def run_summary(session: AsyncSession, run_id: int) -> Optional[Dict[str, Any]]:
+    """Status and item/page counts of ``run_id``."""
+
+    result = await session.execute(
+        select(Run, Project.name).join(Project, Run.project_id == Project.id).where(Run.id == run_id)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    run, project = row
+    items = await session.scalar(select(func.count()).select_from(Item).where(Item.run_id == run_id))
+    pages = await session.scalar(select(func.count()).select_from(Page).where(Page.run_id == run_id))
+    return {
+        "id": run.id,
+        "project": project,
+        "status": run.status,
+        "fingerprint_profile": run.fingerprint_profile,
+        "created_at": run.created_at.isoformat(),
+        "items": items,
+        "pages": pages,
+    }
+
+
+__all__ = ["RUN_FINISHED", "create_run", "ensure_project", "run_summary"]
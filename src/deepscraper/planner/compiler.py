@@ -0,0 +1,289 @@
+"""Validate a :class:`PlanDocument` once and lower it into an executable program.
+
+Compilation resolves everything the executor used to work out per step:
+actions become :class:`Op` members (unknown ones are rejected up front
+instead of being skipped at run time), wait instructions are mapped onto the
+kinds ``BrowserRunner.wait`` understands, a ``wait`` attached to any other
+step becomes its own step, selectors are normalized, and extraction fields
+are split into network, plain-CSS and selector-engine groups once. Plain-CSS
+fields are baked into a single JavaScript function so a page is extracted
+with one ``page.evaluate`` round trip.
+
+Compiled plans are immutable and cached by the plan's JSON, so a crawl over
+thousands of pages, or many jobs running the same plan, compile it once.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from ..crawl.urls import UrlFilter
+from .schema import PlanDocument, WaitInstruction
+
+PLAN_CACHE_SIZE = 256
+
+# Schema wait types -> BrowserRunner.wait kinds.
+WAIT_KINDS = {"network_idle": "network_idle", "selector_visible": "selector", "fixed": "delay"}
+
+_ENGINE_PREFIX = re.compile(r"^(?:xpath|text|id|data-testid|data-test-id|data-test|nth|internal:[\w-]+)=")
+_ENGINE_SYNTAX = re.compile(
+    r">>|:(?:has-text|text|text-is|text-matches|nth-match|right-of|left-of|above|below|near)\(|:visible\b"
+)
+
+# Playwright's css engine pierces open shadow roots; querySelectorAll alone does not.
+_ROOTS_JS = """const roots = [document];
+  for (let i = 0; i < roots.length; i++) {
+    const walker = document.createTreeWalker(roots[i], NodeFilter.SHOW_ELEMENT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+      if (node.shadowRoot) roots.push(node.shadowRoot);
+    }
+  }
+  const all = (selector) => roots.flatMap((root) => Array.from(root.querySelectorAll(selector)));"""
+DOM_EXTRACT_SCRIPT = f"""() => {{
+  {_ROOTS_JS}
+  return __SPEC__.map(([selector, attr]) =>
+    all(selector).map((el) => (attr ? el.getAttribute(attr) : el.innerText.trim())));
+}}"""
+LINKS_SCRIPT = f"""() => {{
+  {_ROOTS_JS}
+  return all(__SELECTOR__).map((el) => el.href).filter(Boolean);
+}}"""
+
+
+class PlanCompileError(ValueError):
+    """The plan cannot be executed as written; ``problems`` lists every reason."""
+
+    def __init__(self, problems: List[str]) -> None:
+        super().__init__("invalid plan: " + "; ".join(problems))
+        self.problems = problems
+
+
+class Op(str, Enum):
+    NAVIGATE = "navigate"
+    CLICK = "click"
+    FILL = "fill"
+    WAIT = "wait"
+    EXTRACT = "extract"
+    # Internal: queue the current page's crawl links. Emitted by the executor, not accepted in plans.
+    FOLLOW = "follow"
+
+
+PLAN_ACTIONS = frozenset(op.value for op in Op if op is not Op.FOLLOW)
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    op: Op
+    target: Optional[str] = None
+    value: Optional[str] = None
+    wait: Optional[Dict[str, Any]] = None
+
+
+@dataclass(frozen=True)
+class ExtractionProgram:
+    names: Tuple[str, ...]
+    network_fields: Tuple[Dict[str, Any], ...] = ()
+    # Plain-CSS fields, extracted together by ``dom_script``.
+    script_names: Tuple[str, ...] = ()
+    dom_script: Optional[str] = None
+    # Fields that need Playwright's selector engine (xpath, text=, :has-text(), ...).
+    engine_fields: Tuple[Dict[str, Any], ...] = ()
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    steps: Tuple[CompiledStep, ...]
+    # Every step except navigation, replayed for each frontier URL.
+    page_steps: Tuple[CompiledStep, ...]
+    seeds: Tuple[str, ...]
+    extraction: ExtractionProgram
+    link_selectors: Tuple[str, ...] = ()
+    links_script: Optional[str] = None
+    link_filter: Optional[UrlFilter] = None
+    extract_pattern: Optional[Pattern[str]] = None
+
+
+FOLLOW = CompiledStep(Op.FOLLOW)
+
+
+def normalize_selector(selector: str) -> str:
+    """Strip whitespace and ``css=``; mark bare XPath expressions explicitly."""
+
+    selector = selector.strip()
+    if selector.startswith("css="):
+        return selector[4:].strip()
+    if selector.startswith(("//", "(//", "..")):
+        return "xpath=" + selector
+    return selector
+
+
+def is_css(selector: str) -> bool:
+    """Whether ``document.querySelectorAll`` understands ``selector`` as-is."""
+
+    return not (_ENGINE_PREFIX.match(selector) or _ENGINE_SYNTAX.search(selector))
+
+
+def resolve_wait(wait: Optional[WaitInstruction]) -> Dict[str, Any]:
+    wait = wait or WaitInstruction(type="network_idle")
+    if wait.type == "selector_visible" and not (wait.selector or "").strip():
+        raise ValueError("selector_visible wait needs a selector")
+    if wait.timeout_ms < 0:
+        raise ValueError("wait timeout_ms must not be negative")
+    selector = normalize_selector(wait.selector) if wait.selector else None
+    return {"type": WAIT_KINDS[wait.type], "selector": selector, "timeout_ms": wait.timeout_ms}
+
+
+def _patterns(label: str, patterns: List[str], problems: List[str]) -> None:
+    for pattern in patterns:
+        try:
+            re.compile(pattern)
+        except re.error as exc:
+            problems.append(f"{label} pattern {pattern!r}: {exc}")
+
+
+def _compile_steps(plan: PlanDocument, problems: List[str]) -> List[CompiledStep]:
+    steps: List[CompiledStep] = []
+    for index, step in enumerate(plan.steps):
+        label = f"step {index}"
+        action = step.action.strip().lower()
+        if action not in PLAN_ACTIONS:
+            expected = ", ".join(sorted(PLAN_ACTIONS))
+            problems.append(f"{label}: unknown action {step.action!r} (expected one of {expected})")
+            continue
+        op = Op(action)
+        target = step.target.strip() if step.target else None
+        try:
+            wait = resolve_wait(step.wait) if op is Op.WAIT or step.wait is not None else None
+        except ValueError as exc:
+            problems.append(f"{label}: {exc}")
+            continue
+        if op is Op.NAVIGATE:
+            target = urljoin(plan.url, target) if target else None
+            if target is None or urlsplit(target).scheme not in ("http", "https"):
+                problems.append(f"{label}: navigate needs an http(s) target")
+                continue
+        elif op in (Op.CLICK, Op.FILL):
+            if not target:
+                problems.append(f"{label}: {action} needs a target selector")
+                continue
+            target = normalize_selector(target)
+            if op is Op.FILL and step.value is None:
+                problems.append(f"{label}: fill needs a value")
+                continue
+        elif op is Op.EXTRACT:
+            # The target of an extract step is only a label; fields say what to read.
+            target = None
+
+        if op is Op.WAIT:
+            steps.append(CompiledStep(op, wait=wait))
+            continue
+        steps.append(CompiledStep(op, target, step.value))
+        if wait is not None:
+            steps.append(CompiledStep(Op.WAIT, wait=wait))
+    return steps
+
+
+def _compile_extraction(plan: PlanDocument, problems: List[str]) -> ExtractionProgram:
+    names: List[str] = []
+    network: List[Dict[str, Any]] = []
+    css: List[Tuple[str, Optional[str], str]] = []
+    engine: List[Dict[str, Any]] = []
+    for field in plan.fields:
+        if field.name in names:
+            problems.append(f"field {field.name!r}: duplicate name")
+            continue
+        names.append(field.name)
+        if field.json_path and plan.network is not None:
+            network.append(field.model_dump())
+            continue
+        selector = normalize_selector(field.selector)
+        if not selector:
+            reason = "json_path needs plan.network" if field.json_path else "no selector"
+            problems.append(f"field {field.name!r}: {reason}")
+            continue
+        if is_css(selector):
+            css.append((field.name, field.attr, selector))
+        else:
+            engine.append({**field.model_dump(), "selector": selector})
+    script = None
+    if css:
+        spec = json.dumps([[selector, attr] for _, attr, selector in css])
+        script = DOM_EXTRACT_SCRIPT.replace("__SPEC__", spec)
+    return ExtractionProgram(
+        names=tuple(names),
+        network_fields=tuple(network),
+        script_names=tuple(name for name, _, _ in css),
+        dom_script=script,
+        engine_fields=tuple(engine),
+    )
+
+
+def _build(plan: PlanDocument) -> CompiledPlan:
+    problems: List[str] = []
+    steps = _compile_steps(plan, problems)
+    extraction = _compile_extraction(plan, problems)
+    link_selectors: Tuple[str, ...] = ()
+    links_script = link_filter = extract_pattern = None
+    if plan.crawl is not None:
+        link_selectors = tuple(normalize_selector(selector) for selector in plan.crawl.link_selectors)
+        if not link_selectors or not all(link_selectors):
+            problems.append("crawl: link_selectors must be non-empty")
+        elif all(is_css(selector) for selector in link_selectors):
+            links_script = LINKS_SCRIPT.replace("__SELECTOR__", json.dumps(", ".join(link_selectors)))
+        if plan.crawl.max_depth < 0:
+            problems.append("crawl: max_depth must not be negative")
+        _patterns("crawl include", plan.crawl.include, problems)
+        _patterns("crawl exclude", plan.crawl.exclude, problems)
+        _patterns("crawl extract", [plan.crawl.extract_pattern] if plan.crawl.extract_pattern else [], problems)
+    if plan.discovery is not None:
+        _patterns("discovery include", plan.discovery.include, problems)
+        _patterns("discovery exclude", plan.discovery.exclude, problems)
+    if problems:
+        raise PlanCompileError(problems)
+
+    if plan.crawl is not None:
+        host = urlsplit(plan.url).hostname if plan.crawl.same_host else None
+        link_filter = UrlFilter(plan.crawl.include, plan.crawl.exclude, host)
+        if plan.crawl.extract_pattern:
+            extract_pattern = re.compile(plan.crawl.extract_pattern)
+    return CompiledPlan(
+        steps=tuple(steps),
+        page_steps=tuple(step for step in steps if step.op is not Op.NAVIGATE),
+        seeds=tuple(step.target for step in steps if step.op is Op.NAVIGATE),
+        extraction=extraction,
+        link_selectors=link_selectors,
+        links_script=links_script,
+        link_filter=link_filter,
+        extract_pattern=extract_pattern,
+    )
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compile_document(document: str) -> CompiledPlan:
+    return _build(PlanDocument.model_validate_json(document))
+
+
+def compile_plan(plan: PlanDocument) -> CompiledPlan:
+    """Compiled program for ``plan``; raises :class:`PlanCompileError` if it is not executable."""
+
+    return _compile_document(plan.model_dump_json())
+
+
+__all__ = [
+    "CompiledPlan",
+    "CompiledStep",
+    "ExtractionProgram",
+    "FOLLOW",
+    "Op",
+    "PlanCompileError",
+    "compile_plan",
+    "is_css",
+    "normalize_selector",
+    "resolve_wait",
+]
@@ -3,6 +3,7 @@ import aiohttp
 import json
 import re
 from typing import Optional
+from ..utils.tracing import span
 from .schema import PlanDocument, PlanStep, ExtractionField, PaginationInstruction, WaitInstruction
 
 class DeepSeekClient:
@@ -21,6 +22,10 @@ class DeepSeekClient:
             self.session = aiohttp.ClientSession(headers=headers)
 
     async def generate_plan(self, url: str, goal: str) -> PlanDocument:
+        with span("planner.generate_plan", url=url):
+            return await self._generate_plan(url, goal)
+
+    async def _generate_plan(self, url: str, goal: str) -> PlanDocument:
         await self._ensure_session()
         
         if not self.api_key:
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import Optional, Literal
 
 class WaitInstruction(BaseModel):
@@ -14,18 +15,56 @@ class PlanStep(BaseModel):
 
 class ExtractionField(BaseModel):
     name: str
-    selector: str
+    selector: str = ""
     attr: Optional[str] = None
     required: bool = False
+    json_path: Optional[str] = None
+    type: Optional[Literal["string", "integer", "float", "boolean", "datetime"]] = None
 
 class PaginationInstruction(BaseModel):
     type: str
     selector: Optional[str] = None
     max_pages: int = 1
 
+class ReplayInstruction(BaseModel):
+    page_param: str = "page"
+    start: int = 1
+    step: int = 1
+    max_pages: int = 100
+    items_path: Optional[str] = None
+    cursor_path: Optional[str] = None
+    concurrency: int = 4
+
+class NetworkCaptureInstruction(BaseModel):
+    url_patterns: list[str]
+    timeout_ms: int = 10000
+    skip_render: bool = False
+    replay: Optional[ReplayInstruction] = None
+
+class DiscoveryInstruction(BaseModel):
+    sitemaps: list[str] = []
+    include: list[str] = []
+    exclude: list[str] = []
+    lastmod_after: Optional[datetime] = None
+    max_urls: int = 10000
+    respect_robots: bool = True
+
+class CrawlInstruction(BaseModel):
+    link_selectors: list[str]
+    max_depth: int = 1
+    include: list[str] = []
+    exclude: list[str] = []
+    same_host: bool = True
+    max_pages: int = 1000
+    extract_pattern: Optional[str] = None
+
 class PlanDocument(BaseModel):
     url: str
     goal: str
     steps: list[PlanStep]
     fields: list[ExtractionField]
-    pagination: PaginationInstruction
+    pagination: PaginationInstruction = Field(default_factory=lambda: PaginationInstruction(type="none"))
+    network: Optional[NetworkCaptureInstruction] = None
+    discovery: Optional[DiscoveryInstruction] = None
+    crawl: Optional[CrawlInstruction] = None
+    item_key: list[str] = []
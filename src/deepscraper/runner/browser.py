@@ -5,21 +5,45 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import time
 from contextlib import asynccontextmanager
-from typing import Any, AsyncIterator, Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
 
-from playwright.async_api import Browser, BrowserContext, Page, async_playwright
+from playwright.async_api import Browser, BrowserContext, Error as PlaywrightError, Page, Response, async_playwright
 
 from ..config import get_settings
+from ..extractor.network import NetworkCapture
 from ..logging import get_logger
+from ..planner.compiler import ExtractionProgram
 from ..proxy.manager import ProxyManager
+from ..tasks.progress import track
 from ..utils.randomize import random_user_agent
-from ..utils.timing import jitter
-from ..captcha.base import get_solver
+from ..utils import memory
+from ..utils.metrics import BROWSER_LAUNCHES, BROWSER_RECYCLES, CAPTCHA_SOLVE_SECONDS, NAVIGATION_SECONDS, PROXY_ERRORS, WAIT_SECONDS
+from ..utils.ratelimit import RateLimiter, get_rate_limiter
+from ..utils.tracing import span
+from ..captcha.detector import CHALLENGE_MARKERS, CHALLENGE_TITLE, CaptchaDetection, CaptchaDetector
+from ..captcha.pool import get_token_pool
+from ..utils.fingerprints import FingerprintProfile, context_options, init_script
 from ..utils.stealth import get_stealth_manager
 
 logger = get_logger(__name__)
 
+PAGINATION_SETTLE_MS = 5_000
+# The API response body is already decoded and its cookies are already in the context's jar.
+PRIMED_DROP_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "set-cookie"})
+
+CHALLENGE_CLEARED_SCRIPT = f"""
+() => !document.querySelector('{CHALLENGE_MARKERS}') && !{CHALLENGE_TITLE}.test(document.title || '')
+"""
+
+
+def _same_url(first: str, second: str) -> bool:
+    # Браузер дописывает "/" к пустому пути; остальное сравниваем как есть.
+    a, b = urlsplit(first), urlsplit(second)
+    return a._replace(path=a.path or "/", fragment="") == b._replace(path=b.path or "/", fragment="")
+
 
 class BrowserRunner:
     """Wraps Playwright interactions for plan execution."""
@@ -30,210 +54,348 @@ class BrowserRunner:
         self._browser: Optional[Browser] = None
         self._context: Optional[BrowserContext] = None
         self._page: Optional[Page] = None
-
-        # Инициализируем капча-сервис
-        self.captcha_solver = get_solver(
-            self._settings.captcha_provider,
-            self._settings.captcha_api_key
-        )
+        self._proxy: Optional[str] = None
+        self._playwright: Any = None
+        self._context_pages = 0
+        self._memory_checked = 0.0
+        self._usage: Optional[memory.MemorySample] = None
+        self._rate_limiter: Optional[RateLimiter] = None
+        self._primed: Dict[Page, Tuple[Callable[[str], bool], Callable[[Any], Awaitable[None]]]] = {}
+        # Один профиль на весь запуск: после пересоздания контекста cookies не должны сменить «устройство».
+        self.fingerprint: Optional[FingerprintProfile] = get_stealth_manager().choose_profile()
+        self._chrome_version: Optional[str] = None
+
+        # Капча-сервис и пул токенов общие для процесса: заранее решённые токены переживают запуск
+        self.token_pool = get_token_pool()
+        self.captcha_solver = self.token_pool.solver
+        self.captcha_detector = CaptchaDetector()
 
     @asynccontextmanager
     async def context(self) -> AsyncIterator[Page]:
-        playwright = await async_playwright().start()
-        proxy = self._proxy_manager.get() if self._proxy_manager else None
-        browser = await playwright.chromium.launch(headless=self._settings.headless, proxy={"server": proxy} if proxy else None)
-
-        # ПРИМЕНЯЕМ STEALTH К КОНТЕКСТУ
-        stealth_manager = get_stealth_manager()
-        context = await browser.new_context(
-            user_agent=stealth_manager.get_random_user_agent(),
-            viewport=stealth_manager.get_random_viewport(),
+        self._playwright = await async_playwright().start()
+        await self._launch()
+        page = await self._new_page()
+        logger.info(
+            "fingerprint_profile",
+            profile=self.fingerprint.name if self.fingerprint else None,
+            chrome=self._chrome_version,
         )
 
-        # ДОБАВЛЯЕМ STEALTH СКРИПТ В КОНТЕКСТ
-        await context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined,
-            });
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5],
-            });
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en'],
-            });
-        """)
-
-        page = await context.new_page()
-
         try:
             yield page
         finally:
-            await context.close()
-            await browser.close()
-            await playwright.stop()
+            await self._context.close()
+            await self._browser.close()
+            await self._playwright.stop()
+
+    async def _launch(self) -> None:
+        proxy = self._proxy_manager.get() if self._proxy_manager else None
+        self._proxy = proxy
+        with span("browser.launch", proxy=bool(proxy)):
+            self._browser = await self._playwright.chromium.launch(
+                headless=self._settings.headless, proxy={"server": proxy} if proxy else None
+            )
+            BROWSER_LAUNCHES.inc()
+        self._chrome_version = self._browser.version
+
+    async def _new_page(self, storage_state: Optional[Dict[str, Any]] = None) -> Page:
+        # ПРИМЕНЯЕМ ПРОФИЛЬ ОТПЕЧАТКА К КОНТЕКСТУ (параметры и скрипт собраны один раз на профиль)
+        profile = self.fingerprint
+        options = context_options(profile, self._chrome_version) if profile else {}
+        context = await self._browser.new_context(storage_state=storage_state, **options)
+        if profile is not None:
+            await context.add_init_script(init_script(profile, self._chrome_version))
+
+        self._context = context
+        self._page = await context.new_page()
+        self._context_pages = 0
+        return self._page
+
+    @property
+    def connected(self) -> bool:
+        """Whether the browser process is still up; once it is gone every page fails."""
+        return self._browser is not None and self._browser.is_connected()
+
+    async def new_tab(self) -> Page:
+        """Another page in the current context, sharing its cookies and cache."""
+        return await self._context.new_page()
+
+    async def recycle_reason(self) -> Optional[str]:
+        """``"rss"`` once the browser passes ``BROWSER_MAX_RSS_MB``, ``"pages"`` after
+        ``BROWSER_RECYCLE_PAGES`` navigations in this context, otherwise ``None``."""
+        settings = self._settings
+        now = time.monotonic()
+        if settings.browser_max_rss_mb and now - self._memory_checked >= settings.memory_check_interval:
+            self._memory_checked = now
+            self._usage = await asyncio.to_thread(memory.sample)
+            if self._usage.children_mb >= settings.browser_max_rss_mb:
+                return "rss"
+        if settings.browser_recycle_pages and self._context_pages >= settings.browser_recycle_pages:
+            return "pages"
+        return None
+
+    async def recycle(self, reason: str) -> Page:
+        """Replace the context (and, for ``"rss"``, the browser) and return its first page.
+
+        Cookies and local storage carry over. Every page of the old context is
+        closed, so anything bound to one, such as a network capture, has to be
+        attached to the new page again.
+        """
+        usage = self._usage if reason == "rss" else None
+        logger.info("browser_recycle", reason=reason, pages=self._context_pages, **(usage.as_log() if usage else {}))
+        with span("browser.recycle", reason=reason):
+            state = await self._context.storage_state()
+            await self._context.close()
+            self._primed.clear()
+            if reason == "rss":
+                await self._browser.close()
+                await self._launch()
+            page = await self._new_page(state)
+        BROWSER_RECYCLES.inc(reason=reason)
+        return page
+
+    async def recycle_if_needed(self, page: Page) -> Page:
+        """:meth:`recycle` when :meth:`recycle_reason` says so; otherwise ``page`` itself."""
+        reason = await self.recycle_reason()
+        return page if reason is None else await self.recycle(reason)
+
+    async def navigate(self, page: Page, url: str, wait_until: str = "networkidle") -> Optional[Response]:
+        logger.info("navigate", url=url, wait_until=wait_until)
+        limiter = self._limiter()
+        await limiter.acquire(url)
+        started = time.monotonic()
+        primed = self._primed.pop(page, None)
+        try:
+            with span("browser.navigate", url=url, primed=primed is not None), NAVIGATION_SECONDS.time():
+                response = await page.goto(url, wait_until=wait_until, timeout=self._settings.page_timeout)
+        except PlaywrightError:
+            self._report_proxy(success=False)
+            await limiter.feedback(url, error=True)
+            raise
+        finally:
+            if primed is not None:
+                await page.unroute(*primed)
+        await limiter.feedback(
+            url,
+            status=response.status if response else None,
+            latency=time.monotonic() - started,
+            headers=response.headers if response else None,
+            kind=wait_until,
+        )
+        self._report_proxy(success=True)
+        self._context_pages += 1
+        track("pages")
+        return response
+
+    def _limiter(self) -> RateLimiter:
+        if self._rate_limiter is None:
+            self._rate_limiter = get_rate_limiter()
+        return self._rate_limiter
+
+    def _report_proxy(self, success: bool) -> None:
+        if not (self._proxy and self._proxy_manager):
+            return
+        if success:
+            self._proxy_manager.report_success(self._proxy)
+        else:
+            self._proxy_manager.report_failure(self._proxy)
+            PROXY_ERRORS.inc()
+        track("proxy_successes" if success else "proxy_failures")
+
+    async def revalidate(self, page: Page, url: str, etag: Optional[str], last_modified: Optional[str]) -> bool:
+        """Conditional GET through the context's cookie jar; true when the server answers 304.
+
+        When the page did change, the body already downloaded here answers the
+        next navigation of ``page`` to ``url`` instead of fetching it again.
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        if not headers:
+            return False
+        limiter = self._limiter()
+        await limiter.acquire(url)
+        started = time.monotonic()
+        try:
+            response = await page.context.request.get(url, headers=headers, timeout=self._settings.page_timeout)
+        except PlaywrightError as exc:
+            logger.warning("revalidate_failed", url=url, error=str(exc))
+            await limiter.feedback(url, error=True)
+            return False
+        await limiter.feedback(url, status=response.status, latency=time.monotonic() - started, headers=response.headers)
+        try:
+            logger.info("revalidate", url=url, status=response.status)
+            if response.status == 304:
+                return True
+            # После редиректа тело относится к другому адресу, его нельзя подставлять.
+            if response.ok and _same_url(response.url, url):
+                await self._prime(page, response.url, response.status, response.headers, await response.body())
+            return False
+        finally:
+            await response.dispose()
+
+    async def _prime(self, page: Page, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        # Следующая навигация на url получает уже скачанный ответ, подресурсы грузятся как обычно.
+        headers = {name: value for name, value in headers.items() if name.lower() not in PRIMED_DROP_HEADERS}
+
+        def matches(target: str) -> bool:
+            return target == url
+
+        async def fulfill(route: Any) -> None:
+            if route.request.is_navigation_request():
+                await route.fulfill(status=status, headers=headers, body=body)
+            else:
+                await route.fallback()
+
+        await page.route(matches, fulfill, times=1)
+        self._primed[page] = (matches, fulfill)
 
-    async def navigate(self, page: Page, url: str) -> None:
-        logger.info("navigate", url=url)
-        await page.goto(url, wait_until="networkidle", timeout=self._settings.page_timeout)
+    def capture_network(self, page: Page, patterns: List[str]) -> NetworkCapture:
+        """Attach a JSON response capture for ``patterns`` to ``page``."""
+        capture = NetworkCapture(patterns, max_bytes=self._settings.network_capture_max_bytes)
+        return capture.attach(page)
 
     async def wait(self, page: Page, wait_config: Dict[str, Any]) -> None:
         wait_type = wait_config.get("type", "network_idle")
         timeout = wait_config.get("timeout_ms", 5_000)
-        if wait_type == "selector" and wait_config.get("selector"):
-            await page.wait_for_selector(wait_config["selector"], timeout=timeout)
-        elif wait_type == "delay":
-            await asyncio.sleep(timeout / 1000.0)
-        else:
-            await page.wait_for_load_state("networkidle", timeout=timeout)
+        with span("browser.wait", type=wait_type), WAIT_SECONDS.time(type=wait_type):
+            if wait_type == "selector" and wait_config.get("selector"):
+                await page.wait_for_selector(wait_config["selector"], timeout=timeout)
+            elif wait_type == "delay":
+                await asyncio.sleep(timeout / 1000.0)
+            else:
+                await page.wait_for_load_state("networkidle", timeout=timeout)
 
     async def extract_fields(self, page: Page, fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         items: List[Dict[str, Any]] = []
-        for field in fields:
-            selector = field["selector"]
-            attr = field.get("attr")
-            values = await page.eval_on_selector_all(
-                selector,
-                "(elements, attr) => elements.map(el => attr ? el.getAttribute(attr) : el.innerText.trim())",
-                arg=attr,
-            )
-            items.append({"name": field["name"], "values": values})
+        with span("browser.extract", fields=len(fields)):
+            for field in fields:
+                selector = field["selector"]
+                attr = field.get("attr")
+                values = await page.eval_on_selector_all(
+                    selector,
+                    "(elements, attr) => elements.map(el => attr ? el.getAttribute(attr) : el.innerText.trim())",
+                    arg=attr,
+                )
+                items.append({"name": field["name"], "values": values})
+        return items
+
+    async def extract_program(self, page: Page, extraction: ExtractionProgram) -> List[Dict[str, Any]]:
+        # Все CSS-поля за один evaluate; остальным нужен движок селекторов Playwright.
+        items: List[Dict[str, Any]] = []
+        if extraction.dom_script:
+            with span("browser.extract", fields=len(extraction.script_names), batched=True):
+                columns = await page.evaluate(extraction.dom_script)
+            items.extend({"name": name, "values": values} for name, values in zip(extraction.script_names, columns))
+        if extraction.engine_fields:
+            items.extend(await self.extract_fields(page, list(extraction.engine_fields)))
         return items
 
+    async def links(self, page: Page, selectors: Sequence[str], script: Optional[str] = None) -> List[str]:
+        # Абсолютные href всех совпавших ссылок, в порядке документа.
+        if script:
+            return await page.evaluate(script)
+        hrefs: List[str] = []
+        for selector in selectors:
+            hrefs.extend(
+                await page.eval_on_selector_all(selector, "els => els.map(el => el.href).filter(Boolean)")
+            )
+        return hrefs
+
     async def paginate(self, page: Page, pagination: Dict[str, Any]) -> None:
-        if pagination.get("type") == "click" and pagination.get("selector"):
+        # Темп задаёт лимитер домена, а не фиксированные паузы.
+        kind = pagination.get("type")
+        if not (kind == "scroll" or (kind == "click" and pagination.get("selector"))):
+            return
+        limiter = self._limiter()
+        await limiter.acquire(page.url)
+        started = time.monotonic()
+        if kind == "click":
             await page.click(pagination["selector"])
-            await asyncio.sleep(jitter(2.0, 0.5))
-        elif pagination.get("type") == "scroll":
+        else:
             await page.mouse.wheel(0, 2000)
-            await asyncio.sleep(jitter(1.0, 0.3))
+        try:
+            await page.wait_for_load_state("networkidle", timeout=PAGINATION_SETTLE_MS)
+        except PlaywrightError:
+            # Long-polling pages never go idle; the content has usually arrived anyway.
+            pass
+        await limiter.feedback(page.url, latency=time.monotonic() - started, kind="paginate")
 
     # НОВЫЕ МЕТОДЫ ДЛЯ РАБОТЫ С КАПЧАМИ
-    async def detect_and_solve_captcha(self, page: Page) -> bool:
+    async def detect_and_solve_captcha(self, page: Page, cache_key: Optional[str] = None) -> bool:
         """Обнаруживает и решает капчи на странице."""
-        logger.info("captcha_detection_started")
-
-        # Проверяем наличие reCAPTCHA
-        recaptcha_frames = await page.query_selector_all('iframe[src*="google.com/recaptcha"]')
-        if recaptcha_frames:
-            logger.info("recaptcha_detected")
-            await self._solve_recaptcha(page)
-            return True
-
-        # Проверяем наличие hCaptcha
-        hcaptcha_frames = await page.query_selector_all('iframe[src*="hcaptcha.com"]')
-        if hcaptcha_frames:
-            logger.info("hcaptcha_detected")
-            await self._solve_hcaptcha(page)
-            return True
-
-        # Проверяем наличие image captcha
-        captcha_images = await page.query_selector_all('img[src*="captcha"], img[alt*="captcha"]')
-        if captcha_images:
-            logger.info("image_captcha_detected")
-            await self._solve_image_captcha(page, captcha_images[0])
-            return True
-
-        return False
-
-    async def _solve_recaptcha(self, page: Page) -> None:
+        detection = await self.captcha_detector.detect(page, cache_key)
+        if not detection.detected:
+            return False
+
+        track("captchas")
+        if detection.kind != "cloudflare" and not self.captcha_solver.configured:
+            # Без провайдера решать нечем: фиксируем капчу и продолжаем с тем, что отдала страница.
+            logger.warning("captcha_unsolved", kind=detection.kind, url=page.url, reason="no_provider")
+            return False
+        await self._limiter().feedback(page.url, captcha=True)
+        with span("browser.captcha", kind=detection.kind), CAPTCHA_SOLVE_SECONDS.time(kind=detection.kind):
+            if detection.kind in ("recaptcha_v2", "recaptcha_v3"):
+                await self._solve_recaptcha(page, detection)
+            elif detection.kind == "hcaptcha":
+                await self._solve_hcaptcha(page, detection)
+            elif detection.kind == "image":
+                await self._solve_image_captcha(page, detection)
+            elif detection.kind == "cloudflare":
+                await self._wait_for_challenge(page)
+        return True
+
+    async def _solve_recaptcha(self, page: Page, detection: CaptchaDetection) -> None:
         """Решает reCAPTCHA."""
         try:
-            # Получаем sitekey и URL
-            site_key = await page.evaluate("""
-                () => {
-                    const recaptcha = document.querySelector('.g-recaptcha');
-                    return recaptcha ? recaptcha.getAttribute('data-sitekey') : null;
-                }
-            """)
-
-            if not site_key:
-                # Пробуем найти в iframe
-                site_key = await page.evaluate("""
-                    () => {
-                        const iframe = document.querySelector('iframe[src*="google.com/recaptcha"]');
-                        if (iframe) {
-                            const src = iframe.src;
-                            const match = src.match(/[&?]k=([^&]+)/);
-                            return match ? match[1] : null;
-                        }
-                        return null;
-                    }
-                """)
-
-            if site_key:
-                url = page.url
-                logger.info("solving_recaptcha", site_key=site_key, url=url)
-
-                # Решаем капчу
-                token = await self.captcha_solver.solve_recaptcha_v2(site_key, url)
-                logger.info("recaptcha_solved", token=token[:50] + "...")
-
-                # Вводим токен
-                await page.evaluate("""
-                    (token) => {
-                        // Ищем элемент для ввода токена
-                        const responseElement = document.getElementById('g-recaptcha-response') ||
-                                               document.querySelector('[name="g-recaptcha-response"]');
-                        if (responseElement) {
-                            responseElement.value = token;
-                            const event = new Event('change', { bubbles: true });
-                            responseElement.dispatchEvent(event);
-                        }
-                    }
-                """, token)
-
-                logger.info("recaptcha_token_applied")
+            if not detection.site_key:
+                logger.warning("recaptcha_site_key_missing")
+                return
+
+            url = page.url
+            logger.info("solving_recaptcha", kind=detection.kind, site_key=detection.site_key, url=url)
+
+            # Решаем капчу (или берём готовый токен из пула)
+            token = await self.token_pool.acquire(detection.kind, detection.site_key, url, detection.action)
+            logger.info("recaptcha_solved", token=token[:50] + "...")
+
+            await self._apply_token(page, detection.response_selector, token)
+            logger.info("recaptcha_token_applied")
 
         except Exception as e:
             logger.error("recaptcha_solve_failed", error=str(e))
             raise
 
-    async def _solve_hcaptcha(self, page: Page) -> None:
+    async def _solve_hcaptcha(self, page: Page, detection: CaptchaDetection) -> None:
         """Решает hCaptcha."""
         try:
-            # Получаем sitekey
-            site_key = await page.evaluate("""
-                () => {
-                    const iframe = document.querySelector('iframe[src*="hcaptcha.com"]');
-                    if (iframe) {
-                        const src = iframe.src;
-                        const match = src.match(/[&?]sitekey=([^&]+)/);
-                        return match ? match[1] : null;
-                    }
-                    return null;
-                }
-            """)
-
-            if site_key:
-                url = page.url
-                logger.info("solving_hcaptcha", site_key=site_key, url=url)
-
-                # Решаем капчу
-                token = await self.captcha_solver.solve_hcaptcha(site_key, url)
-                logger.info("hcaptcha_solved", token=token[:50] + "...")
-
-                # Вводим токен (hCaptcha использует другой элемент)
-                await page.evaluate("""
-                    (token) => {
-                        // hCaptcha обычно использует textarea с именем h-captcha-response
-                        const responseElement = document.querySelector('textarea[name="h-captcha-response"]');
-                        if (responseElement) {
-                            responseElement.value = token;
-                            const event = new Event('change', { bubbles: true });
-                            responseElement.dispatchEvent(event);
-                        }
-                    }
-                """, token)
-
-                logger.info("hcaptcha_token_applied")
+            if not detection.site_key:
+                logger.warning("hcaptcha_site_key_missing")
+                return
+
+            url = page.url
+            logger.info("solving_hcaptcha", site_key=detection.site_key, url=url)
+
+            token = await self.token_pool.acquire("hcaptcha", detection.site_key, url)
+            logger.info("hcaptcha_solved", token=token[:50] + "...")
+
+            await self._apply_token(page, detection.response_selector, token)
+            logger.info("hcaptcha_token_applied")
 
         except Exception as e:
             logger.error("hcaptcha_solve_failed", error=str(e))
             raise
 
-    async def _solve_image_captcha(self, page: Page, image_element) -> None:
+    async def _solve_image_captcha(self, page: Page, detection: CaptchaDetection) -> None:
         """Решает image captcha."""
         try:
+            image_element = await page.query_selector(detection.image_selector) if detection.image_selector else None
+            if image_element is None:
+                logger.warning("image_captcha_element_missing")
+                return
+
             # Получаем изображение капчи
             screenshot = await image_element.screenshot()
             image_base64 = base64.b64encode(screenshot).decode('utf-8')
@@ -244,15 +406,36 @@ class BrowserRunner:
             solution = await self.captcha_solver.solve_image_captcha_base64(image_base64)
             logger.info("image_captcha_solved", solution=solution)
 
-            # Находим поле для ввода решения
-            input_field = await page.query_selector('input[name="captcha"], input[type="text"]')
-            if input_field:
-                await input_field.fill(solution)
+            if detection.input_selector:
+                await page.fill(detection.input_selector, solution)
                 logger.info("image_captcha_solution_applied")
 
         except Exception as e:
             logger.error("image_captcha_solve_failed", error=str(e))
             raise
 
+    async def _wait_for_challenge(self, page: Page) -> None:
+        """Ждёт, пока Cloudflare-подобная заглушка не пропустит страницу."""
+        logger.info("challenge_wait_started", url=page.url)
+        try:
+            await page.wait_for_function(CHALLENGE_CLEARED_SCRIPT, timeout=self._settings.page_timeout)
+            logger.info("challenge_cleared", url=page.url)
+        except Exception as e:
+            logger.error("challenge_wait_failed", error=str(e))
+            raise
+
+    async def _apply_token(self, page: Page, selector: Optional[str], token: str) -> None:
+        # Вводим токен в поле ответа, найденное детектором
+        await page.evaluate("""
+            ([selector, token]) => {
+                const responseElement = selector ? document.querySelector(selector) : null;
+                if (responseElement) {
+                    responseElement.value = token;
+                    const event = new Event('change', { bubbles: true });
+                    responseElement.dispatchEvent(event);
+                }
+            }
+        """, [selector, token])
+
 
 __all__ = ["BrowserRunner"]
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""Plan execution shared by the CLI and queue jobs."""
+
+from __future__ import annotations
+
+import asyncio
+from itertools import zip_longest
+from typing import Any, Awaitable, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from playwright.async_api import Error as PlaywrightError
+
+from ..config import get_settings
+from ..crawl.discovery import SitemapDiscovery
+from ..crawl.frontier import Frontier
+from ..extractor.network import NetworkCapture
+from ..logging import event_dict_from_exc, get_logger
+from ..pipeline.pages import PageRecorder
+from ..planner.compiler import FOLLOW, CompiledPlan, CompiledStep, ExtractionProgram, Op, compile_plan
+from ..planner.schema import PlanDocument
+from ..proxy.manager import ProxyManager
+from ..tasks.progress import track
+from ..utils.metrics import EXTRACTION_SECONDS
+from .browser import BrowserRunner
+from .replay import ApiReplayer, extract_document, learn_template
+from .tabs import TabPool
+
+logger = get_logger(__name__)
+
+RowsCallback = Callable[[List[dict], Any], Awaitable[None]]
+
+
+async def _extract(
+    runner: BrowserRunner, page, plan: PlanDocument, extraction: ExtractionProgram, capture: Optional[NetworkCapture]
+) -> List[dict]:
+    extracted = {}
+    if extraction.network_fields:
+        await capture.wait_for(timeout_ms=plan.network.timeout_ms)
+        extracted.update({field["name"]: field for field in capture.extract_fields(list(extraction.network_fields))})
+        # Each extraction reads the responses of its own page, not everything since the tab opened.
+        capture.clear()
+    if extraction.dom_script or extraction.engine_fields:
+        extracted.update({field["name"]: field for field in await runner.extract_program(page, extraction)})
+    return [extracted[name] for name in extraction.names]
+
+
+def _append_rows(rows: List[dict], extracted: List[dict], limit: int) -> None:
+    field_names = [field["name"] for field in extracted]
+    field_values = [field["values"] for field in extracted]
+    for row_values in zip_longest(*field_values, fillvalue=""):
+        if len(rows) >= limit:
+            break
+        rows.append({name: value for name, value in zip(field_names, row_values)})
+
+
+async def _browser_cookies(plan: PlanDocument) -> dict:
+    settings = get_settings()
+    proxy_manager = ProxyManager(settings.proxy_list) if settings.proxy_list else None
+    runner = BrowserRunner(proxy_manager)
+    async with runner.context() as page:
+        await runner.navigate(page, plan.url)
+        cookies = await page.context.cookies()
+    return {cookie["name"]: cookie["value"] for cookie in cookies}
+
+
+async def _execute_replay(plan: PlanDocument, limit: int, on_rows: Optional[RowsCallback] = None) -> List[dict]:
+    settings = get_settings()
+    proxy_manager = ProxyManager(settings.proxy_list) if settings.proxy_list else None
+    runner = BrowserRunner(proxy_manager)
+    async with runner.context() as page:
+        capture = runner.capture_network(page, plan.network.url_patterns)
+        navigate_targets = [step.target for step in plan.steps if step.action == "navigate" and step.target]
+        await runner.navigate(page, navigate_targets[0] if navigate_targets else plan.url, wait_until="commit")
+        template = await learn_template(page, capture, timeout_ms=plan.network.timeout_ms)
+
+    fields = [field.model_dump() for field in plan.fields if field.json_path]
+    extracted_rows: List[dict] = []
+    async with ApiReplayer(template, refresh_cookies=lambda: _browser_cookies(plan)) as replayer:
+        async for document in replayer.pages(plan.network.replay):
+            before = len(extracted_rows)
+            _append_rows(extracted_rows, extract_document(document, fields), limit)
+            if on_rows is not None and len(extracted_rows) > before:
+                await on_rows(extracted_rows[before:], None)
+            if len(extracted_rows) >= limit:
+                break
+    logger.info("replay_complete", items=len(extracted_rows), endpoint=template.url)
+    return extracted_rows
+
+
+async def _frontier(plan: PlanDocument, program: CompiledPlan) -> Optional[Frontier]:
+    """Pages to visit for crawl and discovery plans, or ``None`` to run the steps as written."""
+    if plan.crawl is None and plan.discovery is None:
+        return None
+    frontier = Frontier(plan.crawl.max_pages if plan.crawl else plan.discovery.max_urls)
+    if plan.crawl:
+        frontier.extend(program.seeds or [plan.url])
+    if plan.discovery:
+        async with SitemapDiscovery(plan.discovery) as discovery:
+            await frontier.feed(discovery.discover(plan.url))
+    if not frontier:
+        logger.warning("discovery_empty", url=plan.url)
+        frontier.close()
+        return None
+    logger.info("discovery_frontier", urls=len(frontier))
+    return frontier
+
+
+def _page_steps(
+    plan: PlanDocument, program: CompiledPlan, url: str, depth: int
+) -> Iterator[Tuple[CompiledStep, int]]:
+    """``(step, depth)`` pairs for one frontier URL: navigate there, then the plan's per-page steps.
+
+    Crawl plans end with a ``follow`` step on pages shallower than ``max_depth``.
+    """
+    yield CompiledStep(Op.NAVIGATE, url), depth
+    for step in program.page_steps:
+        yield step, depth
+    if plan.crawl is not None and depth < plan.crawl.max_depth:
+        yield FOLLOW, depth
+
+
+class _Tab:
+    """A page of the browser context and the state of its current visit."""
+
+    def __init__(self, page: Any, capture: Optional[NetworkCapture]) -> None:
+        self.page = page
+        self.capture = capture
+        self.url: Optional[str] = None
+        self.visited: Any = None
+        self.loaded = False
+        self.skip = False
+
+
+class _PlanRun:
+    """Executes compiled steps on tabs and collects their rows.
+
+    Tabs may run concurrently, and the recorder shares one database session
+    with ``on_rows`` in queue jobs, so every awaited recorder call and
+    ``on_rows`` happen under ``_lock``.
+    """
+
+    def __init__(
+        self,
+        plan: PlanDocument,
+        program: CompiledPlan,
+        runner: BrowserRunner,
+        limit: int,
+        recorder: Optional[PageRecorder],
+        on_rows: Optional[RowsCallback],
+        frontier: Optional[Frontier],
+    ) -> None:
+        self._plan = plan
+        self._program = program
+        self._runner = runner
+        self._limit = limit
+        self._recorder = recorder
+        self._on_rows = on_rows
+        self._frontier = frontier
+        self._lock = asyncio.Lock()
+        # Rendering can only be skipped when every field comes from captured responses.
+        dom_fields = program.extraction.dom_script or program.extraction.engine_fields
+        skip_render = plan.network is not None and plan.network.skip_render and not dom_fields
+        self._wait_until = "commit" if skip_render else "networkidle"
+        # With a single fixed page the executor recycles the browser itself; TabPool does it between visits.
+        self.recycle_inline = frontier is None
+        self.rows: List[dict] = []
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self._limit
+
+    def open_tab(self, page: Any) -> _Tab:
+        plan = self._plan
+        return _Tab(page, self._runner.capture_network(page, plan.network.url_patterns) if plan.network else None)
+
+    async def visit(self, tab: _Tab, url: str, depth: int) -> bool:
+        try:
+            await self.run(tab, _page_steps(self._plan, self._program, url, depth))
+        except PlaywrightError as exc:
+            if not self._runner.connected:
+                raise
+            # A page that times out or breaks must not end the crawl; its error is already counted.
+            logger.warning("page_failed", url=url, depth=depth, **event_dict_from_exc(exc))
+        return self.full
+
+    async def run(self, tab: _Tab, steps: Iterable[Tuple[CompiledStep, int]]) -> None:
+        try:
+            await self._run(tab, steps)
+        except Exception:
+            track("errors")
+            raise
+
+    async def _run(self, tab: _Tab, steps: Iterable[Tuple[CompiledStep, int]]) -> None:
+        runner = self._runner
+        extract_pattern = self._program.extract_pattern
+        for step, depth in steps:
+            op = step.op
+            if op is Op.NAVIGATE:
+                await self._navigate(tab, step.target)
+            elif op is Op.FOLLOW:
+                # Unchanged regions still lead to pages that may have changed; 304s were never loaded.
+                if tab.loaded:
+                    hrefs = await runner.links(tab.page, self._program.link_selectors, self._program.links_script)
+                    added = self._frontier.extend(filter(self._program.link_filter, hrefs), depth + 1)
+                    logger.debug("crawl_links", url=tab.url, depth=depth + 1, added=added)
+            elif tab.skip:
+                continue
+            elif op is Op.CLICK:
+                await tab.page.click(step.target)
+            elif op is Op.FILL:
+                await tab.page.fill(step.target, step.value)
+            elif op is Op.WAIT:
+                await runner.wait(tab.page, step.wait)
+            elif op is Op.EXTRACT and not (extract_pattern and not extract_pattern.search(tab.url or "")):
+                await self._extract_rows(tab)
+            if self.full:
+                break
+
+    async def _navigate(self, tab: _Tab, url: str) -> None:
+        runner, recorder = self._runner, self._recorder
+        tab.url = url
+        tab.loaded = tab.skip = False
+        if tab.capture is not None:
+            tab.capture.clear()
+        if self.recycle_inline:
+            recycled = await runner.recycle_if_needed(tab.page)
+            if recycled is not tab.page:
+                fresh = self.open_tab(recycled)
+                tab.page, tab.capture = fresh.page, fresh.capture
+        if recorder is not None and recorder.incremental:
+            async with self._lock:
+                previous = await recorder.previous(url)
+            if previous is not None and await runner.revalidate(
+                tab.page, url, previous.etag, previous.last_modified
+            ):
+                tab.visited = recorder.mark_unchanged(url, previous)
+                track("pages")
+                tab.skip = True
+                return
+        response = await runner.navigate(tab.page, url, wait_until=self._wait_until)
+        tab.loaded = True
+        # A URL served again with the same ETag was already found clean; anything else gets the in-page probe.
+        etag = response.headers.get("etag") if response else None
+        await runner.detect_and_solve_captcha(tab.page, f"{url} {etag}" if etag else None)
+        if recorder is not None:
+            html = await tab.page.content() if recorder.snapshots else None
+            async with self._lock:
+                tab.visited = await recorder.record(url, html, response.headers if response else None)
+
+    async def _extract_rows(self, tab: _Tab) -> None:
+        recorder = self._recorder
+        with EXTRACTION_SECONDS.time():
+            extracted = await _extract(self._runner, tab.page, self._plan, self._program.extraction, tab.capture)
+        async with self._lock:
+            if tab.visited is not None and await recorder.region_unchanged(tab.visited, extracted):
+                tab.skip = True
+                return
+            before = len(self.rows)
+            _append_rows(self.rows, extracted, self._limit)
+            if recorder is not None:
+                recorder.attribute(tab.visited, len(self.rows) - before)
+            if self._on_rows is not None and len(self.rows) > before:
+                await self._on_rows(self.rows[before:], tab.visited)
+
+
+async def execute_plan(
+    plan: PlanDocument,
+    limit: int,
+    recorder: Optional[PageRecorder] = None,
+    on_rows: Optional[RowsCallback] = None,
+) -> List[dict]:
+    """Run ``plan`` in a browser and return up to ``limit`` extracted rows.
+
+    ``on_rows`` is awaited with each batch of new rows and the page they came
+    from, so callers can persist or publish items while the plan is running.
+    With ``plan.discovery`` the pages come from robots.txt and sitemaps instead
+    of the plan's navigate steps; with ``plan.crawl`` links matched by its
+    selectors are followed breadth-first up to ``max_depth``. Both skip
+    pagination and spread their pages over up to ``BROWSER_TABS`` tabs.
+    """
+    if plan.network and plan.network.replay:
+        return await _execute_replay(plan, limit, on_rows)
+    program = compile_plan(plan)
+    settings = get_settings()
+    proxy_manager = ProxyManager(settings.proxy_list) if settings.proxy_list else None
+    runner = BrowserRunner(proxy_manager)
+    if recorder is not None:
+        recorder.note_fingerprint(runner.fingerprint.name if runner.fingerprint else None)
+    frontier = await _frontier(plan, program)
+    execution = _PlanRun(plan, program, runner, limit, recorder, on_rows, frontier)
+    try:
+        async with runner.context() as page:
+            if frontier is not None:
+                await TabPool(runner).run(page, frontier, execution.open_tab, execution.visit)
+            else:
+                tab = execution.open_tab(page)
+                await execution.run(tab, ((step, 0) for step in program.steps))
+                if plan.pagination.type != "none":
+                    await runner.paginate(tab.page, plan.pagination.model_dump())
+    finally:
+        if frontier is not None:
+            if plan.crawl:
+                logger.info("crawl_complete", pages=frontier.accepted, pending=len(frontier))
+            frontier.close()
+    return execution.rows[:limit]
+
+__all__ = ["RowsCallback", "execute_plan"]
@@ -0,0 +1,188 @@
+"""Replay captured XHR/JSON endpoints directly over HTTP."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlsplit, urlunsplit
+
+import httpx
+from playwright.async_api import Page
+
+from ..extractor.jsonpath import compile_path
+from ..extractor.network import CapturedResponse, NetworkCapture
+from ..logging import get_logger
+from ..planner.schema import ReplayInstruction
+from ..utils.ratelimit import RateLimiter, get_rate_limiter
+
+logger = get_logger(__name__)
+
+CookieRefresher = Callable[[], Awaitable[Dict[str, str]]]
+
+# Headers that belong to the browser's connection rather than to the request.
+_DROP_HEADERS = {"host", "cookie", "content-length", "connection", "accept-encoding", "transfer-encoding"}
+
+
+@dataclass
+class RequestTemplate:
+    """Method, URL, query, headers, cookies and body of a captured request."""
+
+    url: str
+    method: str = "GET"
+    params: Dict[str, str] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    cookies: Dict[str, str] = field(default_factory=dict)
+    body: Optional[str] = None
+
+    @classmethod
+    def from_capture(cls, entry: CapturedResponse, cookies: Iterable[Dict[str, Any]] = ()) -> "RequestTemplate":
+        parts = urlsplit(entry.url)
+        return cls(
+            url=urlunsplit((parts.scheme, parts.netloc, parts.path, "", "")),
+            method=entry.method,
+            params=dict(parse_qsl(parts.query, keep_blank_values=True)),
+            headers={
+                name: value
+                for name, value in entry.request_headers.items()
+                if not name.startswith(":") and name.lower() not in _DROP_HEADERS
+            },
+            cookies={cookie["name"]: cookie["value"] for cookie in cookies},
+            body=entry.post_data,
+        )
+
+
+async def learn_template(
+    page: Page, capture: NetworkCapture, pattern: Optional[str] = None, timeout_ms: int = 10_000
+) -> RequestTemplate:
+    """Build a template from the latest captured response and the page's cookies."""
+
+    if not await capture.wait_for(pattern, timeout_ms=timeout_ms):
+        raise RuntimeError("No matching JSON response captured; cannot learn replay template")
+    entry = capture.latest(pattern)
+    if entry is None:
+        raise RuntimeError("No matching JSON response captured; cannot learn replay template")
+    template = RequestTemplate.from_capture(entry, await page.context.cookies(entry.url))
+    logger.info("replay_template_learned", url=template.url, params=sorted(template.params))
+    return template
+
+
+def extract_document(document: Any, fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Apply each field's ``json_path`` to one JSON document."""
+
+    return [{"name": field["name"], "values": compile_path(field["json_path"]).find(document)} for field in fields]
+
+
+class ApiReplayer:
+    """Pages through a JSON endpoint with a pooled HTTP client.
+
+    Cookies are refreshed through ``refresh_cookies`` (typically a short browser
+    session) only when the endpoint answers 401 or 403.
+    """
+
+    def __init__(
+        self,
+        template: RequestTemplate,
+        refresh_cookies: Optional[CookieRefresher] = None,
+        max_connections: int = 8,
+        timeout: float = 30.0,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self._template = template
+        self._rate_limiter = rate_limiter or get_rate_limiter()
+        self._refresh_cookies = refresh_cookies
+        self._refresh_lock = asyncio.Lock()
+        self._cookie_generation = 0
+        self._client = httpx.AsyncClient(
+            headers=template.headers,
+            cookies=template.cookies,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def fetch(self, overrides: Optional[Dict[str, Any]] = None) -> Any:
+        params = {**self._template.params, **{key: str(value) for key, value in (overrides or {}).items()}}
+        generation = self._cookie_generation
+        response = await self._send(params)
+        if response.status_code in (401, 403) and self._refresh_cookies is not None:
+            await self._refresh(generation)
+            response = await self._send(params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _send(self, params: Dict[str, str]) -> httpx.Response:
+        url = self._template.url
+        await self._rate_limiter.acquire(url)
+        started = time.monotonic()
+        try:
+            response = await self._client.request(self._template.method, url, params=params, content=self._template.body)
+        except httpx.TransportError:
+            await self._rate_limiter.feedback(url, error=True)
+            raise
+        await self._rate_limiter.feedback(
+            url, status=response.status_code, latency=time.monotonic() - started, headers=response.headers
+        )
+        return response
+
+    async def _refresh(self, generation: int) -> None:
+        async with self._refresh_lock:
+            # Another request may already have refreshed the cookies.
+            if generation != self._cookie_generation:
+                return
+            logger.info("replay_cookie_refresh", url=self._template.url)
+            cookies = await self._refresh_cookies()  # type: ignore[misc]
+            self._client.cookies.clear()
+            self._client.cookies.update(cookies)
+            self._cookie_generation += 1
+
+    async def pages(self, instruction: ReplayInstruction) -> AsyncIterator[Any]:
+        """Yield JSON documents page by page until the endpoint runs dry."""
+
+        if instruction.cursor_path:
+            async for document in self._cursor_pages(instruction):
+                yield document
+            return
+        page_number = instruction.start
+        fetched = 0
+        while fetched < instruction.max_pages:
+            batch = min(instruction.concurrency, instruction.max_pages - fetched)
+            values = [page_number + index * instruction.step for index in range(batch)]
+            documents = await asyncio.gather(*(self.fetch({instruction.page_param: value}) for value in values))
+            for document in documents:
+                if self._is_empty(document, instruction):
+                    return
+                yield document
+            fetched += batch
+            page_number += batch * instruction.step
+
+    async def _cursor_pages(self, instruction: ReplayInstruction) -> AsyncIterator[Any]:
+        cursor_path = compile_path(instruction.cursor_path or "")
+        overrides: Dict[str, Any] = {}
+        for _ in range(instruction.max_pages):
+            document = await self.fetch(overrides)
+            if self._is_empty(document, instruction):
+                return
+            yield document
+            cursors = [value for value in cursor_path.find(document) if value not in (None, "")]
+            if not cursors:
+                return
+            overrides = {instruction.page_param: cursors[0]}
+
+    @staticmethod
+    def _is_empty(document: Any, instruction: ReplayInstruction) -> bool:
+        if not instruction.items_path:
+            return not document
+        return not any(compile_path(instruction.items_path).find(document))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "ApiReplayer":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        await self.aclose()
+
+
+__all__ = ["ApiReplayer", "RequestTemplate", "extract_document", "learn_template"]
@@ -0,0 +1,174 @@
+"""Pipelined page work across several tabs of one browser context.
+
+A single tab spends most of a visit waiting on the network. :class:`TabPool`
+keeps up to ``BROWSER_TABS`` pages of the same context busy with frontier
+URLs, so one tab navigates while another extracts, and all of them share
+cookies, cache and the browser process.
+
+Every ``BROWSER_CPU_INTERVAL`` seconds the pool measures how much of the
+machine the browser processes used. Above ``BROWSER_CPU_HIGH`` it allows one
+tab fewer and below ``BROWSER_CPU_LOW`` one more, so the tab count stays
+where the browser is busy but not starved. Recycling the context (see
+:meth:`BrowserRunner.recycle`) waits until no tab is mid-visit. A visit that
+raises is logged and counted, and its tab moves on to the next URL; only a
+disconnected browser ends the pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+from playwright.async_api import Page
+
+from ..config import get_settings
+from ..crawl.frontier import Frontier
+from ..logging import event_dict_from_exc, get_logger
+from ..utils.cpu import CpuMeter
+from ..utils.metrics import BROWSER_TABS
+from .browser import BrowserRunner
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+OpenTab = Callable[[Page], T]
+Visit = Callable[[T, str, int], Awaitable[bool]]
+
+
+class TabPool(Generic[T]):
+    """Runs ``visit(tab, url, depth)`` for every frontier URL on up to ``max_tabs`` pages.
+
+    ``open_tab`` wraps each new page into whatever per-tab state the caller
+    needs; it is called again after a recycle, when the old pages are gone.
+    ``visit`` returns true to stop the whole pool (for example when the row
+    limit is reached); URLs it queues on the frontier are picked up by any tab.
+    """
+
+    def __init__(
+        self,
+        runner: BrowserRunner,
+        max_tabs: Optional[int] = None,
+        cpu_high: Optional[float] = None,
+        cpu_low: Optional[float] = None,
+        interval: Optional[float] = None,
+        meter: Optional[CpuMeter] = None,
+    ) -> None:
+        settings = get_settings()
+        self._runner = runner
+        self.max_tabs = max(1, max_tabs if max_tabs is not None else settings.browser_tabs)
+        self.limit = self.max_tabs
+        self._cpu_high = cpu_high if cpu_high is not None else settings.browser_cpu_high
+        self._cpu_low = cpu_low if cpu_low is not None else settings.browser_cpu_low
+        self._interval = interval if interval is not None else settings.browser_cpu_interval
+        self._meter = meter or CpuMeter()
+        self._cond = asyncio.Condition()
+        self._active = 0
+        self._generation = 0
+        self._spare: List[Page] = []
+        self._recycle: Optional[str] = None
+        self._stopped = False
+        self.visits = 0
+        self.failures = 0
+
+    def adjust(self, utilization: Optional[float]) -> int:
+        """Shed or add one tab for a CPU ``utilization`` sample; returns the new limit."""
+
+        if utilization is None:
+            return self.limit
+        if utilization > self._cpu_high and self.limit > 1:
+            self.limit -= 1
+        elif utilization < self._cpu_low and self.limit < self.max_tabs:
+            self.limit += 1
+        else:
+            return self.limit
+        logger.info("tab_limit", limit=self.limit, cpu=round(utilization, 2))
+        BROWSER_TABS.set(self.limit)
+        return self.limit
+
+    async def _watch_cpu(self) -> None:
+        await asyncio.to_thread(self._meter.utilization)
+        while True:
+            await asyncio.sleep(self._interval)
+            utilization = await asyncio.to_thread(self._meter.utilization)
+            async with self._cond:
+                self.adjust(utilization)
+                self._cond.notify_all()
+
+    async def _next(self, frontier: Frontier) -> Optional[Tuple[str, int]]:
+        """Claim a tab slot and a URL; ``None`` once the frontier is exhausted or the pool stopped."""
+
+        async with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                if self._recycle is not None:
+                    if self._active == 0:
+                        # Nobody is mid-visit, so closing the context cannot pull a page out from under a tab.
+                        self._spare = [await self._runner.recycle(self._recycle)]
+                        self._generation += 1
+                        self._recycle = None
+                        continue
+                elif self._active < self.limit and frontier:
+                    self._active += 1
+                    return frontier.pop()
+                elif self._active == 0 and not frontier:
+                    self._stopped = True
+                    self._cond.notify_all()
+                    return None
+                await self._cond.wait()
+
+    async def _release(self, stop: bool) -> None:
+        reason = None if stop else await self._runner.recycle_reason()
+        async with self._cond:
+            self._active -= 1
+            self.visits += 1
+            if stop:
+                self._stopped = True
+            if reason is not None:
+                self._recycle = reason
+            self._cond.notify_all()
+
+    async def _worker(self, frontier: Frontier, open_tab: OpenTab, visit: Visit) -> None:
+        tab: Optional[T] = None
+        generation = -1
+        while True:
+            item = await self._next(frontier)
+            if item is None:
+                return
+            stop = True
+            try:
+                if tab is None or generation != self._generation:
+                    page = self._spare.pop() if self._spare else await self._runner.new_tab()
+                    tab, generation = open_tab(page), self._generation
+                stop = await visit(tab, *item)
+            except Exception as exc:
+                if not self._runner.connected:
+                    raise
+                self.failures += 1
+                logger.warning("tab_visit_failed", url=item[0], depth=item[1], **event_dict_from_exc(exc))
+                stop = False
+            finally:
+                await self._release(stop)
+
+    async def run(self, first: Page, frontier: Frontier, open_tab: OpenTab, visit: Visit) -> None:
+        """Drain ``frontier``; ``first`` is the context's existing page and becomes the first tab."""
+
+        self._spare = [first]
+        BROWSER_TABS.set(self.limit)
+        watcher = asyncio.create_task(self._watch_cpu()) if self.max_tabs > 1 and self._interval > 0 else None
+        workers = [asyncio.create_task(self._worker(frontier, open_tab, visit)) for _ in range(self.max_tabs)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            if watcher is not None:
+                watcher.cancel()
+            await asyncio.gather(*workers, *([watcher] if watcher else []), return_exceptions=True)
+        logger.info(
+            "tab_pool_complete", visits=self.visits, failures=self.failures, tabs=self.max_tabs, limit=self.limit
+        )
+
+
+__all__ = ["TabPool"]
@@ -0,0 +1,124 @@
+"""Queue jobs executed by ``deepscraper-worker``."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import timezone
+from typing import List, Optional
+
+from rq import get_current_job
+
+from ..captcha.pool import close_token_pool
+from ..config import get_settings
+from ..logging import configure_logging, event_dict_from_exc, get_logger
+from ..pipeline.db import init_db, session_scope
+from ..pipeline.diff import make_item
+from ..pipeline.models import Page, Project, Run
+from ..pipeline.pages import PageRecorder
+from ..planner.deepseek_client import DeepSeekClient
+from ..planner.schema import PlanDocument
+from ..runner.executor import execute_plan
+from ..utils.metrics import DB_FLUSH_SECONDS, REGISTRY
+from ..utils.metrics import enabled as metrics_enabled
+from ..utils import tracing
+from ..utils.memory import MemoryWatchdog
+from ..utils.profiling import RunProfiler
+from ..utils.snapshots import get_snapshot_store
+from ..utils.tracing import SpanContext, extract, record_span, span
+from .progress import ProgressReporter, track
+
+logger = get_logger(__name__)
+
+
+async def _plan(url: str, goal: str) -> PlanDocument:
+    client = DeepSeekClient()
+    try:
+        return await client.generate_plan(url=url, goal=goal)
+    finally:
+        await client.aclose()
+
+
+async def execute_run(run_id: int, limit: int = 100, parent: Optional[SpanContext] = None) -> int:
+    """Execute a queued run, committing items as they are extracted; returns the item count."""
+
+    with span("job.run", parent=parent, run_id=run_id):
+        async with MemoryWatchdog(run_id=run_id):
+            return await _execute_run(run_id, limit)
+
+
+async def _job(run_id: int, limit: int, parent: Optional[SpanContext]) -> int:
+    # The work-horse's only event loop: process-wide pools are closed before it ends.
+    try:
+        return await execute_run(run_id, limit, parent)
+    finally:
+        await close_token_pool()
+
+
+async def _execute_run(run_id: int, limit: int) -> int:
+    await init_db()
+    async with session_scope() as session:
+        run = await session.get(Run, run_id)
+        if run is None:
+            raise ValueError(f"Run {run_id} does not exist")
+        project = await session.get(Project, run.project_id)
+        run.status = "running"
+        await session.commit()
+        extracted = 0
+        try:
+            if not run.plan.get("steps"):
+                run.plan = (await _plan(run.plan["url"], run.plan["goal"])).model_dump()
+                await session.commit()
+            plan_doc = PlanDocument.model_validate(run.plan)
+            recorder = PageRecorder(session, run, project.name, get_snapshot_store())
+
+            async def _store(rows: List[dict], page: Optional[Page]) -> None:
+                nonlocal extracted
+                session.add_all(make_item(run.id, row, plan_doc.item_key, page) for row in rows)
+                with DB_FLUSH_SECONDS.time():
+                    await session.commit()
+                extracted += len(rows)
+                track("rows", len(rows))
+
+            try:
+                async with ProgressReporter(run_id):
+                    await execute_plan(plan_doc, limit, recorder, on_rows=_store)
+            finally:
+                await recorder.close()
+            run.status = "completed"
+        except Exception as exc:
+            await session.rollback()
+            run.status = "failed"
+            await session.commit()
+            logger.error("run_failed", run_id=run_id, **event_dict_from_exc(exc))
+            raise
+    logger.info("run_complete", run_id=run_id, items=extracted)
+    return extracted
+
+
+def run_job(run_id: int, limit: int = 100) -> int:
+    """RQ entry point for :func:`execute_run`."""
+
+    settings = get_settings()
+    configure_logging(settings.log_level)
+    # The work-horse is forked from the worker, whose registry holds everything collected so far.
+    REGISTRY.reset()
+    job = get_current_job()
+    parent = extract(job.meta) if job is not None else None
+    if job is not None and job.enqueued_at is not None:
+        enqueued_ns = int(job.enqueued_at.replace(tzinfo=timezone.utc).timestamp() * 1e9)
+        record_span("queue.wait", enqueued_ns, time.time_ns(), parent=parent, run_id=run_id, job_id=job.id)
+    profiler = RunProfiler(settings.profile_interval) if settings.profile_runs else None
+    try:
+        if profiler is None:
+            return asyncio.run(_job(run_id, limit, parent))
+        return asyncio.run(profiler.run(_job(run_id, limit, parent)))
+    finally:
+        if profiler is not None:
+            profiler.write(settings.export_dir, f"run{run_id}.profile")
+        if metrics_enabled():
+            REGISTRY.dump(settings.metrics_dir)
+        tracing.shutdown()
+
+
+__all__ = ["execute_run", "run_job"]
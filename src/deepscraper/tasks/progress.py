@@ -0,0 +1,89 @@
+"""Worker-side progress reporting.
+
+Code on the hot path calls :func:`track`, which only bumps a counter on the
+reporter bound to the current task (and does nothing when there is none).
+The reporter publishes the accumulated deltas to Redis at most once per
+``interval``, so the volume of progress messages depends on the number of
+running jobs, not on how many pages or rows they process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from ..config import get_settings
+from ..logging import event_dict_from_exc, get_logger
+
+logger = get_logger(__name__)
+
+PROGRESS_CHANNEL = "deepscraper:progress"
+COUNTERS = ("pages", "rows", "errors", "captchas", "proxy_failures", "proxy_successes")
+
+_current: ContextVar[Optional["ProgressReporter"]] = ContextVar("deepscraper_progress", default=None)
+
+
+def track(counter: str, amount: int = 1) -> None:
+    """Add ``amount`` to ``counter`` of the run executing in the current task."""
+    reporter = _current.get()
+    if reporter is not None:
+        reporter.counts[counter] = reporter.counts.get(counter, 0) + amount
+
+
+class ProgressReporter:
+    """Publishes throttled counter deltas for one run; use as an async context manager."""
+
+    def __init__(self, run_id: int, redis: Any = None, interval: Optional[float] = None) -> None:
+        settings = get_settings()
+        self.run_id = run_id
+        self.counts: Dict[str, int] = {}
+        self.status = "running"
+        self._interval = interval if interval is not None else settings.progress_interval
+        self._redis = redis
+        self._owns_redis = redis is None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._token: Any = None
+
+    async def __aenter__(self) -> "ProgressReporter":
+        if self._redis is None:
+            from redis.asyncio import Redis
+
+            self._redis = Redis.from_url(get_settings().redis_url)
+        self._token = _current.set(self)
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        _current.reset(self._token)
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if exc_type is not None:
+            self.status = "failed"
+            self.counts["errors"] = self.counts.get("errors", 0) + 1
+        elif self.status == "running":
+            self.status = "completed"
+        await self.flush(final=True)
+        if self._owns_redis:
+            await self._redis.aclose()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.flush()
+
+    async def flush(self, final: bool = False) -> None:
+        if not self.counts and not final:
+            return
+        delta, self.counts = self.counts, {}
+        message = {"run_id": self.run_id, "ts": time.time(), "status": self.status, "delta": delta}
+        try:
+            await self._redis.publish(PROGRESS_CHANNEL, json.dumps(message))
+        except Exception as exc:  # progress must never fail a run
+            logger.warning("progress_publish_failed", run_id=self.run_id, **event_dict_from_exc(exc))
+
+
+__all__ = ["COUNTERS", "PROGRESS_CHANNEL", "ProgressReporter", "track"]
@@ -6,9 +6,14 @@ from typing import Callable
 
 from redis import Redis
 from rq import Connection, Queue, Worker
+from rq.job import Job
 
 from ..config import get_settings
 from ..logging import get_logger
+from ..utils import memory
+from ..utils.metrics import enabled as metrics_enabled
+from ..utils.metrics import start_metrics_server
+from ..utils.tracing import inject, span
 
 logger = get_logger(__name__)
 
@@ -19,18 +24,42 @@ def get_queue(name: str = "deepscraper") -> Queue:
     return Queue(name, connection=connection)
 
 
-def enqueue(job: Callable, *args, **kwargs) -> None:
+def enqueue(job: Callable, *args, **kwargs) -> Job:
+    """Enqueue ``job``; the active trace context travels in the job's meta."""
     queue = get_queue()
-    queue.enqueue(job, *args, **kwargs)
+    with span("queue.enqueue", job=getattr(job, "__name__", str(job))):
+        meta = inject(dict(kwargs.pop("meta", None) or {}))
+        return queue.enqueue(job, *args, meta=meta, **kwargs)
+
+
+class MemoryBoundedWorker(Worker):
+    """Stops taking jobs once the worker process tree outgrows ``WORKER_MAX_RSS_MB``.
+
+    Jobs run in forked work-horses, so whatever the worker itself accumulates is
+    inherited by every later job. Draining after the current job and exiting
+    lets the supervisor (compose ``restart``, systemd) start a clean process
+    instead of the OOM killer taking one down mid-run.
+    """
+
+    def execute_job(self, job: Job, queue: Queue) -> None:
+        super().execute_job(job, queue)
+        limit = get_settings().worker_max_rss_mb
+        usage = memory.sample()
+        logger.info("worker_memory", job_id=job.id, **usage.as_log())
+        if limit and usage.total_mb >= limit:
+            logger.warning("worker_drain", reason="rss", limit_mb=limit, **usage.as_log())
+            self._stop_requested = True
 
 
 def worker() -> None:
     settings = get_settings()
     connection = Redis.from_url(settings.redis_url)
     with Connection(connection):
-        worker = Worker(["deepscraper"])
-        logger.info("worker_start")
-        worker.work()
+        worker = MemoryBoundedWorker(["deepscraper"])
+        if metrics_enabled():
+            start_metrics_server(settings.metrics_port, settings.metrics_dir)
+        logger.info("worker_start", metrics_port=settings.metrics_port if metrics_enabled() else None)
+        worker.work(max_jobs=settings.worker_max_jobs or None)
 
 
-__all__ = ["get_queue", "enqueue", "worker"]
+__all__ = ["MemoryBoundedWorker", "get_queue", "enqueue", "worker"]
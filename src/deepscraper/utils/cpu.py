@@ -0,0 +1,71 @@
+"""CPU usage of the browser processes, for backpressure on concurrent tabs.
+
+CPU time is read from ``/proc/<pid>/stat`` for every descendant of this
+process (the Playwright driver and all Chromium processes). Outside Linux
+nothing can be measured and :meth:`CpuMeter.utilization` returns ``None``.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Dict, Optional
+
+from .memory import PROC, child_pids
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def cpu_seconds(pid: int) -> Optional[float]:
+    """User plus system CPU time of ``pid``; ``None`` if it is gone."""
+
+    try:
+        stat = (PROC / str(pid) / "stat").read_text()
+    except OSError:
+        return None
+    # Fields after the command name: state is [0], utime [11], stime [12].
+    fields = stat.rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+class CpuMeter:
+    """Share of all available cores the children of ``pid`` used since the previous call."""
+
+    def __init__(self, pid: Optional[int] = None) -> None:
+        self._pid = pid
+        self._cores = available_cores()
+        self._times: Dict[int, float] = {}
+        self._sampled: Optional[float] = None
+
+    def _read(self) -> Dict[int, float]:
+        times = {}
+        for child in child_pids(self._pid):
+            seconds = cpu_seconds(child)
+            if seconds is not None:
+                times[child] = seconds
+        return times
+
+    def utilization(self) -> Optional[float]:
+        """Fraction in ``[0, 1]``; ``None`` on the first call or when ``/proc`` is unavailable."""
+
+        if not PROC.is_dir():
+            return None
+        now = time.monotonic()
+        times = self._read()
+        previous, sampled = self._times, self._sampled
+        self._times, self._sampled = times, now
+        if sampled is None or now <= sampled:
+            return None
+        # Processes that exited since the last sample take their CPU time with them; new ones count in full.
+        used = sum(max(0.0, seconds - previous.get(pid, 0.0)) for pid, seconds in times.items())
+        return min(1.0, used / ((now - sampled) * self._cores))
+
+
+__all__ = ["CpuMeter", "available_cores", "cpu_seconds"]
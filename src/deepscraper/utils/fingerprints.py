@@ -0,0 +1,307 @@
+"""Coherent browser fingerprint profiles and their precompiled stealth bundles.
+
+Picking the user agent, viewport and languages independently produces
+combinations no real browser has (a macOS user agent with ``Win32`` as
+``navigator.platform``, a Firefox user agent on Chromium, an NVIDIA WebGL
+renderer on a Mac), and anti-bot vendors answer those with challenges.
+A :class:`FingerprintProfile` keeps all of it consistent: user agent and
+client hints, platform and CPU architecture, screen and viewport, locale
+and languages, timezone, WebGL vendor/renderer and hardware hints.
+
+Each profile is compiled once into the ``new_context`` keyword arguments
+and a single init script; both are cached per profile and Chromium
+version, so contexts only pay for a dict copy and one ``add_init_script``.
+The user agent, the ``Sec-CH-UA*`` request headers and
+``navigator.userAgentData`` are all built from the same brand list and the
+version of the browser actually launched, so what the page's scripts see
+matches what the server received.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+UA_TEMPLATES = {
+    "Windows": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/{major}.0.0.0 Safari/537.36",
+    "macOS": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/{major}.0.0.0 Safari/537.36",
+    "Linux": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/{major}.0.0.0 Safari/537.36",
+}
+NAVIGATOR_PLATFORMS = {"Windows": "Win32", "macOS": "MacIntel", "Linux": "Linux x86_64"}
+PLATFORM_VERSIONS = {"Windows": "15.0.0", "macOS": "14.4.0", "Linux": "6.5.0"}
+DEFAULT_CHROME_MAJOR = 120
+GREASE_BRAND = ("Not_A Brand", "8")
+
+
+@dataclass(frozen=True)
+class FingerprintProfile:
+    name: str
+    os: str  # "Windows", "macOS" or "Linux": selects the UA template, navigator.platform and client hints
+    viewport: Tuple[int, int]
+    screen: Tuple[int, int]
+    device_scale_factor: float
+    locale: str
+    languages: Tuple[str, ...]
+    timezone_id: str
+    webgl_vendor: str
+    webgl_renderer: str
+    hardware_concurrency: int = 8
+    device_memory: int = 8
+    architecture: str = "x86"  # "arm" on Apple silicon; reported by userAgentData.getHighEntropyValues
+    extra_headers: Tuple[Tuple[str, str], ...] = field(default=())
+
+    def user_agent(self, chrome_major: int) -> str:
+        return UA_TEMPLATES[self.os].format(major=chrome_major)
+
+    @property
+    def accept_language(self) -> str:
+        weighted = enumerate(self.languages[1:], 1)
+        return ",".join([self.languages[0]] + [f"{lang};q={max(0.1, 1 - 0.1 * index):.1f}" for index, lang in weighted])
+
+
+PROFILES: List[FingerprintProfile] = [
+    FingerprintProfile(
+        name="win-chrome-us",
+        os="Windows",
+        viewport=(1920, 969),
+        screen=(1920, 1080),
+        device_scale_factor=1.0,
+        locale="en-US",
+        languages=("en-US", "en"),
+        timezone_id="America/New_York",
+        webgl_vendor="Google Inc. (NVIDIA)",
+        webgl_renderer="ANGLE (NVIDIA, NVIDIA GeForce RTX 3060 Direct3D11 vs_5_0 ps_5_0, D3D11)",
+        hardware_concurrency=12,
+    ),
+    FingerprintProfile(
+        name="win-chrome-laptop-us",
+        os="Windows",
+        viewport=(1536, 730),
+        screen=(1536, 864),
+        device_scale_factor=1.25,
+        locale="en-US",
+        languages=("en-US", "en"),
+        timezone_id="America/Chicago",
+        webgl_vendor="Google Inc. (Intel)",
+        webgl_renderer="ANGLE (Intel, Intel(R) UHD Graphics 620 Direct3D11 vs_5_0 ps_5_0, D3D11)",
+    ),
+    FingerprintProfile(
+        name="win-chrome-gb",
+        os="Windows",
+        viewport=(1366, 625),
+        screen=(1366, 768),
+        device_scale_factor=1.0,
+        locale="en-GB",
+        languages=("en-GB", "en"),
+        timezone_id="Europe/London",
+        webgl_vendor="Google Inc. (AMD)",
+        webgl_renderer="ANGLE (AMD, AMD Radeon(TM) Graphics Direct3D11 vs_5_0 ps_5_0, D3D11)",
+        hardware_concurrency=4,
+    ),
+    FingerprintProfile(
+        name="mac-chrome-us",
+        os="macOS",
+        viewport=(1440, 789),
+        screen=(1440, 900),
+        device_scale_factor=2.0,
+        locale="en-US",
+        languages=("en-US", "en"),
+        timezone_id="America/Los_Angeles",
+        webgl_vendor="Google Inc. (Apple)",
+        webgl_renderer="ANGLE (Apple, ANGLE Metal Renderer: Apple M1, Unspecified Version)",
+        architecture="arm",
+    ),
+    FingerprintProfile(
+        name="mac-chrome-de",
+        os="macOS",
+        viewport=(1512, 860),
+        screen=(1512, 982),
+        device_scale_factor=2.0,
+        locale="de-DE",
+        languages=("de-DE", "de", "en-US", "en"),
+        timezone_id="Europe/Berlin",
+        webgl_vendor="Google Inc. (Apple)",
+        webgl_renderer="ANGLE (Apple, ANGLE Metal Renderer: Apple M2 Pro, Unspecified Version)",
+        hardware_concurrency=10,
+        device_memory=8,
+        architecture="arm",
+    ),
+    FingerprintProfile(
+        name="linux-chrome-us",
+        os="Linux",
+        viewport=(1920, 955),
+        screen=(1920, 1080),
+        device_scale_factor=1.0,
+        locale="en-US",
+        languages=("en-US", "en"),
+        timezone_id="America/Denver",
+        webgl_vendor="Google Inc. (Intel)",
+        webgl_renderer="ANGLE (Intel, Mesa Intel(R) UHD Graphics 630 (CFL GT2), OpenGL 4.6)",
+    ),
+]
+PROFILES_BY_NAME: Dict[str, FingerprintProfile] = {profile.name: profile for profile in PROFILES}
+
+
+def choose_profile(name: Optional[str] = None, rng: Optional[random.Random] = None) -> FingerprintProfile:
+    """The profile called ``name``, or a random one for ``None``/``"random"``."""
+
+    if name and name != "random":
+        try:
+            return PROFILES_BY_NAME[name]
+        except KeyError:
+            known = ", ".join(sorted(PROFILES_BY_NAME))
+            raise ValueError(f"Unknown fingerprint profile {name!r}; expected random or one of: {known}") from None
+    return (rng or random).choice(PROFILES)
+
+
+def chrome_major(version: Optional[str]) -> int:
+    """Major version from ``Browser.version`` (``"120.0.6099.28"``)."""
+
+    try:
+        return int((version or "").split(".", 1)[0])
+    except ValueError:
+        return DEFAULT_CHROME_MAJOR
+
+
+def full_version(version: Optional[str]) -> str:
+    """``Browser.version`` when it is a full ``major.minor.build.patch`` version, else ``<major>.0.0.0``."""
+
+    parts = (version or "").split(".")
+    if len(parts) == 4 and all(part.isdigit() for part in parts):
+        return version  # type: ignore[return-value]
+    return f"{chrome_major(version)}.0.0.0"
+
+
+def brands(version: Optional[str], full: bool = False) -> List[Dict[str, str]]:
+    """Client-hint brands of Chrome ``version``: major versions, or full ones for ``fullVersionList``."""
+
+    chrome = full_version(version) if full else str(chrome_major(version))
+    grease = f"{GREASE_BRAND[1]}.0.0.0" if full else GREASE_BRAND[1]
+    return [
+        {"brand": GREASE_BRAND[0], "version": grease},
+        {"brand": "Chromium", "version": chrome},
+        {"brand": "Google Chrome", "version": chrome},
+    ]
+
+
+def client_hint_headers(profile: FingerprintProfile, version: Optional[str]) -> Dict[str, str]:
+    """Low-entropy ``Sec-CH-UA*`` request headers matching ``navigator.userAgentData``."""
+
+    return {
+        "Sec-CH-UA": ", ".join(f'"{brand["brand"]}";v="{brand["version"]}"' for brand in brands(version)),
+        "Sec-CH-UA-Mobile": "?0",
+        "Sec-CH-UA-Platform": f'"{profile.os}"',
+    }
+
+
+_INIT_SCRIPT = """(() => {
+  const fp = __PROFILE__;
+  const define = (target, key, value) => {
+    try { Object.defineProperty(target, key, { get: () => value, configurable: true }); } catch (e) {}
+  };
+  define(Navigator.prototype, 'webdriver', false);
+  define(Navigator.prototype, 'platform', fp.platform);
+  define(Navigator.prototype, 'languages', Object.freeze(fp.languages.slice()));
+  define(Navigator.prototype, 'language', fp.languages[0]);
+  define(Navigator.prototype, 'hardwareConcurrency', fp.hardwareConcurrency);
+  define(Navigator.prototype, 'deviceMemory', fp.deviceMemory);
+  if (navigator.userAgentData) {
+    const freeze = (list) => Object.freeze(list.map((b) => Object.freeze({ ...b })));
+    const brands = freeze(fp.brands);
+    const data = {
+      brands, mobile: false, platform: fp.uaPlatform,
+      getHighEntropyValues: async (hints) => ({ brands, mobile: false, platform: fp.uaPlatform,
+        platformVersion: fp.uaPlatformVersion, architecture: fp.architecture, bitness: '64', model: '',
+        uaFullVersion: fp.fullVersion, fullVersionList: freeze(fp.fullVersionList) }),
+      toJSON: () => ({ brands, mobile: false, platform: fp.uaPlatform }),
+    };
+    define(Navigator.prototype, 'userAgentData', data);
+  }
+  if (!window.chrome) { window.chrome = { runtime: {}, app: { isInstalled: false } }; }
+  const plugins = ['PDF Viewer', 'Chrome PDF Viewer', 'Chromium PDF Viewer', 'WebKit built-in PDF']
+    .map((name) => ({ name, filename: 'internal-pdf-viewer', description: 'Portable Document Format' }));
+  define(Navigator.prototype, 'plugins', plugins);
+  const query = navigator.permissions && navigator.permissions.query;
+  if (query) {
+    navigator.permissions.query = (params) => params && params.name === 'notifications'
+      ? Promise.resolve({ state: Notification.permission, onchange: null })
+      : query.call(navigator.permissions, params);
+  }
+  const contexts = [self.WebGLRenderingContext, self.WebGL2RenderingContext].filter(Boolean);
+  for (const proto of contexts.map((c) => c.prototype)) {
+    const getParameter = proto.getParameter;
+    proto.getParameter = function (parameter) {
+      if (parameter === 37445) return fp.webglVendor;
+      if (parameter === 37446) return fp.webglRenderer;
+      return getParameter.call(this, parameter);
+    };
+  }
+})();"""
+
+
+@lru_cache(maxsize=None)
+def init_script(profile: FingerprintProfile, version: Optional[str] = None) -> str:
+    """The single init script that applies ``profile`` inside every page of a context.
+
+    ``version`` is ``Browser.version`` of the launched browser.
+    """
+
+    payload = {
+        "platform": NAVIGATOR_PLATFORMS[profile.os],
+        "languages": list(profile.languages),
+        "hardwareConcurrency": profile.hardware_concurrency,
+        "deviceMemory": profile.device_memory,
+        "uaPlatform": profile.os,
+        "uaPlatformVersion": PLATFORM_VERSIONS[profile.os],
+        "architecture": profile.architecture,
+        "fullVersion": full_version(version),
+        "brands": brands(version),
+        "fullVersionList": brands(version, full=True),
+        "webglVendor": profile.webgl_vendor,
+        "webglRenderer": profile.webgl_renderer,
+    }
+    return _INIT_SCRIPT.replace("__PROFILE__", json.dumps(payload))
+
+
+@lru_cache(maxsize=None)
+def _context_options(profile: FingerprintProfile, version: Optional[str]) -> Dict[str, Any]:
+    headers = {
+        "Accept-Language": profile.accept_language,
+        **client_hint_headers(profile, version),
+        **dict(profile.extra_headers),
+    }
+    return {
+        "user_agent": profile.user_agent(chrome_major(version)),
+        "viewport": {"width": profile.viewport[0], "height": profile.viewport[1]},
+        "screen": {"width": profile.screen[0], "height": profile.screen[1]},
+        "device_scale_factor": profile.device_scale_factor,
+        "locale": profile.locale,
+        "timezone_id": profile.timezone_id,
+        "extra_http_headers": headers,
+    }
+
+
+def context_options(profile: FingerprintProfile, version: Optional[str] = None) -> Dict[str, Any]:
+    """``Browser.new_context`` keyword arguments for ``profile`` (a fresh copy of the cached dict)."""
+
+    cached = _context_options(profile, version)
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in cached.items()}
+
+
+__all__ = [
+    "FingerprintProfile",
+    "PROFILES",
+    "brands",
+    "choose_profile",
+    "chrome_major",
+    "client_hint_headers",
+    "context_options",
+    "full_version",
+    "init_script",
+]
@@ -0,0 +1,216 @@
+"""Resident memory of this process and its children, plus leak diagnostics.
+
+RSS is read from ``/proc`` so the Playwright driver and every Chromium
+process it spawned are accounted for, not just the Python heap. Outside
+Linux only the Python process is measured, from its peak RSS.
+
+:class:`MemoryWatchdog` samples periodically inside a running job and logs
+the numbers; with ``LOG_LEVEL=DEBUG`` it also logs the allocation sites
+whose tracemalloc totals grew most since the previous sample.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import resource
+import sys
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..config import get_settings
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+PROC = Path("/proc")
+MB = 1024 * 1024
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes(pid: Optional[int] = None) -> int:
+    """Current RSS of ``pid`` (default: this process); 0 if it is gone."""
+
+    try:
+        with (PROC / str(pid or "self") / "statm").open() as fh:
+            return int(fh.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        if pid is None or pid == os.getpid():
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+        return 0
+
+
+def child_pids(pid: Optional[int] = None) -> List[int]:
+    """All descendants of ``pid``, found by walking parent ids in ``/proc``."""
+
+    root = pid or os.getpid()
+    parents: Dict[int, List[int]] = defaultdict(list)
+    try:
+        entries = [entry for entry in os.listdir(PROC) if entry.isdigit()]
+    except OSError:
+        return []
+    for entry in entries:
+        try:
+            stat = (PROC / entry / "stat").read_text()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses; fields resume after the last ')'.
+        parents[int(stat.rsplit(")", 1)[1].split()[1])].append(int(entry))
+    found: List[int] = []
+    pending = [root]
+    while pending:
+        children = parents.get(pending.pop(), [])
+        found.extend(children)
+        pending.extend(children)
+    return found
+
+
+@dataclass
+class MemorySample:
+    python_bytes: int
+    children: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def python_mb(self) -> float:
+        return self.python_bytes / MB
+
+    @property
+    def children_mb(self) -> float:
+        return sum(self.children.values()) / MB
+
+    @property
+    def total_mb(self) -> float:
+        return self.python_mb + self.children_mb
+
+    def as_log(self) -> Dict[str, float]:
+        largest = max(self.children.values(), default=0)
+        return {
+            "python_mb": round(self.python_mb, 1),
+            "children_mb": round(self.children_mb, 1),
+            "children": len(self.children),
+            "largest_child_mb": round(largest / MB, 1),
+        }
+
+
+def sample(pid: Optional[int] = None) -> MemorySample:
+    """RSS of ``pid`` and of each of its descendants (the browser processes)."""
+
+    return MemorySample(rss_bytes(pid), {child: rss_bytes(child) for child in child_pids(pid)})
+
+
+class TracemallocMonitor:
+    """Logs the allocation sites that grew most between consecutive :meth:`diff` calls."""
+
+    def __init__(self, limit: int = 10, frames: int = 5) -> None:
+        self.limit = limit
+        self._frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._started = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            self._started = True
+        self._previous = self._snapshot()
+
+    def stop(self) -> None:
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        self._previous = None
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+        )
+
+    def diff(self) -> List[tracemalloc.StatisticDiff]:
+        current = self._snapshot()
+        if self._previous is None:
+            self._previous = current
+            return []
+        stats = [stat for stat in current.compare_to(self._previous, "traceback") if stat.size_diff > 0]
+        self._previous = current
+        top = stats[: self.limit]
+        for stat in top:
+            frame = stat.traceback[-1] if len(stat.traceback) else None
+            logger.debug(
+                "tracemalloc_growth",
+                site=f"{frame.filename}:{frame.lineno}" if frame else "?",
+                size_diff_kb=round(stat.size_diff / 1024, 1),
+                size_kb=round(stat.size / 1024, 1),
+                count_diff=stat.count_diff,
+            )
+        return top
+
+
+class MemoryWatchdog:
+    """Samples memory every ``interval`` seconds while a job runs.
+
+    Used as ``async with MemoryWatchdog(run_id=...)``; tracemalloc diffs are
+    enabled by ``trace_allocations``, by default when logging at DEBUG.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        trace_allocations: Optional[bool] = None,
+        **context: object,
+    ) -> None:
+        settings = get_settings()
+        self.interval = interval if interval is not None else settings.memory_check_interval
+        self._tracemalloc = (
+            TracemallocMonitor(settings.tracemalloc_top)
+            if (trace_allocations if trace_allocations is not None else settings.log_level.upper() == "DEBUG")
+            else None
+        )
+        self._context = context
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.peak = MemorySample(0)
+
+    def check(self) -> MemorySample:
+        current = sample()
+        if current.total_mb > self.peak.total_mb:
+            self.peak = current
+        logger.info("memory_sample", **self._context, **current.as_log())
+        if self._tracemalloc is not None:
+            self._tracemalloc.diff()
+        return current
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.check)
+            except Exception as exc:
+                logger.warning("memory_sample_failed", error=str(exc))
+
+    async def __aenter__(self) -> "MemoryWatchdog":
+        if self._tracemalloc is not None:
+            self._tracemalloc.start()
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.check()
+        if self._tracemalloc is not None:
+            self._tracemalloc.stop()
+
+
+__all__ = [
+    "MemorySample",
+    "MemoryWatchdog",
+    "TracemallocMonitor",
+    "child_pids",
+    "rss_bytes",
+    "sample",
+]
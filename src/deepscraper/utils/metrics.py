@@ -0,0 +1,331 @@
+"""Counters and histograms rendered in the Prometheus text format.
+
+The hot path only touches a dict entry per observation, and when
+``METRICS_ENABLED`` is off every call returns before doing any work.
+RQ runs each job in a forked work-horse, so job processes :func:`dump`
+their registry into ``METRICS_DIR`` when they finish; the worker's metrics
+server folds those files into its own registry on every scrape.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config import get_settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled: Optional[bool] = None
+
+
+def enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        _enabled = get_settings().metrics_enabled
+    return _enabled
+
+
+def set_enabled(value: Optional[bool]) -> None:
+    """Override ``METRICS_ENABLED``; ``None`` re-reads the setting."""
+    global _enabled
+    _enabled = value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _NoopTimer:
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        return None
+
+
+_NOOP = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_key", "_started")
+
+    def __init__(self, histogram: "Histogram", key: Tuple[str, ...]) -> None:
+        self._histogram = histogram
+        self._key = key
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        self._histogram._observe(self._key, time.perf_counter() - self._started)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self) -> List[List[Any]]:
+        return [[list(key), value] for key, value in list(self._values.items())]
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        if not enabled():
+            return
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values: List[List[Any]]) -> None:
+        for key, value in values:
+            key = tuple(key)
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for key, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        if enabled():
+            self._values[self._key(labels)] = value
+
+    def merge(self, values: List[List[Any]]) -> None:
+        # Later snapshots describe the current state, so they simply replace earlier ones.
+        for key, value in values:
+            self._values[tuple(key)] = value
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for key, value in list(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _observe(self, key: Tuple[str, ...], value: float) -> None:
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if enabled():
+            self._observe(self._key(labels), value)
+
+    def time(self, **labels: Any) -> Any:
+        """Context manager observing the duration of its block in seconds."""
+        if not enabled():
+            return _NOOP
+        return _Timer(self, self._key(labels))
+
+    def merge(self, values: List[List[Any]]) -> None:
+        for key, (counts, total, count) in values:
+            key = tuple(key)
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0] = [left + right for left, right in zip(state[0], counts)]
+            state[1] += total
+            state[2] += count
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for key, (counts, total, count) in list(self._values.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            return "\n".join(line for metric in self._metrics.values() for line in metric.render()) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            for metric in self._metrics.values():
+                metric._values.clear()
+
+    def snapshot(self) -> Dict[str, List[List[Any]]]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items() if metric._values}
+
+    def merge(self, snapshot: Dict[str, List[List[Any]]]) -> None:
+        with self._lock:
+            for name, values in snapshot.items():
+                metric = self._metrics.get(name)
+                if metric is not None:
+                    metric.merge(values)  # type: ignore[attr-defined]
+
+    def dump(self, directory: Path) -> Optional[Path]:
+        """Write this process's observations to ``directory`` for the worker to collect."""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return None
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}-{time.time_ns()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+        tmp.replace(path)
+        return path
+
+    def collect(self, directory: Path) -> int:
+        """Merge and remove snapshot files written by :meth:`dump`."""
+        merged = 0
+        for path in sorted(directory.glob("*.json")) if directory.exists() else []:
+            try:
+                snapshot = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            self.merge(snapshot)
+            path.unlink(missing_ok=True)
+            merged += 1
+        return merged
+
+
+REGISTRY = Registry()
+
+NAVIGATION_SECONDS = REGISTRY.histogram("deepscraper_navigation_seconds", "Page navigation latency")
+WAIT_SECONDS = REGISTRY.histogram("deepscraper_wait_seconds", "Duration of plan wait steps", ["type"])
+EXTRACTION_SECONDS = REGISTRY.histogram("deepscraper_extraction_seconds", "Field extraction time per step")
+DB_FLUSH_SECONDS = REGISTRY.histogram("deepscraper_db_flush_seconds", "Database commit/flush time")
+CAPTCHA_SOLVE_SECONDS = REGISTRY.histogram(
+    "deepscraper_captcha_solve_seconds",
+    "Captcha solve time",
+    ["kind"],
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+PROXY_ERRORS = REGISTRY.counter("deepscraper_proxy_errors_total", "Navigations that failed through a proxy")
+BROWSER_LAUNCHES = REGISTRY.counter("deepscraper_browser_launches_total", "Browser processes launched")
+DOMAIN_RATE = REGISTRY.gauge("deepscraper_domain_rate", "Current allowed requests per second", ["domain"])
+RATE_DECREASES = REGISTRY.counter("deepscraper_rate_decreases_total", "Rate limit cuts by cause", ["domain", "reason"])
+BROWSER_RECYCLES = REGISTRY.counter("deepscraper_browser_recycles_total", "Browser contexts or processes recycled", ["reason"])
+BROWSER_TABS = REGISTRY.gauge("deepscraper_browser_tabs", "Tabs allowed per browser context after CPU backpressure")
+
+
+def start_metrics_server(port: int, directory: Optional[Path] = None) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread, folding in job snapshots from ``directory``."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 - http.server API
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            if directory is not None:
+                REGISTRY.collect(directory)
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            return None
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+__all__ = [
+    "BROWSER_LAUNCHES",
+    "BROWSER_RECYCLES",
+    "BROWSER_TABS",
+    "CAPTCHA_SOLVE_SECONDS",
+    "CONTENT_TYPE",
+    "Counter",
+    "DB_FLUSH_SECONDS",
+    "DOMAIN_RATE",
+    "EXTRACTION_SECONDS",
+    "Gauge",
+    "Histogram",
+    "NAVIGATION_SECONDS",
+    "PROXY_ERRORS",
+    "RATE_DECREASES",
+    "REGISTRY",
+    "Registry",
+    "WAIT_SECONDS",
+    "enabled",
+    "set_enabled",
+    "start_metrics_server",
+]
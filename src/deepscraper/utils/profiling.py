@@ -0,0 +1,288 @@
+"""Sampling profiler and asyncio task breakdown for a single run.
+
+:class:`StackSampler` snapshots the event-loop thread's Python stack from a
+background thread every ``interval`` seconds, in the spirit of py-spy, so
+the run itself is not slowed by per-call tracing the way ``cProfile`` is.
+Samples are written as collapsed stacks (``frame;frame;frame count``, the
+input format of ``flamegraph.pl`` and speedscope) and as a self-contained
+flamegraph SVG.
+
+:class:`TaskProfiler` installs a task factory that times every step of every
+task created while profiling. Per coroutine it reports how long tasks lived,
+how much of that they spent running on the loop (computing) and how much
+suspended (awaiting I/O, locks or other tasks).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import json
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from html import escape
+from pathlib import Path
+from types import FrameType
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, TypeVar
+
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+SVG_WIDTH = 1200
+SVG_ROW = 16
+SVG_MIN_WIDTH = 0.5
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", Path(code.co_filename).stem)
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """Counts the stacks one thread is executing, sampled from a daemon thread."""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None) -> None:
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._thread_id = thread_id
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread_id is None:
+            self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)  # type: ignore[arg-type]
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def svg(self, title: str = "deepscraper profile") -> str:
+        return flamegraph_svg(self.samples, title)
+
+
+def flamegraph_svg(samples: Dict[str, int], title: str = "") -> str:
+    """Render collapsed stacks as a static flamegraph, root at the bottom."""
+
+    tree: Dict[str, Any] = {"count": 0, "children": {}}
+    for stack, count in samples.items():
+        node = tree
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+            node["count"] += count
+
+    def depth(node: Dict[str, Any]) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    total = tree["count"] or 1
+    rows = depth(tree)
+    height = (rows + 2) * SVG_ROW
+    scale = SVG_WIDTH / total
+    rects: List[str] = []
+
+    def draw(name: str, node: Dict[str, Any], x: float, level: int) -> None:
+        width = node["count"] * scale
+        if width < SVG_MIN_WIDTH:
+            return
+        y = height - (level + 1) * SVG_ROW
+        hue = 10 + zlib.crc32(name.split(":")[0].encode()) % 40
+        label = f"{name} ({node['count']} samples, {node['count'] / total:.1%})"
+        text = escape(name[: int(width / 7)]) if width > 21 else ""
+        rects.append(
+            f'<g><title>{escape(label)}</title><rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{SVG_ROW - 1}" '
+            f'fill="hsl({hue},85%,60%)"/><text x="{x + 3:.1f}" y="{y + SVG_ROW - 4}">{text}</text></g>'
+        )
+        for child_name, child in sorted(node["children"].items()):
+            draw(child_name, child, x, level + 1)
+            x += child["count"] * scale
+
+    draw("all", tree, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{SVG_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="{SVG_ROW - 3}" font-size="13">{escape(title)}</text>' + "".join(rects) + "</svg>"
+    )
+
+
+@dataclass
+class TaskStats:
+    name: str
+    tasks: int = 0
+    steps: int = 0
+    wall_seconds: float = 0.0
+    compute_seconds: float = 0.0
+
+    @property
+    def await_seconds(self) -> float:
+        return max(self.wall_seconds - self.compute_seconds, 0.0)
+
+
+class _TimedCoroutine(collections.abc.Coroutine):
+    """Forwards to ``coro`` while adding the time spent in each step to ``stats``."""
+
+    __slots__ = ("_coro", "_stats", "_started")
+
+    def __init__(self, coro: Any, stats: TaskStats) -> None:
+        self._coro = coro
+        self._stats = stats
+        self._started = time.perf_counter()
+        stats.tasks += 1
+
+    def _step(self, method: Any, *args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        except BaseException:
+            self._stats.wall_seconds += time.perf_counter() - self._started
+            raise
+        finally:
+            self._stats.compute_seconds += time.perf_counter() - started
+            self._stats.steps += 1
+
+    def send(self, value: Any) -> Any:
+        return self._step(self._coro.send, value)
+
+    def throw(self, *args: Any) -> Any:
+        return self._step(self._coro.throw, *args)
+
+    def close(self) -> None:
+        self._coro.close()
+
+    def __await__(self) -> Any:
+        return self._coro.__await__()
+
+    def __getattr__(self, name: str) -> Any:
+        # asyncio reprs and debug helpers look at cr_code, cr_frame and friends.
+        return getattr(self._coro, name)
+
+
+class TaskProfiler:
+    """Computing versus awaiting time per coroutine, via a loop task factory."""
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, TaskStats] = {}
+        self._previous: Any = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _stats_for(self, coro: Any) -> TaskStats:
+        name = getattr(coro, "__qualname__", type(coro).__name__)
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = TaskStats(name)
+        return stats
+
+    def _factory(self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any) -> "asyncio.Task[Any]":
+        timed = _TimedCoroutine(coro, self._stats_for(coro))
+        if self._previous is not None:
+            return self._previous(loop, timed, **kwargs)
+        return asyncio.Task(timed, loop=loop, **kwargs)
+
+    def install(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self._loop = loop or asyncio.get_running_loop()
+        self._previous = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._factory)
+
+    def uninstall(self) -> None:
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous)
+            self._loop = None
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        rows = []
+        for stats in sorted(self.stats.values(), key=lambda item: item.compute_seconds, reverse=True):
+            row = asdict(stats)
+            row["wall_seconds"] = round(stats.wall_seconds, 4)
+            row["compute_seconds"] = round(stats.compute_seconds, 4)
+            row["await_seconds"] = round(stats.await_seconds, 4)
+            row["compute_share"] = round(stats.compute_seconds / stats.wall_seconds, 4) if stats.wall_seconds else None
+            rows.append(row)
+        return rows
+
+
+class RunProfiler:
+    """Stack sampling plus task breakdown for one coroutine; see :meth:`run`."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.sampler = StackSampler(interval)
+        self.tasks = TaskProfiler()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    async def run(self, coro: Awaitable[T]) -> T:
+        """Await ``coro`` as a profiled task; tasks it spawns are profiled too."""
+
+        self.tasks.install()
+        self.sampler.start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            return await asyncio.ensure_future(coro)
+        finally:
+            self.wall_seconds += time.perf_counter() - wall
+            self.cpu_seconds += time.process_time() - cpu
+            self.sampler.stop()
+            self.tasks.uninstall()
+
+    def write(self, directory: Path, stem: str) -> List[Path]:
+        """Write ``<stem>.collapsed``, ``<stem>.svg`` and ``<stem>.tasks.json`` into ``directory``."""
+
+        directory.mkdir(parents=True, exist_ok=True)
+        collapsed = directory / f"{stem}.collapsed"
+        collapsed.write_text(self.sampler.collapsed(), encoding="utf-8")
+        svg = directory / f"{stem}.svg"
+        svg.write_text(self.sampler.svg(stem), encoding="utf-8")
+        tasks = directory / f"{stem}.tasks.json"
+        summary = {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "samples": sum(self.sampler.samples.values()),
+            "interval": self.sampler.interval,
+            "tasks": self.tasks.breakdown(),
+        }
+        tasks.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        logger.info("profile_written", collapsed=str(collapsed), svg=str(svg), tasks=str(tasks))
+        return [collapsed, svg, tasks]
+
+
+def top_frames(samples: Dict[str, int], limit: int = 15) -> List[Tuple[str, int]]:
+    """Leaf frames with the most samples, i.e. where the CPU actually was."""
+
+    leaves: Dict[str, int] = defaultdict(int)
+    for stack, count in samples.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return sorted(leaves.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+__all__ = [
+    "RunProfiler",
+    "StackSampler",
+    "TaskProfiler",
+    "TaskStats",
+    "flamegraph_svg",
+    "top_frames",
+]
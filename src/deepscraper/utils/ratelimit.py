@@ -0,0 +1,377 @@
+"""Per-domain adaptive rate limiting.
+
+Every domain gets a token bucket whose refill rate follows AIMD: each clean
+response adds ``RATE_LIMIT_INCREASE / rate`` requests per second (roughly
+``RATE_LIMIT_INCREASE`` per second of sustained traffic), while a 429, a
+503, a captcha, a failed navigation or latency inflated past
+``RATE_LIMIT_LATENCY_FACTOR`` times the domain's baseline multiplies the
+rate by ``RATE_LIMIT_DECREASE``, at most once per cooldown. ``Retry-After``
+blocks the domain outright until it passes. Latency and baseline are kept
+per request kind (a plain fetch, or a browser navigation by its
+``wait_until``), so a domain serving both quick API calls and full page
+loads is never judged against the fastest of them.
+
+With ``RATE_LIMIT_BACKEND=redis`` the state lives in one Redis hash per
+domain, so all workers share the budget; the hash is updated with
+WATCH/MULTI around the same :class:`RateState` logic the in-memory backend
+uses. If Redis is unreachable the limiter falls back to process-local state
+and tries Redis again every ``REDIS_RETRY_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+from ..config import get_settings
+from ..logging import event_dict_from_exc, get_logger
+from .metrics import DOMAIN_RATE, RATE_DECREASES
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+KEY_PREFIX = "deepscraper:rate:"
+STATE_TTL_SECONDS = 24 * 3600
+THROTTLE_STATUSES = (429, 503)
+LATENCY_ALPHA = 0.2
+BASELINE_DRIFT = 0.01
+REDIS_RETRY_SECONDS = 30.0
+# Latency kind of plain HTTP requests; browser navigations use their ``wait_until``.
+FETCH = "fetch"
+
+
+def domain_of(url: str) -> str:
+    return (urlsplit(url).hostname or url).lower()
+
+
+@dataclass
+class RatePolicy:
+    initial: float = 1.0
+    min_rate: float = 0.1
+    max_rate: float = 10.0
+    increase: float = 0.2
+    decrease: float = 0.5
+    burst: float = 2.0
+    latency_factor: float = 2.0
+    cooldown: float = 5.0
+
+    @classmethod
+    def from_settings(cls) -> "RatePolicy":
+        settings = get_settings()
+        return cls(
+            initial=settings.rate_limit_initial,
+            min_rate=settings.rate_limit_min,
+            max_rate=settings.rate_limit_max,
+            increase=settings.rate_limit_increase,
+            decrease=settings.rate_limit_decrease,
+            burst=settings.rate_limit_burst,
+            latency_factor=settings.rate_limit_latency_factor,
+            cooldown=settings.rate_limit_cooldown,
+        )
+
+
+@dataclass
+class RateState:
+    rate: float
+    tokens: float
+    updated: float
+    decreased_at: float = 0.0
+    blocked_until: float = 0.0
+    # Smoothed latency and its baseline, per request kind.
+    latency: Dict[str, float] = field(default_factory=dict)
+    baseline: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def initial(cls, policy: RatePolicy, now: float) -> "RateState":
+        return cls(rate=policy.initial, tokens=policy.burst, updated=now)
+
+    @classmethod
+    def from_redis(cls, raw: Dict[bytes, bytes], policy: RatePolicy, now: float) -> "RateState":
+        if not raw:
+            return cls.initial(policy, now)
+        values: Dict[str, float] = {}
+        per_kind: Dict[str, Dict[str, float]] = {"latency": {}, "baseline": {}}
+        for key, value in raw.items():
+            name, _, kind = key.decode().partition(":")
+            if kind and name in per_kind:
+                per_kind[name][kind] = float(value)
+            elif not kind:
+                values[name] = float(value)
+        scalars = {item.name: values[item.name] for item in fields(cls) if item.name in values}
+        return cls(**scalars, **per_kind)
+
+    def to_redis(self) -> Dict[str, str]:
+        mapping = {}
+        for item in fields(self):
+            value = getattr(self, item.name)
+            if isinstance(value, dict):
+                mapping.update({f"{item.name}:{kind}": repr(latency) for kind, latency in value.items()})
+            else:
+                mapping[item.name] = repr(value)
+        return mapping
+
+    def reserve(self, policy: RatePolicy, now: float) -> float:
+        """Take a token and return how long to wait before using it.
+
+        Tokens may go negative: concurrent callers queue up behind each other
+        instead of all retrying when the next token appears.
+        """
+        self.tokens = min(policy.burst, self.tokens + (now - self.updated) * self.rate) - 1
+        self.updated = now
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def observe(
+        self,
+        policy: RatePolicy,
+        now: float,
+        status: Optional[int] = None,
+        latency: Optional[float] = None,
+        captcha: bool = False,
+        error: bool = False,
+        retry_after: Optional[float] = None,
+        kind: str = FETCH,
+    ) -> Optional[str]:
+        """Apply one response; returns the reason when the rate was cut.
+
+        ``latency`` is compared with the baseline of its own ``kind`` only.
+        """
+
+        reason = None
+        if captcha:
+            reason = "captcha"
+        elif error:
+            reason = "error"
+        elif status in THROTTLE_STATUSES:
+            reason = str(status)
+        if latency is not None and latency > 0 and reason is None:
+            smoothed = self.latency.get(kind)
+            smoothed = latency if smoothed is None else smoothed + (latency - smoothed) * LATENCY_ALPHA
+            baseline = self.baseline.get(kind)
+            if baseline is None or smoothed < baseline:
+                baseline = smoothed
+            else:
+                baseline += (smoothed - baseline) * BASELINE_DRIFT
+            self.latency[kind], self.baseline[kind] = smoothed, baseline
+            if smoothed > baseline * policy.latency_factor:
+                reason = "latency"
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        if reason is None:
+            self.rate = min(policy.max_rate, self.rate + policy.increase / self.rate)
+            return None
+        if now - self.decreased_at < policy.cooldown:
+            return None
+        self.rate = max(policy.min_rate, self.rate * policy.decrease)
+        self.tokens = min(self.tokens, 0.0)
+        self.decreased_at = now
+        return reason
+
+    def describe(self, now: float) -> Dict[str, Any]:
+        return {
+            "rate": round(self.rate, 3),
+            "latency_ms": {kind: round(value * 1000, 1) for kind, value in sorted(self.latency.items())},
+            "baseline_ms": {kind: round(value * 1000, 1) for kind, value in sorted(self.baseline.items())},
+            "blocked_for": round(max(self.blocked_until - now, 0.0), 1),
+        }
+
+
+def _retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    value = (headers or {}).get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        # HTTP-date form; a fixed pause is close enough for throttling purposes.
+        return 30.0
+
+
+class RateLimiter(ABC):
+    """``await acquire(url)`` before a request, ``await feedback(url, ...)`` after it."""
+
+    def __init__(self, policy: Optional[RatePolicy] = None) -> None:
+        self.policy = policy or RatePolicy.from_settings()
+
+    @abstractmethod
+    async def _update(self, domain: str, change: Callable[[RateState, float], T]) -> Tuple[RateState, T]:
+        """Apply ``change(state, now)`` to the domain's state atomically; returns the state and its result."""
+
+    @abstractmethod
+    async def rates(self) -> Dict[str, Dict[str, Any]]:
+        """Current state of every known domain, for display."""
+
+    async def acquire(self, url: str) -> float:
+        """Wait for the domain's next slot; returns the seconds waited."""
+
+        domain = domain_of(url)
+        _, wait = await self._update(domain, lambda state, now: state.reserve(self.policy, now))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    async def feedback(
+        self,
+        url: str,
+        status: Optional[int] = None,
+        latency: Optional[float] = None,
+        captcha: bool = False,
+        error: bool = False,
+        headers: Optional[Mapping[str, str]] = None,
+        kind: str = FETCH,
+    ) -> float:
+        """Report a response (or failure) for ``url``; returns the domain's new rate.
+
+        ``kind`` groups latencies that are comparable: :data:`FETCH` for plain
+        HTTP requests, the ``wait_until`` of browser navigations.
+        """
+
+        domain = domain_of(url)
+        retry_after = _retry_after(headers) if status in THROTTLE_STATUSES else None
+        state, reason = await self._update(
+            domain,
+            lambda state, now: state.observe(self.policy, now, status, latency, captcha, error, retry_after, kind),
+        )
+        DOMAIN_RATE.set(state.rate, domain=domain)
+        if reason is not None:
+            RATE_DECREASES.inc(domain=domain, reason=reason)
+            logger.info("rate_decreased", domain=domain, reason=reason, rate=round(state.rate, 3))
+        return state.rate
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Process-local state; the bucket updates never await, so no lock is needed."""
+
+    def __init__(self, policy: Optional[RatePolicy] = None) -> None:
+        super().__init__(policy)
+        self._states: Dict[str, RateState] = {}
+
+    async def _update(self, domain: str, change: Callable[[RateState, float], T]) -> Tuple[RateState, T]:
+        now = time.time()
+        state = self._states.get(domain)
+        if state is None:
+            state = self._states[domain] = RateState.initial(self.policy, now)
+        return state, change(state, now)
+
+    async def rates(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        return {domain: state.describe(now) for domain, state in sorted(self._states.items())}
+
+
+class RedisRateLimiter(RateLimiter):
+    """State shared by every worker through one Redis hash per domain."""
+
+    def __init__(self, redis: Any = None, policy: Optional[RatePolicy] = None) -> None:
+        super().__init__(policy)
+        if redis is None:
+            from redis.asyncio import Redis
+
+            redis = Redis.from_url(get_settings().redis_url, socket_connect_timeout=1.0)
+        self._redis = redis
+        self._fallback: Optional[MemoryRateLimiter] = None
+        self._retry_at = 0.0
+
+    async def _update(self, domain: str, change: Callable[[RateState, float], T]) -> Tuple[RateState, T]:
+        if self._fallback is not None and time.monotonic() < self._retry_at:
+            return await self._fallback._update(domain, change)
+        from redis.exceptions import RedisError, WatchError
+
+        key = KEY_PREFIX + domain
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                while True:
+                    try:
+                        await pipe.watch(key)
+                        now = time.time()
+                        state = RateState.from_redis(await pipe.hgetall(key), self.policy, now)
+                        result = change(state, now)
+                        pipe.multi()
+                        pipe.hset(key, mapping=state.to_redis())
+                        pipe.expire(key, STATE_TTL_SECONDS)
+                        await pipe.execute()
+                        break
+                    except WatchError:
+                        continue
+        except (RedisError, OSError) as exc:
+            # Keep the local state across retries, so a flapping Redis does not reset every domain.
+            if self._fallback is None:
+                logger.warning("rate_limit_redis_unavailable", **event_dict_from_exc(exc))
+                self._fallback = MemoryRateLimiter(self.policy)
+            self._retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            return await self._fallback._update(domain, change)
+        if self._fallback is not None:
+            logger.info("rate_limit_redis_restored")
+            self._fallback = None
+        return state, result
+
+    async def rates(self) -> Dict[str, Dict[str, Any]]:
+        if self._fallback is not None:
+            return await self._fallback.rates()
+        now = time.time()
+        rates = {}
+        async for key in self._redis.scan_iter(match=KEY_PREFIX + "*"):
+            raw = await self._redis.hgetall(key)
+            if raw:
+                domain = key.decode()[len(KEY_PREFIX):]
+                rates[domain] = RateState.from_redis(raw, self.policy, now).describe(now)
+        return dict(sorted(rates.items()))
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+class _Unlimited(RateLimiter):
+    async def _update(self, domain: str, change: Callable[[RateState, float], T]) -> Tuple[RateState, T]:
+        now = time.time()
+        state = RateState.initial(self.policy, now)
+        return state, change(state, now)
+
+    async def acquire(self, url: str) -> float:
+        return 0.0
+
+    async def feedback(self, url: str, *args: Any, **kwargs: Any) -> float:
+        return self.policy.max_rate
+
+    async def rates(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+
+
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RateLimiter]" = weakref.WeakKeyDictionary()
+_memory: Optional[MemoryRateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """The limiter configured by ``RATE_LIMIT_*``, shared within the running event loop."""
+
+    global _memory
+    settings = get_settings()
+    if not settings.rate_limit_enabled:
+        return _Unlimited(RatePolicy())
+    if settings.rate_limit_backend == "memory":
+        if _memory is None:
+            _memory = MemoryRateLimiter()
+        return _memory
+    if settings.rate_limit_backend != "redis":
+        raise ValueError(f"Unknown rate limit backend: {settings.rate_limit_backend}")
+    # redis.asyncio connections belong to the loop that opened them.
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = RedisRateLimiter()
+    return limiter
+
+
+__all__ = [
+    "FETCH",
+    "MemoryRateLimiter",
+    "RateLimiter",
+    "RatePolicy",
+    "RateState",
+    "RedisRateLimiter",
+    "domain_of",
+    "get_rate_limiter",
+]
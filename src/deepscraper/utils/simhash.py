@@ -0,0 +1,47 @@
+"""64-bit SimHash fingerprints for near-duplicate detection."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Iterable, List, Optional
+
+BITS = 64
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _features(text: str, shingle: int) -> List[str]:
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) <= shingle:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[index : index + shingle]) for index in range(len(tokens) - shingle + 1)]
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """SimHash of ``text`` over word ``shingle``-grams."""
+
+    weights = [0] * BITS
+    for feature in _features(text, shingle):
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def fingerprint(parts: Iterable[str], shingle: int = 3) -> str:
+    """Hex SimHash of ``parts`` joined, as stored in ``pages.fingerprint``."""
+
+    return f"{simhash(chr(10).join(parts), shingle):016x}"
+
+
+def distance(left: str, right: str) -> int:
+    """Hamming distance between two hex fingerprints."""
+
+    return bin(int(left, 16) ^ int(right, 16)).count("1")
+
+
+def unchanged(previous: Optional[str], current: str, max_distance: int = 0) -> bool:
+    return previous is not None and distance(previous, current) <= max_distance
+
+
+__all__ = ["BITS", "simhash", "fingerprint", "distance", "unchanged"]
@@ -1,23 +1,363 @@
-"""HTML snapshot storage using MinIO."""
+"""Content-addressed HTML snapshot storage on the filesystem or S3/MinIO.
+
+Snapshots are keyed by the SHA-256 of the raw HTML, so a page that did not
+change between crawls is stored once. Blobs are zstd-compressed (gzip when
+``zstandard`` is not installed). Once ``dict_samples`` pages of a project
+without a dictionary have been stored, a shared zstd dictionary is trained
+from them and used for the project's later pages. Blobs are self-describing:
+the zstd frame header carries the dictionary id, so loading needs no extra
+metadata.
+"""
 
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+import gzip
+import hashlib
+import io
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from ..config import Settings, get_settings
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+# Dictionaries capture shared boilerplate, which sits in the first part of a page.
+DICT_SAMPLE_CHARS = 64 * 1024
+
+
+def _zstd():  # type: ignore[no-untyped-def]
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+@dataclass(frozen=True)
+class SnapshotRef:
+    """Where a snapshot lives and how it was stored."""
+
+    sha256: str
+    key: str
+    size: int
+    stored_size: int
+    codec: str
+    created: bool
+
+
+def blob_key(sha256: str) -> str:
+    return f"blobs/{sha256[:2]}/{sha256}"
+
+
+class SnapshotStore(ABC):
+    """Compression, dictionaries and dedup on top of a simple blob backend."""
+
+    def __init__(self, level: int = 9, dict_samples: int = 0) -> None:
+        self._level = level
+        self._dict_samples = dict_samples
+        self._known: Set[str] = set()
+        self._dicts: Dict[int, Any] = {}
+        self._project_dicts: Dict[str, Optional[Any]] = {}
+        self._samples: Dict[str, List[str]] = {}
+        self._untrainable: Set[str] = set()
+
+    @abstractmethod
+    async def put_blob(self, key: str, data: bytes) -> None:
+        """Write ``data`` under ``key``."""
+
+    @abstractmethod
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        """Return the blob stored under ``key`` or ``None``."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether ``key`` is already stored."""
+
+    def pending_upload(self, key: str) -> Optional["asyncio.Task[None]"]:
+        """The upload of ``key`` still in flight, or ``None`` once it is durably stored."""
+        return None
+
+    async def flush(self) -> None:
+        """Wait for pending uploads."""
+
+    async def aclose(self) -> None:
+        await self.flush()
+
+    async def store(self, project: str, html: str) -> SnapshotRef:
+        raw = html.encode("utf-8")
+        sha256 = hashlib.sha256(raw).hexdigest()
+        key = blob_key(sha256)
+        if sha256 in self._known or await self.exists(key):
+            self._known.add(sha256)
+            return SnapshotRef(sha256, key, len(raw), 0, "dedup", created=False)
+        blob, codec = await self._compress(project, raw)
+        await self.put_blob(key, blob)
+        self._known.add(sha256)
+        if codec == "zstd":
+            await self._sample(project, html)
+        return SnapshotRef(sha256, key, len(raw), len(blob), codec, created=True)
+
+    async def load(self, key: str) -> Optional[str]:
+        blob = await self.get_blob(key)
+        if blob is None:
+            return None
+        if blob.startswith(GZIP_MAGIC):
+            return gzip.decompress(blob).decode("utf-8")
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("Snapshot is zstd-compressed; install the 'zstandard' package")
+        dict_id = zstandard.get_frame_parameters(blob).dict_id
+        dictionary = await self._dictionary(dict_id) if dict_id else None
+        decompressor = zstandard.ZstdDecompressor(dict_data=dictionary) if dictionary else zstandard.ZstdDecompressor()
+        return decompressor.decompress(blob).decode("utf-8")
+
+    async def train_dictionary(self, project: str, samples: Iterable[str], size: int = 112 * 1024) -> int:
+        """Train and store a shared zstd dictionary for ``project``; returns its id."""
+
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("Dictionary training requires the 'zstandard' package")
+        encoded = [sample.encode("utf-8") for sample in samples]
+        dictionary = await asyncio.to_thread(zstandard.train_dictionary, size, encoded)
+        dict_id = dictionary.dict_id()
+        await self.put_blob(f"dicts/{dict_id}.zdict", dictionary.as_bytes())
+        await self.put_blob(f"dicts/projects/{project}", str(dict_id).encode("ascii"))
+        self._dicts[dict_id] = dictionary
+        self._project_dicts[project] = dictionary
+        logger.info("snapshot_dictionary_trained", project=project, dict_id=dict_id, size=len(dictionary.as_bytes()))
+        return dict_id
+
+    async def _sample(self, project: str, html: str) -> None:
+        if not self._dict_samples or project in self._untrainable:
+            return
+        samples = self._samples.setdefault(project, [])
+        samples.append(html[:DICT_SAMPLE_CHARS])
+        if len(samples) < self._dict_samples:
+            return
+        del self._samples[project]
+        try:
+            await self.train_dictionary(project, samples)
+        except Exception as exc:
+            # Too few or too uniform samples; plain zstd is still fine.
+            self._untrainable.add(project)
+            logger.warning("snapshot_dictionary_failed", project=project, error=str(exc))
+
+    async def _dictionary(self, dict_id: int) -> Optional[Any]:
+        if dict_id not in self._dicts:
+            data = await self.get_blob(f"dicts/{dict_id}.zdict")
+            zstandard = _zstd()
+            self._dicts[dict_id] = zstandard.ZstdCompressionDict(data) if data and zstandard else None
+        return self._dicts[dict_id]
+
+    async def _project_dictionary(self, project: str) -> Optional[Any]:
+        if project not in self._project_dicts:
+            pointer = await self.get_blob(f"dicts/projects/{project}")
+            self._project_dicts[project] = await self._dictionary(int(pointer)) if pointer else None
+        return self._project_dicts[project]
+
+    async def _compress(self, project: str, raw: bytes) -> tuple[bytes, str]:
+        zstandard = _zstd()
+        if zstandard is None:
+            return await asyncio.to_thread(gzip.compress, raw, 6), "gzip"
+        dictionary = await self._project_dictionary(project)
+        if dictionary is not None:
+            compressor = zstandard.ZstdCompressor(level=self._level, dict_data=dictionary)
+            codec = "zstd+dict"
+        else:
+            compressor = zstandard.ZstdCompressor(level=self._level)
+            codec = "zstd"
+        return await asyncio.to_thread(compressor.compress, raw), codec
+
+
+class FilesystemSnapshotStore(SnapshotStore):
+    def __init__(self, root: Path, level: int = 9, dict_samples: int = 0) -> None:
+        super().__init__(level, dict_samples)
+        self._root = root
+
+    def _path(self, key: str) -> Path:
+        return self._root / key
+
+    async def put_blob(self, key: str, data: bytes) -> None:
+        def _write() -> None:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+
+        await asyncio.to_thread(_write)
+
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        return await asyncio.to_thread(path.read_bytes) if path.exists() else None
+
+    async def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+
+class S3SnapshotStore(SnapshotStore):
+    """S3-compatible backend (MinIO locally) using the ``minio`` SDK.
+
+    The SDK is synchronous, so calls run in worker threads over one pooled
+    HTTP client. Uploads are started in the background, at most
+    ``max_uploads`` at a time; :meth:`flush` waits for them. Large blobs are
+    sent as multipart uploads.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        access_key: str,
+        secret_key: str,
+        bucket: str,
+        secure: bool = False,
+        max_uploads: int = 8,
+        level: int = 9,
+        dict_samples: int = 0,
+    ) -> None:
+        super().__init__(level, dict_samples)
+        try:
+            import urllib3
+            from minio import Minio
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise RuntimeError("S3 snapshot storage requires the 'minio' package") from exc
+        http_client = urllib3.PoolManager(maxsize=max_uploads * 2, retries=urllib3.Retry(total=3, backoff_factor=0.2))
+        self._client = Minio(endpoint, access_key=access_key, secret_key=secret_key, secure=secure, http_client=http_client)
+        self._bucket = bucket
+        self._bucket_ready = False
+        self._upload_slots = asyncio.Semaphore(max_uploads)
+        self._uploads: Dict[str, "asyncio.Task[None]"] = {}
+        self._pending: Dict[str, bytes] = {}
+
+    async def _ensure_bucket(self) -> None:
+        if self._bucket_ready:
+            return
+        exists = await asyncio.to_thread(self._client.bucket_exists, self._bucket)
+        if not exists:
+            await asyncio.to_thread(self._client.make_bucket, self._bucket)
+        self._bucket_ready = True
+
+    async def put_blob(self, key: str, data: bytes) -> None:
+        await self._ensure_bucket()
+        self._pending[key] = data
+        await self._upload_slots.acquire()
+        task = asyncio.create_task(self._upload(key, data))
+        self._uploads[key] = task
+        task.add_done_callback(lambda done: self._uploads.pop(key) if self._uploads.get(key) is done else None)
+
+    async def _upload(self, key: str, data: bytes) -> None:
+        try:
+            await asyncio.to_thread(
+                self._client.put_object,
+                bucket_name=self._bucket,
+                object_name=key,
+                data=io.BytesIO(data),
+                length=len(data),
+                part_size=MULTIPART_PART_SIZE,
+            )
+        except Exception as exc:
+            self._known.discard(key.rsplit("/", 1)[-1])
+            logger.error("snapshot_upload_failed", key=key, error=str(exc))
+            raise
+        finally:
+            self._pending.pop(key, None)
+            self._upload_slots.release()
+
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        if key in self._pending:
+            return self._pending[key]
+        await self._ensure_bucket()
+
+        def _read() -> Optional[bytes]:
+            from minio.error import S3Error
+
+            try:
+                response = self._client.get_object(bucket_name=self._bucket, object_name=key)
+            except S3Error as exc:
+                if exc.code == "NoSuchKey":
+                    return None
+                raise
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+
+        return await asyncio.to_thread(_read)
+
+    async def exists(self, key: str) -> bool:
+        if key in self._pending:
+            return True
+        await self._ensure_bucket()
+
+        def _stat() -> bool:
+            from minio.error import S3Error
+
+            try:
+                self._client.stat_object(bucket_name=self._bucket, object_name=key)
+            except S3Error as exc:
+                if exc.code in ("NoSuchKey", "NoSuchObject"):
+                    return False
+                raise
+            return True
+
+        return await asyncio.to_thread(_stat)
+
+    def pending_upload(self, key: str) -> Optional["asyncio.Task[None]"]:
+        return self._uploads.get(key)
+
+    async def flush(self) -> None:
+        if self._uploads:
+            await asyncio.gather(*list(self._uploads.values()))
+
+
+def get_snapshot_store(settings: Optional[Settings] = None) -> Optional[SnapshotStore]:
+    """Build the store selected by ``SNAPSHOT_BACKEND`` (``none``, ``filesystem`` or ``s3``)."""
+
+    settings = settings or get_settings()
+    backend = settings.snapshot_backend
+    if backend == "none":
+        return None
+    if backend == "filesystem":
+        return FilesystemSnapshotStore(
+            settings.snapshot_dir / settings.minio_bucket, dict_samples=settings.snapshot_dict_samples
+        )
+    if backend == "s3":
+        return S3SnapshotStore(
+            settings.minio_endpoint,
+            settings.minio_access_key,
+            settings.minio_secret_key,
+            settings.minio_bucket,
+            secure=settings.minio_secure,
+            max_uploads=settings.snapshot_upload_concurrency,
+            dict_samples=settings.snapshot_dict_samples,
+        )
+    raise ValueError(f"Unknown snapshot backend: {backend}")
 
-from ..config import get_settings
 
+async def store_snapshot(project: str, html: str, store: Optional[SnapshotStore] = None) -> SnapshotRef:
+    """Store one snapshot with ``store`` or the configured backend (filesystem by default)."""
 
-async def store_snapshot(project: str, html: str, path: Optional[Path] = None) -> Path:
     settings = get_settings()
-    base_dir = Path("snapshots") / settings.minio_bucket / project
-    if path is None:
-        path = base_dir / f"{datetime.utcnow().isoformat()}.html"
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(html, encoding="utf-8")
-    # Placeholder for MinIO upload; real implementation would use boto3/minio SDK.
-    return path
+    if store is None:
+        store = get_snapshot_store(settings) or FilesystemSnapshotStore(settings.snapshot_dir / settings.minio_bucket)
+    ref = await store.store(project, html)
+    await store.flush()
+    return ref
 
 
-__all__ = ["store_snapshot"]
+__all__ = [
+    "FilesystemSnapshotStore",
+    "S3SnapshotStore",
+    "SnapshotRef",
+    "SnapshotStore",
+    "blob_key",
+    "get_snapshot_store",
+    "store_snapshot",
+]
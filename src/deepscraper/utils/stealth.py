@@ -4,42 +4,54 @@
 from __future__ import annotations
 
 import random
-from typing import Dict
+from typing import Dict, Optional
+
+from ..config import get_settings
+from .fingerprints import DEFAULT_CHROME_MAJOR, PROFILES, FingerprintProfile, choose_profile
 
 
 class StealthManager:
-    """Manages stealth techniques for browser automation."""
-
-    def __init__(self):
-        self._user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
-        ]
-
-        self._viewports = [
-            {"width": 1920, "height": 1080},
-            {"width": 1366, "height": 768},
-            {"width": 1536, "height": 864},
-            {"width": 1440, "height": 900},
-        ]
+    """Manages stealth techniques for browser automation.
+
+    With ``PLAYWRIGHT_STEALTH`` off no profile is chosen and browsers keep
+    Playwright's defaults; otherwise each browser gets one coherent
+    :class:`FingerprintProfile` (``FINGERPRINT_PROFILE`` pins a specific one).
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, profile: Optional[str] = None) -> None:
+        settings = get_settings()
+        self.enabled = settings.playwright_stealth if enabled is None else enabled
+        self._profile = profile if profile is not None else settings.fingerprint_profile
+        if profile is not None and profile != "random":
+            # FINGERPRINT_PROFILE is validated with the settings; an explicit name is checked here.
+            choose_profile(profile)
+
+    def choose_profile(self) -> Optional[FingerprintProfile]:
+        """Profile for a new browser session, or ``None`` when stealth is disabled."""
+        if not self.enabled:
+            return None
+        return choose_profile(self._profile)
 
     def get_random_user_agent(self) -> str:
         """Get random user agent."""
-        return random.choice(self._user_agents)
+        return random.choice(PROFILES).user_agent(DEFAULT_CHROME_MAJOR)
 
     def get_random_viewport(self) -> Dict[str, int]:
         """Get random viewport size."""
-        return random.choice(self._viewports)
+        width, height = random.choice(PROFILES).viewport
+        return {"width": width, "height": height}
+
 
+# Singleton instance, created on first use so settings are read after configuration.
+_stealth_manager: Optional[StealthManager] = None
 
-# Singleton instance
-_stealth_manager = StealthManager()
 
 def get_stealth_manager() -> StealthManager:
     """Get stealth manager instance."""
+    global _stealth_manager
+    if _stealth_manager is None:
+        _stealth_manager = StealthManager()
     return _stealth_manager
 
 
-__all__ = ["StealthManager", "get_stealth_manager"]
\ No newline at end of file
+__all__ = ["StealthManager", "get_stealth_manager"]
@@ -0,0 +1,415 @@
+"""Lightweight span tracing with W3C ``traceparent`` propagation.
+
+Spans nest through a context variable, so ``with span("browser.navigate")``
+inside a traced run becomes a child of whatever span is active in the
+calling task. Finished spans go to the exporter selected by
+``TRACING_EXPORTER``: ``file`` appends JSON lines to ``TRACING_FILE``,
+``otlp`` posts OTLP/JSON batches to ``TRACING_ENDPOINT`` from a background
+thread, and ``none`` (the default) turns every span into a shared no-op.
+
+:func:`critical_path` reads spans back and attributes the wall time of a
+trace to the span names on its critical path, which is what
+``deepscraper trace`` prints.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from ..config import get_settings
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+SERVICE_NAME = "deepscraper"
+
+
+@dataclass
+class SpanContext:
+    trace_id: str
+    span_id: str
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id)
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class SpanExporter:
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        return None
+
+
+class FileExporter(SpanExporter):
+    """Appends one JSON object per finished span."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = path.open("a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(asdict(span), default=str)
+        with self._lock:
+            self._fh.write(line + "\n")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: Iterable[Span]) -> Dict[str, Any]:
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": SERVICE_NAME},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": 1,
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+                                ],
+                                "status": {"code": 2 if span.status == "error" else 1},
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class OtlpHttpExporter(SpanExporter):
+    """Batches spans and posts them as OTLP/JSON from a daemon thread."""
+
+    def __init__(self, endpoint: str, batch_size: int = 512, interval: float = 2.0) -> None:
+        self._endpoint = endpoint
+        self._batch_size = batch_size
+        self._interval = interval
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=batch_size * 16)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            logger.warning("span_dropped", name=span.name)
+
+    def _post(self, client: Any, batch: List[Span]) -> None:
+        try:
+            client.post(self._endpoint, json=otlp_payload(batch)).raise_for_status()
+        except Exception as exc:
+            logger.warning("span_export_failed", spans=len(batch), error=str(exc))
+
+    def _run(self) -> None:
+        import httpx
+
+        with httpx.Client(timeout=10.0) as client:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self._interval
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                except queue.Empty:
+                    item = None
+                    stop = False
+                else:
+                    stop = item is None
+                    if item is not None:
+                        batch.append(item)
+                if batch and (stop or len(batch) >= self._batch_size or time.monotonic() >= deadline):
+                    self._post(client, batch)
+                    batch = []
+                if time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self._interval
+                if stop:
+                    return
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=10.0)
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("deepscraper_span", default=None)
+_exporter: Optional[SpanExporter] = None
+_configured = False
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    global _exporter, _configured
+    if not _configured:
+        settings = get_settings()
+        if settings.tracing_exporter == "file":
+            _exporter = FileExporter(settings.tracing_file)
+        elif settings.tracing_exporter == "otlp":
+            _exporter = OtlpHttpExporter(settings.tracing_endpoint)
+        elif settings.tracing_exporter != "none":
+            raise ValueError(f"Unknown tracing exporter: {settings.tracing_exporter}")
+        _configured = True
+        if _exporter is not None:
+            atexit.register(_exporter.shutdown)
+    return _exporter
+
+
+def shutdown() -> None:
+    """Flush and close the exporter; the next span configures a fresh one.
+
+    RQ work-horses leave through ``os._exit``, so jobs call this explicitly
+    instead of relying on ``atexit``, and a forked process never reuses its
+    parent's export thread.
+    """
+    global _exporter, _configured
+    if _exporter is not None:
+        _exporter.shutdown()
+    _exporter = None
+    _configured = False
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    global _exporter, _configured
+    _exporter = exporter
+    _configured = True
+
+
+class _NoopSpan:
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("span", "_exporter", "_token")
+
+    def __init__(self, span: Span, exporter: SpanExporter) -> None:
+        self.span = span
+        self._exporter = exporter
+
+    def __enter__(self) -> Span:
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:  # type: ignore[no-untyped-def]
+        _current.reset(self._token)
+        self.span.end_ns = time.time_ns()
+        if exc_type is not None:
+            self.span.status = "error"
+            self.span.attributes["exception.type"] = exc_type.__name__
+        self._exporter.export(self.span)
+
+
+def span(name: str, parent: Optional[SpanContext] = None, **attributes: Any) -> Any:
+    """Context manager for a child span of ``parent`` or of the active span."""
+
+    exporter = get_exporter()
+    if exporter is None:
+        return _NOOP
+    if parent is None:
+        current = _current.get()
+        parent = current.context if current is not None else None
+    return _ActiveSpan(
+        Span(
+            name=name,
+            trace_id=parent.trace_id if parent else _new_id(16),
+            span_id=_new_id(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=attributes,
+        ),
+        exporter,
+    )
+
+
+def record_span(name: str, start_ns: int, end_ns: int, parent: Optional[SpanContext] = None, **attributes: Any) -> None:
+    """Export an already finished span, e.g. time a job spent waiting in the queue."""
+
+    exporter = get_exporter()
+    if exporter is None:
+        return
+    current = _current.get()
+    parent = parent or (current.context if current is not None else None)
+    exporter.export(
+        Span(
+            name=name,
+            trace_id=parent.trace_id if parent else _new_id(16),
+            span_id=_new_id(8),
+            parent_id=parent.span_id if parent else None,
+            start_ns=start_ns,
+            end_ns=end_ns,
+            attributes=attributes,
+        )
+    )
+
+
+def inject(carrier: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Add the active span as a W3C ``traceparent`` entry to ``carrier``."""
+
+    carrier = {} if carrier is None else carrier
+    current = _current.get()
+    if current is not None:
+        carrier["traceparent"] = f"00-{current.trace_id}-{current.span_id}-01"
+    return carrier
+
+
+def extract(carrier: Optional[Mapping[str, Any]]) -> Optional[SpanContext]:
+    value = (carrier or {}).get("traceparent")
+    if not value:
+        return None
+    parts = str(value).split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return SpanContext(parts[1], parts[2])
+
+
+def load_spans(path: Path) -> Iterator[Span]:
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield Span(**json.loads(line))
+
+
+def spans_for_run(spans: Iterable[Span], run_id: int) -> List[Span]:
+    """All spans of the traces that contain a span tagged with ``run_id``."""
+
+    by_trace: Dict[str, List[Span]] = defaultdict(list)
+    matching = set()
+    for item in spans:
+        by_trace[item.trace_id].append(item)
+        if item.attributes.get("run_id") == run_id:
+            matching.add(item.trace_id)
+    return [item for trace_id in matching for item in by_trace[trace_id]]
+
+
+def critical_path(spans: List[Span]) -> List[Tuple[Span, float]]:
+    """``(span, seconds)`` segments on the critical path of the trace rooted at the earliest root.
+
+    Walking back from the end of a span, the child that finished last before
+    the cursor is on the critical path; the gaps between such children are
+    attributed to the span itself.
+    """
+
+    if not spans:
+        return []
+    ids = {item.span_id for item in spans}
+    children: Dict[Optional[str], List[Span]] = defaultdict(list)
+    for item in spans:
+        children[item.parent_id if item.parent_id in ids else None].append(item)
+    roots = children[None]
+    start = min(item.start_ns for item in roots)
+    end = max(item.end_ns for item in roots)
+    root = Span("trace", roots[0].trace_id, "", None, start, end)
+    children[""] = roots
+
+    segments: List[Tuple[Span, float]] = []
+
+    def walk(node: Span, node_end: int) -> None:
+        cursor = node_end
+        self_ns = 0
+        for child in sorted(children.get(node.span_id, []), key=lambda item: item.end_ns, reverse=True):
+            if child.start_ns >= cursor:
+                continue
+            child_end = min(child.end_ns, cursor)
+            self_ns += cursor - child_end
+            walk(child, child_end)
+            cursor = max(child.start_ns, node.start_ns)
+        self_ns += max(cursor - node.start_ns, 0)
+        if self_ns > 0:
+            segments.append((node, self_ns / 1e9))
+
+    walk(root, end)
+    return segments
+
+
+def summarize(segments: List[Tuple[Span, float]]) -> List[Tuple[str, float, int]]:
+    """Critical-path seconds and segment count per span name, largest first."""
+
+    totals: Dict[str, float] = defaultdict(float)
+    counts: Dict[str, int] = defaultdict(int)
+    for item, seconds in segments:
+        totals[item.name] += seconds
+        counts[item.name] += 1
+    return sorted(((name, totals[name], counts[name]) for name in totals), key=lambda row: row[1], reverse=True)
+
+
+__all__ = [
+    "FileExporter",
+    "OtlpHttpExporter",
+    "Span",
+    "SpanContext",
+    "SpanExporter",
+    "critical_path",
+    "extract",
+    "get_exporter",
+    "inject",
+    "load_spans",
+    "otlp_payload",
+    "record_span",
+    "set_exporter",
+    "shutdown",
+    "span",
+    "spans_for_run",
+    "summarize",
+]
@@ -1,10 +1,81 @@
-"""FastAPI stub for health checks."""
+"""HTTP API for submitting runs and streaming their results.
+
+Runs are executed by the RQ worker; the API only records them and reads
+back from the database, and relays worker progress over Socket.IO (see
+:mod:`deepscraper.web.live`). Results are paged with an item-id cursor, so clients
+can resume a stream or a listing exactly where they stopped.
+"""
 
 from __future__ import annotations
 
-from fastapi import FastAPI
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+
+import socketio
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, model_validator
+from sqlalchemy import select
+
+from ..config import get_settings
+from ..logging import get_logger
+from ..pipeline.db import init_db, session_scope
+from ..pipeline.models import Item, Run
+from ..pipeline.runs import RUN_FINISHED, create_run, ensure_project, run_summary
+from ..planner.schema import PlanDocument
+from ..tasks.jobs import run_job
+from ..tasks.queue import enqueue
+from ..utils.metrics import CONTENT_TYPE, REGISTRY
+from ..utils.metrics import enabled as metrics_enabled
+from ..utils.ratelimit import get_rate_limiter
+from ..utils.tracing import span
+from .live import get_hub, sio
+
+logger = get_logger(__name__)
+
+STREAM_POLL_INTERVAL = 0.5
+STREAM_BATCH_SIZE = 500
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    await init_db()
+    live = get_settings().live_progress
+    if live:
+        await get_hub().start()
+    try:
+        yield
+    finally:
+        if live:
+            await get_hub().stop()
+
+
+app = FastAPI(title="Deepscraper API", version="0.1.0", lifespan=_lifespan)
+# Socket.IO is served under /socket.io/; every other path goes to FastAPI.
+asgi = socketio.ASGIApp(sio, other_asgi_app=app)
+
 
-app = FastAPI(title="Deepscraper API", version="0.1.0")
+class RunRequest(BaseModel):
+    """Either a ready ``plan`` or a ``url`` and ``goal`` to plan in the worker."""
+
+    project: str
+    plan: Optional[PlanDocument] = None
+    url: Optional[str] = None
+    goal: Optional[str] = None
+    limit: int = 100
+
+    @model_validator(mode="after")
+    def _plan_or_goal(self) -> "RunRequest":
+        if self.plan is None and not (self.url and self.goal):
+            raise ValueError("Provide either 'plan' or both 'url' and 'goal'")
+        return self
+
+
+class ItemPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[int] = None
 
 
 @app.get("/healthz")
@@ -12,4 +83,133 @@ async def healthz() -> dict[str, str]:
     return {"status": "ok"}
 
 
-__all__ = ["app"]
+@app.get("/metrics")
+async def metrics() -> Response:
+    if not metrics_enabled():
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/rates")
+async def rates() -> Dict[str, Dict[str, Any]]:
+    """Current per-domain request rates of the adaptive limiter."""
+    return await get_rate_limiter().rates()
+
+
+@app.post("/runs", status_code=202)
+async def submit_run(request: RunRequest) -> Dict[str, Any]:
+    with span("api.submit_run", project=request.project) as root:
+        async with session_scope() as session:
+            project = await ensure_project(session, request.project)
+            plan = request.plan if request.plan is not None else {"url": request.url, "goal": request.goal}
+            run = await create_run(session, project, plan, status="queued")
+            run_id = run.id
+        root.set_attribute("run_id", run_id)
+        job = enqueue(run_job, run_id, request.limit, job_timeout=get_settings().job_timeout)
+    logger.info("run_submitted", run_id=run_id, project=request.project, job_id=job.id)
+    return {"id": run_id, "status": "queued", "job_id": job.id}
+
+
+@app.get("/runs/{run_id}")
+async def get_run(run_id: int) -> Dict[str, Any]:
+    async with session_scope() as session:
+        summary = await run_summary(session, run_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return summary
+
+
+async def _batch(run_id: int, cursor: int, limit: int) -> List[tuple[int, Dict[str, Any]]]:
+    async with session_scope() as session:
+        result = await session.execute(
+            select(Item.id, Item.data).where(Item.run_id == run_id, Item.id > cursor).order_by(Item.id).limit(limit)
+        )
+        return [(item_id, data) for item_id, data in result.all()]
+
+
+async def _status(run_id: int) -> Optional[str]:
+    async with session_scope() as session:
+        return await session.scalar(select(Run.status).where(Run.id == run_id))
+
+
+@app.get("/runs/{run_id}/items", response_model=ItemPage)
+async def list_items(
+    run_id: int,
+    cursor: int = Query(0, ge=0, description="Return items after this id"),
+    limit: int = Query(100, ge=1, le=1000),
+) -> ItemPage:
+    if await _status(run_id) is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    batch = await _batch(run_id, cursor, limit)
+    return ItemPage(items=[data for _, data in batch], next_cursor=batch[-1][0] if len(batch) == limit else None)
+
+
+async def _follow(request: Request, run_id: int, cursor: int) -> AsyncIterator[tuple[int, Dict[str, Any]]]:
+    """Yield ``(id, item)`` after ``cursor`` until the run has finished and everything was sent.
+
+    The stream also ends when the client disconnects, when no item arrived
+    for ``STREAM_IDLE_TIMEOUT`` seconds or after ``STREAM_MAX_DURATION``
+    seconds, so a stalled run cannot hold a connection open forever; clients
+    resume from the last id they received.
+    """
+
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.stream_max_duration
+    idle_until = loop.time() + settings.stream_idle_timeout
+    while True:
+        finished = await _status(run_id) in RUN_FINISHED
+        batch = await _batch(run_id, cursor, STREAM_BATCH_SIZE)
+        for item_id, data in batch:
+            yield item_id, data
+        if batch:
+            cursor = batch[-1][0]
+            idle_until = loop.time() + settings.stream_idle_timeout
+        if len(batch) < STREAM_BATCH_SIZE:
+            if finished:
+                return
+            now = loop.time()
+            if now >= deadline or now >= idle_until:
+                logger.info("stream_timeout", run_id=run_id, cursor=cursor, idle=now >= idle_until)
+                return
+            if await request.is_disconnected():
+                logger.info("stream_disconnected", run_id=run_id, cursor=cursor)
+                return
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+
+async def _ndjson(request: Request, run_id: int, cursor: int) -> AsyncIterator[str]:
+    async for _, data in _follow(request, run_id, cursor):
+        yield json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+
+async def _sse(request: Request, run_id: int, cursor: int) -> AsyncIterator[str]:
+    async for item_id, data in _follow(request, run_id, cursor):
+        yield f"id: {item_id}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+    yield f"event: end\ndata: {json.dumps({'status': await _status(run_id)})}\n\n"
+
+
+@app.get("/runs/{run_id}/stream")
+async def stream_items(
+    request: Request,
+    run_id: int,
+    format: Literal["ndjson", "sse"] = "ndjson",
+    cursor: int = Query(0, ge=0, description="Stream items after this id"),
+    last_event_id: Optional[str] = Header(None),
+) -> StreamingResponse:
+    """Stream items as they are committed; SSE clients resume via ``Last-Event-ID``."""
+
+    if await _status(run_id) is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if format == "sse":
+        if last_event_id and last_event_id.isdigit():
+            cursor = max(cursor, int(last_event_id))
+        return StreamingResponse(
+            _sse(request, run_id, cursor),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return StreamingResponse(_ndjson(request, run_id, cursor), media_type="application/x-ndjson")
+
+
+__all__ = ["app", "asgi"]
@@ -0,0 +1,189 @@
+"""Live run progress over Socket.IO.
+
+Workers publish counter deltas to Redis (see :mod:`deepscraper.tasks.progress`).
+The hub subscribes once per API process, folds the deltas into per-run
+totals and rates, and emits at most one ``progress`` event per run per
+``emit_interval`` to the Socket.IO room ``run:<id>``, plus a combined
+``overview`` event to the ``runs`` room. Clients join rooms with the
+``subscribe`` event.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+import socketio
+
+from ..config import get_settings
+from ..logging import event_dict_from_exc, get_logger
+from ..tasks.progress import COUNTERS, PROGRESS_CHANNEL
+
+logger = get_logger(__name__)
+
+RATE_WINDOW_SECONDS = 10.0
+FINISHED_RETENTION_SECONDS = 60.0
+
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+
+
+@dataclass
+class RunProgress:
+    run_id: int
+    started: float
+    status: str = "running"
+    totals: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(COUNTERS, 0))
+    window: Deque[Tuple[float, int, int]] = field(default_factory=deque)
+    updated: float = 0.0
+
+    def apply(self, message: Dict[str, Any]) -> None:
+        for name, amount in message.get("delta", {}).items():
+            self.totals[name] = self.totals.get(name, 0) + int(amount)
+        self.status = message.get("status", self.status)
+        self.updated = float(message.get("ts", time.time()))
+        self.window.append((self.updated, self.totals["pages"], self.totals["rows"]))
+        while len(self.window) > 2 and self.window[0][0] < self.updated - RATE_WINDOW_SECONDS:
+            self.window.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        pages_per_sec = rows_per_sec = 0.0
+        if len(self.window) >= 2:
+            (t0, pages0, rows0), (t1, pages1, rows1) = self.window[0], self.window[-1]
+            if t1 > t0:
+                pages_per_sec = (pages1 - pages0) / (t1 - t0)
+                rows_per_sec = (rows1 - rows0) / (t1 - t0)
+        pages = self.totals["pages"]
+        proxy_total = self.totals["proxy_failures"] + self.totals["proxy_successes"]
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            **self.totals,
+            "pages_per_sec": round(pages_per_sec, 2),
+            "rows_per_sec": round(rows_per_sec, 2),
+            "captcha_rate": round(self.totals["captchas"] / pages, 4) if pages else 0.0,
+            "proxy_health": round(self.totals["proxy_successes"] / proxy_total, 4) if proxy_total else None,
+            "elapsed": round(self.updated - self.started, 1),
+        }
+
+
+class ProgressHub:
+    """Aggregates worker progress from Redis and broadcasts it to Socket.IO clients."""
+
+    def __init__(
+        self,
+        server: socketio.AsyncServer,
+        redis: Any = None,
+        emit_interval: Optional[float] = None,
+        queue_name: str = "deepscraper",
+    ) -> None:
+        self._server = server
+        self._redis = redis
+        self._emit_interval = emit_interval if emit_interval is not None else get_settings().progress_interval
+        self._queue_key = f"rq:queue:{queue_name}"
+        self.runs: Dict[int, RunProgress] = {}
+        self._dirty: Set[int] = set()
+        self._tasks: list["asyncio.Task[None]"] = []
+
+    def apply(self, message: Dict[str, Any]) -> None:
+        run_id = int(message["run_id"])
+        run = self.runs.get(run_id)
+        if run is None:
+            run = self.runs[run_id] = RunProgress(run_id, started=float(message.get("ts", time.time())))
+        run.apply(message)
+        self._dirty.add(run_id)
+
+    async def start(self) -> None:
+        if self._redis is None:
+            from redis.asyncio import Redis
+
+            self._redis = Redis.from_url(get_settings().redis_url)
+        self._tasks = [asyncio.create_task(self._subscribe()), asyncio.create_task(self._emit_loop())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _subscribe(self) -> None:
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(PROGRESS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.apply(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("progress_subscribe_failed", **event_dict_from_exc(exc))
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    async def _emit_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._emit_interval)
+            try:
+                await self.emit()
+            except Exception as exc:
+                logger.warning("progress_emit_failed", **event_dict_from_exc(exc))
+
+    async def queue_depth(self) -> Optional[int]:
+        try:
+            return int(await self._redis.llen(self._queue_key))
+        except Exception:
+            return None
+
+    async def emit(self) -> None:
+        """Send one event per changed run and one overview, then drop long-finished runs."""
+        now = time.time()
+        dirty, self._dirty = self._dirty, set()
+        for run_id in dirty:
+            await self._server.emit("progress", self.runs[run_id].snapshot(), room=f"run:{run_id}")
+        if dirty:
+            overview = {
+                "queue_depth": await self.queue_depth(),
+                "runs": [run.snapshot() for run in self.runs.values()],
+            }
+            await self._server.emit("overview", overview, room="runs")
+        for run_id, run in list(self.runs.items()):
+            if run.status != "running" and now - run.updated > FINISHED_RETENTION_SECONDS:
+                del self.runs[run_id]
+
+
+# Singleton instance, created on first use so settings are read after configuration.
+_hub: Optional[ProgressHub] = None
+
+
+def get_hub() -> ProgressHub:
+    """The process-wide hub relaying progress to :data:`sio`."""
+    global _hub
+    if _hub is None:
+        _hub = ProgressHub(sio)
+    return _hub
+
+
+@sio.event
+async def subscribe(sid: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Join ``run:<run_id>`` when ``run_id`` is given, otherwise the ``runs`` overview room."""
+    run_id = (data or {}).get("run_id")
+    if run_id is None:
+        await sio.enter_room(sid, "runs")
+        return {"room": "runs"}
+    await sio.enter_room(sid, f"run:{int(run_id)}")
+    run = get_hub().runs.get(int(run_id))
+    return {"room": f"run:{int(run_id)}", "progress": run.snapshot() if run else None}
+
+
+@sio.event
+async def unsubscribe(sid: str, data: Optional[Dict[str, Any]] = None) -> None:
+    run_id = (data or {}).get("run_id")
+    await sio.leave_room(sid, "runs" if run_id is None else f"run:{int(run_id)}")
+
+
+__all__ = ["ProgressHub", "RunProgress", "get_hub", "sio"]
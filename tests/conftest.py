@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import os
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+# Tests talk to local fixtures; throttling them would only slow the suite down.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
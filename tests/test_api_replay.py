@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+import pytest
+from aiohttp import web
+
+from deepscraper.extractor.network import CapturedResponse
+from deepscraper.planner.schema import ReplayInstruction
+from deepscraper.runner.replay import ApiReplayer, RequestTemplate, extract_document
+
+
+@asynccontextmanager
+async def catalog_api(total_pages: int = 3) -> AsyncIterator[str]:
+    async def items(request: web.Request) -> web.Response:
+        if request.cookies.get("session") != "fresh":
+            return web.json_response({"error": "forbidden"}, status=403)
+        page = int(request.query["page"])
+        products = [{"sku": f"{page}-{n}"} for n in range(2)] if page <= total_pages else []
+        return web.json_response({"items": products, "size": request.query["size"]})
+
+    app = web.Application()
+    app.router.add_get("/api/items", items)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+
+def test_template_from_capture_keeps_query_and_drops_connection_headers() -> None:
+    entry = CapturedResponse(
+        url="https://shop.example/api/items?page=1&size=48",
+        json={},
+        request_headers={"accept": "application/json", "cookie": "a=b", "x-api-key": "k"},
+    )
+    template = RequestTemplate.from_capture(entry, [{"name": "session", "value": "abc"}])
+    assert template.url == "https://shop.example/api/items"
+    assert template.params == {"page": "1", "size": "48"}
+    assert template.headers == {"accept": "application/json", "x-api-key": "k"}
+    assert template.cookies == {"session": "abc"}
+
+
+@pytest.mark.asyncio
+async def test_replayer_pages_until_empty_and_refreshes_cookies_once() -> None:
+    refreshes = 0
+
+    async def refresh() -> Dict[str, str]:
+        nonlocal refreshes
+        refreshes += 1
+        return {"session": "fresh"}
+
+    async with catalog_api() as base_url:
+        template = RequestTemplate(
+            url=f"{base_url}/api/items", params={"page": "1", "size": "48"}, cookies={"session": "stale"}
+        )
+        async with ApiReplayer(template, refresh_cookies=refresh) as replayer:
+            documents = [doc async for doc in replayer.pages(ReplayInstruction(items_path="$.items[*]", concurrency=2))]
+
+    assert refreshes == 1
+    assert len(documents) == 3
+    assert documents[0]["size"] == "48"
+    assert extract_document(documents[2], [{"name": "sku", "json_path": "$.items[*].sku"}]) == [
+        {"name": "sku", "values": ["3-0", "3-1"]}
+    ]
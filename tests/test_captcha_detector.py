@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+import pytest
+
+from deepscraper.captcha import pool as pool_module
+from deepscraper.captcha.base import NullCaptchaSolver
+from deepscraper.captcha.detector import DETECT_SCRIPT, CaptchaDetection, CaptchaDetector
+from deepscraper.captcha.pool import TokenPool
+from deepscraper.planner.schema import ExtractionField, PlanDocument, PlanStep
+from deepscraper.runner.browser import BrowserRunner
+from deepscraper.runner.executor import execute_plan
+from deepscraper.tasks.progress import ProgressReporter
+
+
+class FakePage:
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.payload = payload
+        self.evaluations = 0
+
+    async def evaluate(self, script: str) -> Dict[str, Any]:
+        self.evaluations += 1
+        return self.payload
+
+
+@pytest.mark.asyncio
+async def test_detector_classifies_in_one_evaluation() -> None:
+    page = FakePage(
+        {"kind": "hcaptcha", "gated": True, "site_key": "abc", "response_selector": '[data-deepscraper-captcha="response"]'}
+    )
+    detection = await CaptchaDetector().detect(page)  # type: ignore[arg-type]
+    assert page.evaluations == 1
+    assert detection == CaptchaDetection(
+        kind="hcaptcha", gated=True, site_key="abc", response_selector='[data-deepscraper-captcha="response"]'
+    )
+
+
+@pytest.mark.asyncio
+async def test_detector_skips_known_clean_pages() -> None:
+    detector = CaptchaDetector()
+    page = FakePage({"kind": "none"})
+
+    assert not (await detector.detect(page, 'https://shop.example/ "v1"')).detected  # type: ignore[arg-type]
+    assert not (await detector.detect(page, 'https://shop.example/ "v1"')).detected  # type: ignore[arg-type]
+    assert page.evaluations == 1
+
+
+def test_unknown_kind_is_treated_as_clean() -> None:
+    assert not CaptchaDetection.from_payload({"kind": "mystery", "gated": True}).detected
+    # A captcha that does not gate the content is not worth solving.
+    assert not CaptchaDetection.from_payload({"kind": "recaptcha_v3", "site_key": "k"}).detected
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.published: List[dict] = []
+
+    async def publish(self, channel: str, message: str) -> None:
+        self.published.append(json.loads(message))
+
+
+class FakeResponse:
+    status = 200
+
+    def __init__(self, headers: Dict[str, str]) -> None:
+        self.headers = headers
+
+
+class BrowserPage:
+    """Just enough of a Playwright page for ``execute_plan``.
+
+    ``/gate`` is a reCAPTCHA v2 interstitial until a token is applied, ``/news``
+    merely embeds invisible reCAPTCHA v3, everything else is clean.
+    """
+
+    def __init__(self) -> None:
+        self.url = "about:blank"
+        self.detections: List[str] = []
+        self.applied: List[Any] = []
+        self.solved = False
+
+    async def goto(self, url: str, wait_until: str, timeout: int) -> FakeResponse:
+        self.url = url
+        return FakeResponse({"etag": '"v1"'})
+
+    async def evaluate(self, script: str, arg: Any = None) -> Any:
+        if script == DETECT_SCRIPT:
+            self.detections.append(self.url)
+            if self.url.endswith("/gate") and not self.solved:
+                return {
+                    "kind": "recaptcha_v2",
+                    "gated": True,
+                    "site_key": "site",
+                    "response_selector": "#g-recaptcha-response",
+                }
+            if self.url.endswith("/news"):
+                return {"kind": "recaptcha_v3", "gated": False, "site_key": "v3-key"}
+            return {"kind": "none"}
+        if isinstance(arg, list):
+            self.applied.append(arg)
+            self.solved = True
+            return None
+        return [["9.99"]]
+
+
+def _plan(*paths: str) -> PlanDocument:
+    return PlanDocument(
+        url=f"https://shop.example{paths[0]}",
+        goal="prices",
+        steps=[PlanStep(action="navigate", target=f"https://shop.example{path}") for path in paths]
+        + [PlanStep(action="extract")],
+        fields=[ExtractionField(name="price", selector=".price")],
+    )
+
+
+class TokenSolver(NullCaptchaSolver):
+    configured = True
+
+    async def solve_recaptcha_v2(self, site_key: str, url: str, invisible: bool = False) -> str:
+        return f"token-for-{site_key}"
+
+
+@pytest.mark.asyncio
+async def test_execute_plan_detects_and_solves_captchas(monkeypatch: pytest.MonkeyPatch) -> None:
+    page = BrowserPage()
+
+    @asynccontextmanager
+    async def context(self: BrowserRunner) -> AsyncIterator[BrowserPage]:
+        yield page
+
+    monkeypatch.setattr(BrowserRunner, "context", context)
+    monkeypatch.setattr(pool_module, "_token_pool", TokenPool(TokenSolver(), "fake", size=0))
+
+    redis = FakeRedis()
+    async with ProgressReporter(7, redis=redis, interval=60):
+        rows = await execute_plan(_plan("/gate", "/a", "/a"), limit=10)
+    await pool_module.close_token_pool()
+
+    assert rows == [{"price": "9.99"}]
+    assert page.applied == [["#g-recaptcha-response", "token-for-site"]]
+    # The second visit of /a has the same ETag as the first, which was already found clean.
+    assert page.detections == ["https://shop.example/gate", "https://shop.example/a"]
+    assert redis.published[-1]["delta"]["captchas"] == 1
+
+
+@pytest.mark.asyncio
+async def test_embedded_and_unsolvable_captchas_do_not_stop_extraction(monkeypatch: pytest.MonkeyPatch) -> None:
+    page = BrowserPage()
+
+    @asynccontextmanager
+    async def context(self: BrowserRunner) -> AsyncIterator[BrowserPage]:
+        yield page
+
+    monkeypatch.setattr(BrowserRunner, "context", context)
+    monkeypatch.setattr(pool_module, "_token_pool", TokenPool(NullCaptchaSolver(), "none", size=0))
+
+    redis = FakeRedis()
+    async with ProgressReporter(7, redis=redis, interval=60):
+        # Only an embedded v3 api.js: not a challenge at all.
+        assert await execute_plan(_plan("/news"), limit=10) == [{"price": "9.99"}]
+        # A real gate without a configured provider is logged, not fatal.
+        assert await execute_plan(_plan("/gate"), limit=10) == [{"price": "9.99"}]
+    await pool_module.close_token_pool()
+
+    assert page.applied == []
+    assert redis.published[-1]["delta"]["captchas"] == 1
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from deepscraper.captcha.base import NullCaptchaSolver
+from deepscraper.captcha.pool import TokenPool
+
+
+class CountingSolver(NullCaptchaSolver):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def solve_recaptcha_v2(self, site_key: str, url: str, invisible: bool = False) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return f"token-{self.calls}"
+
+
+@pytest.mark.asyncio
+async def test_token_pool_presolves_once_demand_recurs() -> None:
+    solver = CountingSolver()
+    pool = TokenPool(solver, "fake", size=2, ttl_seconds=120.0, demand_window=60.0)
+
+    first = await pool.acquire("recaptcha_v2", "key", "https://shop.example/a")
+    await asyncio.sleep(0.05)
+    assert first == "token-1"
+    assert pool.available("recaptcha_v2", "key", "https://shop.example/a") == 0
+    assert solver.calls == 1
+
+    second = await pool.acquire("recaptcha_v2", "key", "https://shop.example/b")
+    await asyncio.sleep(0.05)
+    assert second == "token-2"
+    assert pool.available("recaptcha_v2", "key", "https://shop.example/c") == 2
+
+    third = await pool.acquire("recaptcha_v2", "key", "https://shop.example/c")
+    assert third in {"token-3", "token-4"}
+    await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_token_pool_discards_expired_tokens() -> None:
+    solver = CountingSolver()
+    pool = TokenPool(solver, "fake", size=1, ttl_seconds=0.05, min_remaining=0.0)
+
+    await pool.acquire("recaptcha_v2", "key", "https://shop.example/")
+    await asyncio.sleep(0.1)
+    assert pool.available("recaptcha_v2", "key", "https://shop.example/") == 0
+    await pool.aclose()
+
+
+def test_token_pool_keys_by_kind_and_v3_action() -> None:
+    pool = TokenPool(CountingSolver(), "fake")
+    url = "https://shop.example/checkout"
+    keys = {
+        pool.key_for("recaptcha_v2", "key", url),
+        pool.key_for("recaptcha_v3", "key", url, "login"),
+        pool.key_for("recaptcha_v3", "key", url, "checkout"),
+        pool.key_for("hcaptcha", "key", url),
+    }
+    assert len(keys) == 4
+    assert pool.key_for("recaptcha_v2", "key", url, "login") == pool.key_for("recaptcha_v2", "key", url)
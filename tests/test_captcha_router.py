@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import pytest
+from aiohttp import web
+
+from deepscraper.captcha.capsolver import CapSolver
+from deepscraper.captcha.router import ProviderRoute, RoutingCaptchaSolver
+from deepscraper.captcha.twocaptcha import TwoCaptchaSolver
+
+
+@asynccontextmanager
+async def serve(app: web.Application) -> AsyncIterator[str]:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+
+def fake_twocaptcha(token: str, delay: float = 0.0, fail: bool = False) -> web.Application:
+    async def submit(request: web.Request) -> web.Response:
+        if fail:
+            return web.json_response({"status": 0, "request": "ERROR_ZERO_BALANCE"})
+        return web.json_response({"status": 1, "request": "42"})
+
+    async def result(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        return web.json_response({"status": 1, "request": token})
+
+    app = web.Application()
+    app.router.add_post("/in.php", submit)
+    app.router.add_get("/res.php", result)
+    return app
+
+
+def fake_capsolver(token: str, delay: float = 0.0) -> web.Application:
+    async def create(request: web.Request) -> web.Response:
+        return web.json_response({"errorId": 0, "taskId": "task-1"})
+
+    async def result(request: web.Request) -> web.Response:
+        await asyncio.sleep(delay)
+        return web.json_response({"errorId": 0, "status": "ready", "solution": {"gRecaptchaResponse": token}})
+
+    app = web.Application()
+    app.router.add_post("/createTask", create)
+    app.router.add_post("/getTaskResult", result)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_failover_moves_to_next_provider() -> None:
+    async with serve(fake_twocaptcha("two", fail=True)) as two_url, serve(fake_capsolver("cap")) as cap_url:
+        router = RoutingCaptchaSolver(
+            [
+                ProviderRoute("twocaptcha", TwoCaptchaSolver("k", polling_interval=0.01, base_url=two_url), 0.001),
+                ProviderRoute("capsolver", CapSolver("k", base_url=cap_url, polling_interval=0.01), 0.002),
+            ]
+        )
+        assert await router.solve_recaptcha_v2("site", "https://example.com") == "cap"
+        metrics = router.metrics()
+        assert metrics["twocaptcha"]["failures"] == 1
+        assert metrics["capsolver"]["solves"] == 1
+        assert router.ranked()[0].name == "capsolver"
+        await router.aclose()
+
+
+@pytest.mark.asyncio
+async def test_race_returns_fastest_token() -> None:
+    async with serve(fake_twocaptcha("slow", delay=1.0)) as two_url, serve(fake_capsolver("fast")) as cap_url:
+        router = RoutingCaptchaSolver(
+            [
+                ProviderRoute("twocaptcha", TwoCaptchaSolver("k", polling_interval=0.01, base_url=two_url)),
+                ProviderRoute("capsolver", CapSolver("k", base_url=cap_url, polling_interval=0.01)),
+            ],
+            strategy="race",
+        )
+        assert await router.solve_hcaptcha("site", "https://example.com") == "fast"
+        assert router.metrics()["capsolver"]["p50_seconds"] is not None
+        await router.aclose()
+
+
+@pytest.mark.asyncio
+async def test_cheaper_provider_is_preferred_at_equal_latency() -> None:
+    async with serve(fake_twocaptcha("two")) as two_url, serve(fake_capsolver("cap")) as cap_url:
+        router = RoutingCaptchaSolver(
+            [
+                ProviderRoute("twocaptcha", TwoCaptchaSolver("k", polling_interval=0.01, base_url=two_url), 0.003),
+                ProviderRoute("capsolver", CapSolver("k", base_url=cap_url, polling_interval=0.01), 0.0008),
+            ]
+        )
+        assert await router.solve_recaptcha_v3("site", "https://example.com") == "cap"
+        assert router.metrics()["twocaptcha"]["solves"] == 0
+        await router.aclose()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+
+from deepscraper.crawl.frontier import Frontier
+from deepscraper.crawl.seen import ScalableBloomFilter, SeenSet, url_digest
+from deepscraper.crawl.urls import UrlFilter, normalize_url
+from deepscraper.planner.compiler import Op, compile_plan
+from deepscraper.planner.schema import CrawlInstruction, PlanDocument, PlanStep
+from deepscraper.runner.executor import _page_steps, _PlanRun, _Tab
+
+
+def test_normalize_url_canonicalizes_equivalent_links() -> None:
+    canonical = "https://shop.example/a/b/?color=red&page=2"
+    variants = [
+        "HTTPS://Shop.Example:443/a/x/../b/?page=2&color=red#reviews",
+        "https://shop.example/a/./b/?utm_source=mail&color=red&page=2&gclid=abc",
+        "https://shop.example/%61/b/?color=red&page=2&fbclid=1",
+    ]
+    assert [normalize_url(url) for url in variants] == [canonical] * 3
+    assert normalize_url("../c?q=a b", base="http://shop.example:8080/a/b/") == "http://shop.example:8080/a/c?q=a+b"
+    assert normalize_url("https://shop.example") == "https://shop.example/"
+    assert normalize_url("mailto:help@shop.example") is None
+    assert normalize_url("javascript:void(0)") is None
+
+
+def test_normalize_url_keeps_reserved_escapes_and_rejects_malformed_links() -> None:
+    assert normalize_url("https://shop.example/a%2fb/%7e%3F%c3%a9 x") == "https://shop.example/a%2Fb/~%3F%C3%A9%20x"
+    assert normalize_url("http://[2001:DB8::1]:8080/p") == "http://[2001:db8::1]:8080/p"
+    assert normalize_url("https://[::1]:443/") == "https://[::1]/"
+    assert normalize_url("https://shop.example:99999/p") is None
+    assert normalize_url("https://shop.example:abc/p") is None
+    assert normalize_url("http://[::1/p") is None
+
+
+def test_url_filter_applies_host_and_patterns() -> None:
+    allowed = UrlFilter(include=[r"/p/"], exclude=[r"\?sort="], host="shop.example")
+    assert allowed("https://shop.example/p/1")
+    assert not allowed("https://cdn.shop.example/p/1")
+    assert not allowed("https://shop.example/p/1?sort=price")
+    assert not allowed("https://shop.example/blog/1")
+
+
+def test_seen_set_survives_bloom_false_positives(tmp_path: Path) -> None:
+    seen = SeenSet(tmp_path / "seen.sqlite", capacity=64, error_rate=0.2)
+    urls = [f"https://shop.example/p/{index}" for index in range(2000)]
+    assert all(seen.add(url) for url in urls)
+    assert not any(seen.add(url) for url in urls)
+    assert len(seen) == 2000
+    # A tiny, lossy filter answers "maybe" often; the exact index keeps every new URL.
+    assert seen.false_positives > 0
+    seen.close()
+
+    reopened = SeenSet(tmp_path / "seen.sqlite")
+    assert "https://shop.example/p/7" in reopened and "https://shop.example/p/x" not in reopened
+    reopened.close()
+
+
+def test_scalable_bloom_filter_stays_compact() -> None:
+    bloom = ScalableBloomFilter(initial_capacity=1000, error_rate=0.01)
+    for index in range(10000):
+        bloom.add(url_digest(str(index)))
+    assert all(url_digest(str(index)) in bloom for index in range(10000))
+    misses = sum(url_digest(f"other-{index}") in bloom for index in range(10000))
+    assert misses < 200
+    assert bloom.nbytes < 32 * 1024
+
+
+def test_crawl_steps_follow_links_breadth_first_to_max_depth() -> None:
+    plan = PlanDocument(
+        url="https://shop.example/list",
+        goal="products",
+        steps=[PlanStep(action="navigate", target="https://shop.example/list"), PlanStep(action="extract")],
+        fields=[],
+        crawl=CrawlInstruction(link_selectors=["a.product"], max_depth=1, max_pages=3),
+    )
+    frontier = Frontier(plan.crawl.max_pages)
+    frontier.add(plan.url)
+    program = compile_plan(plan)
+    visited = []
+    for url, depth in frontier.drain():
+        for step, _ in _page_steps(plan, program, url, depth):
+            if step.op is Op.NAVIGATE:
+                visited.append((step.target, depth))
+            elif step.op is Op.FOLLOW:
+                links = ["/p/1?utm_medium=x", "/p/1", "/p/2#top", "/p/3"]
+                frontier.extend((f"https://shop.example{link}" for link in links), depth + 1)
+    assert visited == [
+        ("https://shop.example/list", 0),
+        ("https://shop.example/p/1", 1),
+        ("https://shop.example/p/2", 1),
+    ]
+    frontier.close()
+
+
+@pytest.mark.asyncio
+async def test_crawl_continues_past_pages_that_fail_to_load() -> None:
+    async def navigate(page: Any, url: str, wait_until: str) -> None:
+        raise PlaywrightError(f"Timeout 30000ms exceeded navigating to {url}")
+
+    plan = PlanDocument(
+        url="https://shop.example/list",
+        goal="products",
+        steps=[PlanStep(action="navigate", target="https://shop.example/list"), PlanStep(action="extract")],
+        fields=[],
+        crawl=CrawlInstruction(link_selectors=["a.product"]),
+    )
+    runner = SimpleNamespace(navigate=navigate, connected=True)
+    frontier = Frontier()
+    execution = _PlanRun(plan, compile_plan(plan), runner, 10, None, None, frontier)
+    tab = _Tab(object(), None)
+    assert await execution.visit(tab, "https://shop.example/p/1", 1) is False
+
+    runner.connected = False
+    with pytest.raises(PlaywrightError):
+        await execution.visit(tab, "https://shop.example/p/2", 1)
+    frontier.close()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from deepscraper.pipeline.diff import diff_counts, make_item, previous_run, stream_diff
+from deepscraper.pipeline.models import Base, Item, Page, Project, Run
+
+
+@pytest.mark.asyncio
+async def test_diff_matches_on_natural_key() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with sessions() as session:
+        project = Project(name="shop")
+        session.add(project)
+        await session.flush()
+        base, head = Run(project_id=project.id, plan={}), Run(project_id=project.id, plan={})
+        session.add_all([base, head])
+        await session.flush()
+        kept_page = Page(run_id=base.id, url="https://shop.example/garden")
+        session.add_all([kept_page, Page(run_id=head.id, url="https://shop.example/garden", unchanged=True)])
+        await session.flush()
+
+        key = ["sku"]
+        session.add_all(
+            [
+                make_item(base.id, {"sku": "A", "price": "10"}, key),
+                make_item(base.id, {"sku": "B", "price": "20"}, key),
+                make_item(base.id, {"sku": "C", "price": "30"}, key),
+                make_item(base.id, {"sku": "G", "price": "5"}, key, kept_page),
+                make_item(head.id, {"sku": "A", "price": "10"}, key),
+                make_item(head.id, {"sku": "B", "price": "25"}, key),
+                make_item(head.id, {"sku": "D", "price": "40"}, key),
+            ]
+        )
+        await session.flush()
+
+        assert await previous_run(session, "shop", head.id) == base.id
+        assert await diff_counts(session, base.id, head.id) == {"added": 1, "removed": 1, "modified": 1}
+        rows = [row async for row in stream_diff(session, base.id, head.id)]
+        assert rows == [
+            {"change": "added", "sku": "D", "price": "40"},
+            {"change": "removed", "sku": "C", "price": "30"},
+            {"change": "modified", "sku": "B", "price": "25", "price__before": "20"},
+        ]
+
+        stored = (await session.execute(select(Item.key_hash).order_by(Item.id))).scalars().all()
+        assert await diff_counts(session, base.id, head.id, key_fields=[]) == {"added": 2, "removed": 2, "modified": 0}
+        assert [row["change"] async for row in stream_diff(session, base.id, head.id, key_fields=[])] == [
+            "added", "added", "removed", "removed"
+        ]
+        assert (await session.execute(select(Item.key_hash).order_by(Item.id))).scalars().all() == stored
+        assert await diff_counts(session, base.id, head.id) == {"added": 1, "removed": 1, "modified": 1}
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_diff_resolves_unchanged_pages_to_their_last_fetch() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    url = "https://shop.example/garden"
+
+    async with sessions() as session:
+        project = Project(name="shop")
+        session.add(project)
+        await session.flush()
+        full, incremental, head = (Run(project_id=project.id, plan={}) for _ in range(3))
+        session.add_all([full, incremental, head])
+        await session.flush()
+        # The full run fetched the page; the incremental run only saw it unchanged; head fetched it again.
+        fetched = Page(run_id=full.id, url=url)
+        session.add(fetched)
+        await session.flush()
+        session.add(Page(run_id=incremental.id, url=url, unchanged=True))
+        await session.flush()
+        refetched = Page(run_id=head.id, url=url)
+        session.add(refetched)
+        await session.flush()
+        key = ["sku"]
+        session.add_all(
+            [
+                make_item(full.id, {"sku": "G", "price": "5"}, key, fetched),
+                make_item(full.id, {"sku": "H", "price": "7"}, key, fetched),
+                make_item(incremental.id, {"sku": "A", "price": "10"}, key),
+                make_item(head.id, {"sku": "A", "price": "10"}, key),
+                make_item(head.id, {"sku": "G", "price": "6"}, key, refetched),
+            ]
+        )
+        await session.flush()
+
+        rows = [row async for row in stream_diff(session, incremental.id, head.id)]
+        assert rows == [
+            {"change": "removed", "sku": "H", "price": "7"},
+            {"change": "modified", "sku": "G", "price": "6", "price__before": "5"},
+        ]
+        assert await diff_counts(session, incremental.id, head.id, key_fields=["sku"]) == {
+            "added": 0, "removed": 1, "modified": 1
+        }
+    await engine.dispose()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import gzip
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Tuple
+from urllib.robotparser import RobotFileParser
+
+import pytest
+from aiohttp import web
+
+from deepscraper.crawl.discovery import SitemapDiscovery, SitemapEntry, host_aliases, iter_sitemap
+from deepscraper.crawl.frontier import Frontier
+from deepscraper.planner.schema import DiscoveryInstruction
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def _urlset(base: str, paths: list[Tuple[str, str]]) -> str:
+    entries = "".join(f"<url><loc>{base}{path}</loc><lastmod>{lastmod}</lastmod></url>" for path, lastmod in paths)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'
+
+
+@asynccontextmanager
+async def shop(hits: Counter) -> AsyncIterator[str]:
+    base = ""
+
+    async def robots(request: web.Request) -> web.Response:
+        hits["robots"] += 1
+        return web.Response(text=f"User-agent: *\nDisallow: /private/\nSitemap: {base}/sitemap_index.xml\n")
+
+    async def index(request: web.Request) -> web.Response:
+        hits["index"] += 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        body = (
+            f'<sitemapindex {NS}>'
+            f"<sitemap><loc>{base}/products.xml.gz</loc><lastmod>2026-05-01</lastmod></sitemap>"
+            f"<sitemap><loc>{base}/archive.xml</loc><lastmod>2019-01-01</lastmod></sitemap>"
+            "</sitemapindex>"
+        )
+        return web.Response(text=body, content_type="application/xml", headers={"ETag": '"v1"'})
+
+    async def products(request: web.Request) -> web.Response:
+        hits["products"] += 1
+        paths = [
+            ("/p/1", "2026-06-01T10:00:00+00:00"),
+            ("/p/2", "2025-01-01"),
+            ("/private/p/3", "2026-06-01"),
+            ("/blog/4", "2026-06-01"),
+        ]
+        return web.Response(body=gzip.compress(_urlset(base, paths).encode()), content_type="application/x-gzip")
+
+    async def archive(request: web.Request) -> web.Response:
+        hits["archive"] += 1
+        return web.Response(text=_urlset(base, [("/p/old", "2019-01-01")]), content_type="application/xml")
+
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots)
+    app.router.add_get("/sitemap_index.xml", index)
+    app.router.add_get("/products.xml.gz", products)
+    app.router.add_get("/archive.xml", archive)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"  # type: ignore[union-attr]
+    try:
+        yield base
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_discovery_follows_robots_and_filters(tmp_path: Path) -> None:
+    hits: Counter = Counter()
+    instruction = DiscoveryInstruction(include=[r"/p/"], lastmod_after=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    async with shop(hits) as base:
+        async with SitemapDiscovery(instruction, cache_dir=tmp_path) as discovery:
+            urls = [url async for url in discovery.discover(base + "/")]
+        assert urls == [f"{base}/p/1"]
+        # The stale archive sitemap is never fetched.
+        assert hits == Counter(robots=1, index=1, products=1)
+
+        async with SitemapDiscovery(instruction, cache_dir=tmp_path) as discovery:
+            frontier = Frontier()
+            assert await frontier.feed(discovery.discover(base + "/")) == 1
+        assert hits == Counter(robots=1, index=1, products=1)
+
+
+@pytest.mark.asyncio
+async def test_discovery_accepts_www_and_apex_aliases(tmp_path: Path) -> None:
+    assert host_aliases("WWW.Shop.example") == {"www.shop.example", "shop.example"}
+    robots = RobotFileParser()
+    robots.parse([])
+    async with SitemapDiscovery(DiscoveryInstruction(), cache_dir=tmp_path) as discovery:
+        hosts = host_aliases("shop.example")
+        wanted = [
+            discovery._wanted(SitemapEntry("url", url), hosts, robots)
+            for url in ("https://www.shop.example/p/1", "https://shop.example/p/2", "https://cdn.shop.example/p/3")
+        ]
+    assert wanted == [True, True, False]
+
+
+def test_iter_sitemap_reads_text_and_gzip(tmp_path: Path) -> None:
+    text = tmp_path / "sitemap.txt"
+    text.write_text("https://a.example/1\n\nhttps://a.example/2\n")
+    compressed = tmp_path / "sitemap.xml.gz"
+    compressed.write_bytes(gzip.compress(_urlset("https://a.example", [("/x", "2026-01-02T03:04Z")]).encode()))
+
+    assert [entry.loc for entry in iter_sitemap(text)] == ["https://a.example/1", "https://a.example/2"]
+    (entry,) = iter_sitemap(compressed)
+    assert entry.kind == "url" and entry.lastmod == datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc)
@@ -1,9 +1,19 @@
 from __future__ import annotations
 
+import gzip
+import json
 from pathlib import Path
+from typing import AsyncIterator
 
+import pytest
+
+from deepscraper.config import get_settings
 from deepscraper.exporters.csv_exporter import export_to_csv
+from deepscraper.exporters.excel_exporter import ExcelWriter
 from deepscraper.exporters.json_exporter import export_to_json
+from deepscraper.exporters.jsonl_exporter import export_to_jsonl
+from deepscraper.exporters.parquet_exporter import ArrowWriter, ParquetWriter, export_to_arrow, export_to_parquet
+from deepscraper.exporters.streaming import JsonArrayWriter, aexport, write_rows
 
 
 def test_export_to_csv(tmp_path: Path) -> None:
@@ -18,3 +28,93 @@ def test_export_to_json(tmp_path: Path) -> None:
     output = export_to_json(rows, filename="test.json")
     assert output.exists()
     assert "Item1" in output.read_text()
+
+
+def test_export_to_csv_grows_header_for_late_keys() -> None:
+    rows = [{"name": "Item1"}, {"name": "Item2", "price": "20"}]
+    output = export_to_csv(rows, filename="growing.csv")
+    assert output.read_text().splitlines() == ["name,price", "Item1,", "Item2,20"]
+
+
+def test_export_to_jsonl_gzip_streams_generator() -> None:
+    rows = ({"n": index} for index in range(1000))
+    output = export_to_jsonl(rows, filename="stream.jsonl", compression="gzip")
+    assert output.name == "stream.jsonl.gz"
+    with gzip.open(output, "rt", encoding="utf-8") as fh:
+        lines = fh.read().splitlines()
+    assert len(lines) == 1000
+    assert json.loads(lines[-1]) == {"n": 999}
+
+
+@pytest.mark.asyncio
+async def test_aexport_accepts_async_iterables() -> None:
+    async def rows() -> AsyncIterator[dict]:
+        for index in range(3):
+            yield {"n": index}
+
+    output = await aexport(rows(), "json", filename="async.json")
+    assert json.loads(output.read_text()) == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_failed_export_leaves_no_partial_file(tmp_path: Path) -> None:
+    def rows():  # type: ignore[no-untyped-def]
+        yield {"n": 1}
+        raise RuntimeError("source went away")
+
+    output = tmp_path / "partial.json"
+    with pytest.raises(RuntimeError, match="source went away"):
+        write_rows(JsonArrayWriter(output), rows())
+    assert not output.exists()
+
+
+def test_export_to_parquet_writes_row_groups_with_declared_types() -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    rows = ({"name": f"Item{index % 3}", "price": str(index)} for index in range(25))
+    output = export_to_parquet(rows, filename="items.parquet", declared_types={"price": "integer"}, row_group_size=10)
+
+    parquet = pq.ParquetFile(output)
+    assert parquet.metadata.num_rows == 25
+    assert parquet.metadata.num_row_groups == 3
+    assert str(parquet.schema_arrow.field("price").type) == "int64"
+    assert parquet.read().column("price").to_pylist()[-1] == 24
+
+
+def test_export_to_excel_rolls_over_to_new_sheet() -> None:
+    from openpyxl import load_workbook
+
+    rows = [{"name": f"Item{index}"} for index in range(5)] + [{"name": "Late", "price": "9"}]
+    writer = ExcelWriter(get_settings().export_dir / "rollover.xlsx", max_rows=4)
+    output = write_rows(writer, rows)
+
+    workbook = load_workbook(output, read_only=True)
+    assert workbook.sheetnames == ["Sheet1", "Sheet2"]
+    assert [row for row in workbook["Sheet2"].values][-1] == ("Late", "9")
+    assert next(workbook["Sheet2"].values) == ("name", "price")
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_export_widens_schema_for_late_columns(fmt: str) -> None:
+    pa = pytest.importorskip("pyarrow")
+    early = [{"name": f"Item{index}", "qty": index} for index in range(10)]
+    late = [{"name": "Late", "qty": 2.5, "color": "red"}, {"name": "Later", "qty": "n/a"}]
+    writer = (ParquetWriter if fmt == "parquet" else ArrowWriter)(
+        get_settings().export_dir / f"widen.{fmt}", row_group_size=10
+    )
+    output = write_rows(writer, early + late)
+
+    if fmt == "parquet":
+        table = pytest.importorskip("pyarrow.parquet").read_table(output)
+    else:
+        table = pa.ipc.open_file(str(output)).read_all()
+    assert table.column_names == ["name", "qty", "color"]
+    assert table.column("qty").to_pylist() == [str(index) for index in range(10)] + ["2.5", "n/a"]
+    assert table.column("color").to_pylist() == [None] * 10 + ["red", None]
+
+
+def test_columnar_export_rejects_bad_values_and_compression() -> None:
+    pytest.importorskip("pyarrow")
+    with pytest.raises(ValueError, match="arrow compression: gzip"):
+        export_to_arrow([{"n": 1}], filename="bad.arrow", compression="gzip")
+    with pytest.raises(ValueError, match="'price'.*'call us'"):
+        export_to_parquet([{"price": "call us"}], filename="bad.parquet", declared_types={"price": "integer"})
+    assert not (get_settings().export_dir / "bad.parquet").exists()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from deepscraper.config import Settings
+from deepscraper.utils.fingerprints import (
+    PROFILES,
+    choose_profile,
+    chrome_major,
+    context_options,
+    init_script,
+)
+from deepscraper.utils.stealth import StealthManager
+
+UA_MARKERS = {"Windows": "Windows NT", "macOS": "Macintosh", "Linux": "X11; Linux"}
+VERSION = "131.0.6778.33"
+
+
+@pytest.mark.parametrize("profile", PROFILES, ids=lambda profile: profile.name)
+def test_profiles_are_internally_consistent(profile) -> None:
+    options = context_options(profile, VERSION)
+    assert UA_MARKERS[profile.os] in options["user_agent"] and "Chrome/131.0.0.0" in options["user_agent"]
+    assert profile.viewport[0] <= profile.screen[0] and profile.viewport[1] < profile.screen[1]
+    assert profile.locale == profile.languages[0]
+    assert options["extra_http_headers"]["Accept-Language"].startswith(profile.locale)
+    assert options["extra_http_headers"]["Sec-CH-UA-Platform"] == f'"{profile.os}"'
+    assert profile.architecture == ("arm" if "Apple M" in profile.webgl_renderer else "x86")
+    # Apple GPUs only on macOS, Direct3D only on Windows.
+    assert ("Apple" in profile.webgl_renderer) == (profile.os == "macOS")
+    assert ("Direct3D" in profile.webgl_renderer) == (profile.os == "Windows")
+
+
+def test_bundle_is_built_once_per_profile_and_version() -> None:
+    profile = choose_profile("mac-chrome-de")
+    script = init_script(profile, VERSION)
+    assert init_script(profile, VERSION) is script
+    payload = json.loads(script.split("const fp = ", 1)[1].split(";\n", 1)[0])
+    assert payload["platform"] == "MacIntel" and payload["languages"] == ["de-DE", "de", "en-US", "en"]
+    assert payload["architecture"] == "arm" and payload["fullVersion"] == VERSION
+    assert {"brand": "Google Chrome", "version": VERSION} in payload["fullVersionList"]
+
+    options = context_options(profile, VERSION)
+    # The request headers announce exactly the brands navigator.userAgentData reports.
+    header = ", ".join(f'"{brand["brand"]}";v="{brand["version"]}"' for brand in payload["brands"])
+    assert options["extra_http_headers"]["Sec-CH-UA"] == header
+    assert '"Google Chrome";v="131"' in header
+    options["viewport"]["width"] = 1
+    assert context_options(profile, VERSION)["viewport"]["width"] == profile.viewport[0]
+
+
+def test_profile_selection_honours_settings() -> None:
+    assert StealthManager(enabled=False).choose_profile() is None
+    assert StealthManager(enabled=True, profile="linux-chrome-us").choose_profile().name == "linux-chrome-us"
+    with pytest.raises(ValueError):
+        StealthManager(enabled=True, profile="nokia-3310")
+    assert chrome_major(VERSION) == 131 and chrome_major(None) == 120
+    with pytest.raises(ValidationError):
+        Settings(FINGERPRINT_PROFILE="nokia-3310")
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from deepscraper.pipeline.models import Base, Project, Run
+from deepscraper.pipeline.pages import PageRecorder
+from deepscraper.runner.browser import BrowserRunner
+from deepscraper.utils.simhash import distance, fingerprint
+
+
+def test_simhash_distance_tracks_similarity() -> None:
+    base = ["title\tAcme kettle with a long marketing description of its many features"] * 5
+    similar = base[:-1] + ["title\tAcme kettle with a long marketing description of its many extras"]
+    other = ["title\tCompletely different product listing for garden furniture sets"]
+
+    assert distance(fingerprint(base), fingerprint(base)) == 0
+    assert distance(fingerprint(base), fingerprint(similar)) < distance(fingerprint(base), fingerprint(other))
+
+
+@pytest.mark.asyncio
+async def test_unchanged_region_is_detected_on_next_run() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    extracted = [{"name": "price", "values": ["9.99", "19.99"]}]
+
+    async with sessions() as session:
+        project = Project(name="shop")
+        session.add(project)
+        await session.flush()
+        runs = [Run(project_id=project.id, plan={}) for _ in range(3)]
+        session.add_all(runs)
+        await session.flush()
+
+        first = PageRecorder(session, runs[0], "shop", incremental=True)
+        page = await first.record("https://shop.example/", headers={"etag": '"v1"'})
+        assert not await first.region_unchanged(page, extracted)
+        await session.flush()
+
+        second = PageRecorder(session, runs[1], "shop", incremental=True)
+        page = await second.record("https://shop.example/")
+        assert await second.region_unchanged(page, extracted)
+        assert page.unchanged and second.unchanged == 1
+        await session.flush()
+
+        third = PageRecorder(session, runs[2], "shop", incremental=True)
+        previous = await third.previous("https://shop.example/")
+        assert previous.unchanged and previous.content_hash == page.content_hash
+        page = await third.record("https://shop.example/")
+        assert not await third.region_unchanged(page, [{"name": "price", "values": ["9.99", "17.99"]}])
+    await engine.dispose()
+
+
+class ApiResponse:
+    def __init__(self, url: str, status: int) -> None:
+        self.url = url
+        self.status = status
+        self.ok = status < 400
+        self.headers = {"content-type": "text/html", "content-encoding": "gzip", "etag": '"v2"'}
+
+    async def body(self) -> bytes:
+        return b"<html>v2</html>"
+
+    async def dispose(self) -> None:
+        pass
+
+
+class Route:
+    def __init__(self, navigation: bool) -> None:
+        self.request = SimpleNamespace(is_navigation_request=lambda: navigation)
+        self.fulfilled: Optional[Dict[str, Any]] = None
+        self.fell_back = False
+
+    async def fulfill(self, **response: Any) -> None:
+        self.fulfilled = response
+
+    async def fallback(self) -> None:
+        self.fell_back = True
+
+
+class RevalidatedPage:
+    def __init__(self, status: int) -> None:
+        self.requests: List[Dict[str, str]] = []
+        self.routes: List[Any] = []
+        self.fetches = 0
+
+        async def get(url: str, headers: Dict[str, str], timeout: int) -> ApiResponse:
+            self.requests.append(headers)
+            return ApiResponse(url.rstrip("/") + "/", status)
+
+        self.context = SimpleNamespace(request=SimpleNamespace(get=get))
+
+    async def route(self, matcher: Any, handler: Any, times: Optional[int] = None) -> None:
+        self.routes.append((matcher, handler, times))
+
+    async def unroute(self, matcher: Any, handler: Any = None) -> None:
+        self.routes = [route for route in self.routes if route[:2] != (matcher, handler)]
+
+    async def goto(self, url: str, wait_until: str, timeout: int) -> Any:
+        routed = [route for route in self.routes if route[0](url)]
+        if not routed:
+            self.fetches += 1
+            return None
+        navigation = Route(navigation=True)
+        await routed[0][1](navigation)
+        return SimpleNamespace(status=navigation.fulfilled["status"], headers=navigation.fulfilled["headers"])
+
+
+@pytest.mark.asyncio
+async def test_changed_page_is_not_downloaded_twice() -> None:
+    runner = BrowserRunner()
+    page = RevalidatedPage(status=200)
+    assert not await runner.revalidate(page, "https://shop.example", '"v1"', None)  # type: ignore[arg-type]
+    assert page.requests == [{"If-None-Match": '"v1"'}]
+    matcher, handler, times = page.routes[0]
+    assert times == 1 and matcher("https://shop.example/")
+    subresource = Route(navigation=False)
+    await handler(subresource)
+    assert subresource.fell_back
+
+    response = await runner.navigate(page, "https://shop.example/")  # type: ignore[arg-type]
+    assert page.fetches == 0 and page.routes == []
+    assert response.status == 200 and "content-encoding" not in response.headers and response.headers["etag"] == '"v2"'
+
+    unchanged = RevalidatedPage(status=304)
+    assert await runner.revalidate(unchanged, "https://shop.example/", '"v2"', None)  # type: ignore[arg-type]
+    assert unchanged.routes == []
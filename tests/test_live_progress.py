@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+from types import SimpleNamespace
+from typing import Any, List, Tuple
+
+import pytest
+
+from deepscraper.planner.compiler import CompiledStep, Op, compile_plan
+from deepscraper.planner.schema import PlanDocument, PlanStep
+from deepscraper.runner.executor import _PlanRun, _Tab
+from deepscraper.tasks.progress import PROGRESS_CHANNEL, ProgressReporter, track
+from deepscraper.web.live import ProgressHub
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.published: List[dict] = []
+
+    async def publish(self, channel: str, message: str) -> None:
+        assert channel == PROGRESS_CHANNEL
+        self.published.append(json.loads(message))
+
+    async def llen(self, key: str) -> int:
+        return 7
+
+
+class FakeServer:
+    def __init__(self) -> None:
+        self.emitted: List[Tuple[str, Any, str]] = []
+
+    async def emit(self, event: str, data: Any, room: str) -> None:
+        self.emitted.append((event, data, room))
+
+
+@pytest.mark.asyncio
+async def test_progress_is_batched_and_aggregated() -> None:
+    redis = FakeRedis()
+    track("pages")  # no reporter bound: ignored
+    async with ProgressReporter(42, redis=redis, interval=60) as reporter:
+        for _ in range(1000):
+            track("pages")
+            track("rows", 3)
+        track("captchas")
+        await reporter.flush()
+        track("pages")
+
+    assert len(redis.published) == 2
+    assert redis.published[0]["delta"] == {"pages": 1000, "rows": 3000, "captchas": 1}
+    assert redis.published[1]["status"] == "completed"
+
+    server = FakeServer()
+    hub = ProgressHub(server, redis=redis, emit_interval=60)
+    redis.published[0]["ts"] = 100.0
+    redis.published[1]["ts"] = 110.0
+    for message in redis.published:
+        hub.apply(message)
+    await hub.emit()
+    await hub.emit()
+
+    assert [(event, room) for event, _, room in server.emitted] == [("progress", "run:42"), ("overview", "runs")]
+    progress = server.emitted[0][1]
+    assert progress["pages"] == 1001 and progress["status"] == "completed"
+    assert progress["pages_per_sec"] == 0.1 and progress["captcha_rate"] == round(1 / 1001, 4)
+    assert server.emitted[1][1]["queue_depth"] == 7
+
+
+@pytest.mark.asyncio
+async def test_failed_pages_count_as_errors() -> None:
+    async def recycle_if_needed(page: Any) -> Any:
+        return page
+
+    async def navigate(page: Any, url: str, wait_until: str) -> None:
+        raise RuntimeError("net::ERR_CONNECTION_RESET")
+
+    plan = PlanDocument(
+        url="https://shop.example", goal="prices", steps=[PlanStep(action="navigate", target="https://shop.example")], fields=[]
+    )
+    runner = SimpleNamespace(recycle_if_needed=recycle_if_needed, navigate=navigate)
+    execution = _PlanRun(plan, compile_plan(plan), runner, 10, None, None, None)
+    redis = FakeRedis()
+    async with ProgressReporter(42, redis=redis, interval=60):
+        with pytest.raises(RuntimeError):
+            await execution.run(_Tab(object(), None), [(CompiledStep(Op.NAVIGATE, plan.url), 0)])
+    assert redis.published[-1]["delta"] == {"errors": 1}
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+import subprocess
+import sys
+import time
+
+import pytest
+
+from deepscraper.utils import memory
+from deepscraper.utils.memory import MemoryWatchdog
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_sample_includes_child_processes() -> None:
+    child = subprocess.Popen([sys.executable, "-c", "import time; data = bytearray(32 << 20); time.sleep(30)"])
+    try:
+        for _ in range(50):
+            usage = memory.sample()
+            if usage.children.get(child.pid, 0) > 30 << 20:
+                break
+            time.sleep(0.1)
+        assert child.pid in memory.child_pids()
+        assert usage.children[child.pid] > 30 << 20
+        assert usage.python_mb > 0 and usage.total_mb >= usage.python_mb + 30
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_watchdog_reports_tracemalloc_growth() -> None:
+    retained = []
+
+    async def _job() -> MemoryWatchdog:
+        async with MemoryWatchdog(interval=0, trace_allocations=True, run_id=1) as watchdog:
+            retained.append([object() for _ in range(20_000)])
+            growth = watchdog._tracemalloc.diff()
+        assert growth and growth[0].size_diff > 0
+        return watchdog
+
+    watchdog = asyncio.run(_job())
+    assert watchdog.peak.python_bytes > 0
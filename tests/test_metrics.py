@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from deepscraper.utils import metrics
+from deepscraper.utils.metrics import Registry
+
+
+@pytest.fixture(autouse=True)
+def _enable_metrics():
+    metrics.set_enabled(True)
+    yield
+    metrics.set_enabled(None)
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = Registry()
+    histogram = registry.histogram("wait_seconds", "Wait time", ["type"], buckets=(0.1, 1.0))
+    counter = registry.counter("errors_total", "Errors")
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, type="selector")
+    counter.inc()
+    counter.inc(2)
+
+    text = registry.render()
+    assert 'wait_seconds_bucket{type="selector",le="0.1"} 1' in text
+    assert 'wait_seconds_bucket{type="selector",le="1.0"} 2' in text
+    assert 'wait_seconds_bucket{type="selector",le="+Inf"} 3' in text
+    assert 'wait_seconds_count{type="selector"} 3' in text
+    assert "# TYPE errors_total counter" in text and "errors_total 3" in text
+
+
+def test_disabled_metrics_record_nothing() -> None:
+    registry = Registry()
+    histogram = registry.histogram("navigation_seconds", "Navigation")
+    metrics.set_enabled(False)
+    with histogram.time():
+        pass
+    histogram.observe(1.0)
+    assert registry.snapshot() == {}
+
+
+def test_job_snapshots_are_merged_by_the_worker(tmp_path: Path) -> None:
+    job, worker = Registry(), Registry()
+    for registry in (job, worker):
+        registry.histogram("flush_seconds", "Flush", buckets=(0.1,))
+        registry.counter("launches_total", "Launches")
+    job._metrics["flush_seconds"].observe(0.05)  # type: ignore[attr-defined]
+    job._metrics["launches_total"].inc()  # type: ignore[attr-defined]
+    job.dump(tmp_path)
+    job.dump(tmp_path)
+
+    assert worker.collect(tmp_path) == 2
+    assert list(tmp_path.iterdir()) == []
+    text = worker.render()
+    assert "flush_seconds_count 2" in text and "launches_total 2" in text
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pytest
+
+from deepscraper.extractor.jsonpath import compile_path, find_values
+from deepscraper.extractor.network import NetworkCapture
+
+PAYLOAD = {
+    "data": {
+        "products": [
+            {"name": "Kettle", "price": 20, "offer": {"sku": "K-1"}},
+            {"name": "Toaster", "price": 35, "offer": {"sku": "T-9"}},
+        ]
+    }
+}
+
+
+def test_jsonpath_expressions() -> None:
+    assert find_values("$.data.products[*].name", PAYLOAD) == ["Kettle", "Toaster"]
+    assert find_values("$.data.products[-1]['price']", PAYLOAD) == [35]
+    assert find_values("$..sku", PAYLOAD) == ["K-1", "T-9"]
+    assert find_values("data.products[5].name", PAYLOAD) == []
+    assert compile_path("$..sku") is compile_path("$..sku")
+    with pytest.raises(ValueError):
+        compile_path("$.data[")
+
+
+def test_capture_indexes_declared_patterns() -> None:
+    capture = NetworkCapture(["*/api/products*"])
+    assert capture.record("https://shop.example/api/products?page=1", PAYLOAD)
+    assert capture.record("https://shop.example/api/banners", {"x": 1}) is None
+
+    assert len(capture.find("*/api/products*")) == 1
+    assert capture.extract_fields([{"name": "price", "json_path": "$.data.products[*].price"}]) == [
+        {"name": "price", "values": [20, 35]}
+    ]
+
+
+def test_capture_evicts_oldest_when_full() -> None:
+    capture = NetworkCapture(["api"], max_entries=2)
+    for page in range(3):
+        capture.record(f"https://shop.example/api?page={page}", {"page": page})
+    assert [entry.json["page"] for entry in capture.find("api")] == [1, 2]
+    assert capture.size_bytes == sum(entry.size for entry in capture.find("api"))
+
+
+def test_capture_clear_starts_a_fresh_page() -> None:
+    capture = NetworkCapture(["api"])
+    capture.record("https://shop.example/api?page=1", PAYLOAD)
+    capture.clear()
+    capture.record("https://shop.example/api?page=2", {"data": {"products": [{"price": 5}]}})
+    assert capture.extract("$.data.products[*].price") == [5]
+    assert capture.size_bytes == capture.find("api")[0].size
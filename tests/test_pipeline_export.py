@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from deepscraper.pipeline.export import parse_filters, resolve_runs, stream_items
+from deepscraper.pipeline.models import Base, Item, Project, Run
+
+
+def test_parse_filters() -> None:
+    assert parse_filters(["brand=acme", "price != 10", "title~usb-c"]) == [
+        ("brand", "=", "acme"),
+        ("price", "!=", "10"),
+        ("title", "~", "usb-c"),
+    ]
+    assert parse_filters(None) == []
+    with pytest.raises(ValueError):
+        parse_filters(["brand"])
+
+
+@pytest.mark.asyncio
+async def test_stream_items_batches_across_runs_in_insertion_order() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    started = datetime(2024, 1, 1)
+
+    async with sessions() as session:
+        shop, other = Project(name="shop"), Project(name="other")
+        session.add_all([shop, other])
+        await session.flush()
+        first = Run(project_id=shop.id, plan={}, created_at=started)
+        second = Run(project_id=shop.id, plan={}, created_at=started + timedelta(hours=1))
+        foreign = Run(project_id=other.id, plan={}, created_at=started + timedelta(hours=2))
+        session.add_all([first, second, foreign])
+        await session.flush()
+        # Interleave the runs so order can only come from the item ids.
+        for index in range(25):
+            run = (first, second)[index % 2]
+            session.add(Item(run_id=run.id, data={"n": index, "brand": "acme" if index % 3 else "zeta"}))
+        session.add(Item(run_id=foreign.id, data={"n": -1, "brand": "acme"}))
+        await session.commit()
+
+        assert await resolve_runs(session, "shop", "all") == [second.id, first.id]
+        assert await resolve_runs(session, "shop", "latest") == [second.id]
+        assert await resolve_runs(session, "shop", str(first.id)) == [first.id]
+        assert await resolve_runs(session, "shop", str(foreign.id)) == []
+        with pytest.raises(ValueError):
+            await resolve_runs(session, "shop", "newest")
+
+        run_ids = await resolve_runs(session, "shop", "all")
+        streamed = [row async for row in stream_items(session, run_ids, batch_size=4)]
+        assert [row["n"] for row in streamed] == list(range(25))
+
+        filtered = [row async for row in stream_items(session, run_ids, parse_filters(["brand=zeta"]), batch_size=2)]
+        assert [row["n"] for row in filtered] == list(range(0, 25, 3))
+    await engine.dispose()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import pytest
+
+from deepscraper.planner.compiler import Op, PlanCompileError, compile_plan
+from deepscraper.planner.schema import (
+    CrawlInstruction,
+    ExtractionField,
+    NetworkCaptureInstruction,
+    PlanDocument,
+    PlanStep,
+    WaitInstruction,
+)
+
+
+def _plan(**overrides) -> PlanDocument:
+    document = {
+        "url": "https://shop.example/catalog",
+        "goal": "products",
+        "steps": [
+            PlanStep(action="navigate", target="/catalog?page=1"),
+            PlanStep(action=" Click ", target="css=button.more", wait=WaitInstruction(type="fixed", timeout_ms=250)),
+            PlanStep(action="wait", wait=WaitInstruction(type="selector_visible", selector=".card")),
+            PlanStep(action="extract", target="products"),
+        ],
+        "fields": [
+            ExtractionField(name="title", selector=" .card h2 "),
+            ExtractionField(name="link", selector=".card a", attr="href"),
+            ExtractionField(name="badge", selector="//span[@class='badge']"),
+            ExtractionField(name="price", json_path="$.items[*].price"),
+        ],
+        "network": NetworkCaptureInstruction(url_patterns=["/api/"]),
+    }
+    document.update(overrides)
+    return PlanDocument(**document)
+
+
+def test_compile_resolves_steps_waits_and_selectors() -> None:
+    program = compile_plan(_plan())
+
+    assert [step.op for step in program.steps] == [Op.NAVIGATE, Op.CLICK, Op.WAIT, Op.WAIT, Op.EXTRACT]
+    navigate, click, delay, visible, _ = program.steps
+    assert navigate.target == "https://shop.example/catalog?page=1"
+    assert click.target == "button.more"
+    assert delay.wait == {"type": "delay", "selector": None, "timeout_ms": 250}
+    assert visible.wait == {"type": "selector", "selector": ".card", "timeout_ms": 5000}
+    assert program.seeds == ("https://shop.example/catalog?page=1",)
+    assert Op.NAVIGATE not in {step.op for step in program.page_steps}
+
+    extraction = program.extraction
+    assert extraction.names == ("title", "link", "badge", "price")
+    assert [field["name"] for field in extraction.network_fields] == ["price"]
+    assert extraction.script_names == ("title", "link")
+    assert '[[".card h2", null], [".card a", "href"]]' in extraction.dom_script
+    assert [field["selector"] for field in extraction.engine_fields] == ["xpath=//span[@class='badge']"]
+
+
+def test_compiled_plans_are_cached_by_content() -> None:
+    assert compile_plan(_plan()) is compile_plan(_plan())
+    assert compile_plan(_plan(goal="other")) is not compile_plan(_plan())
+
+
+def test_compile_reports_every_problem() -> None:
+    plan = _plan(
+        steps=[
+            PlanStep(action="scroll"),
+            PlanStep(action="click"),
+            PlanStep(action="fill", target="#q"),
+            PlanStep(action="wait", wait=WaitInstruction(type="selector_visible")),
+        ],
+        fields=[ExtractionField(name="a", selector="h1"), ExtractionField(name="a", selector="h2")],
+        network=None,
+        crawl=CrawlInstruction(link_selectors=["a"], include=["("]),
+    )
+    with pytest.raises(PlanCompileError) as excinfo:
+        compile_plan(plan)
+    problems = excinfo.value.problems
+    assert len(problems) == 6
+    assert problems[0].startswith("step 0: unknown action 'scroll'")
+    assert isinstance(excinfo.value, ValueError)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from deepscraper.utils.profiling import RunProfiler, flamegraph_svg, top_frames
+
+
+def _spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _fetcher() -> None:
+    for _ in range(3):
+        _spin(0.01)
+        await asyncio.sleep(0.03)
+
+
+async def _run() -> str:
+    await asyncio.gather(_fetcher(), _fetcher())
+    return "done"
+
+
+def test_run_profiler_splits_compute_and_await(tmp_path: Path) -> None:
+    profiler = RunProfiler(interval=0.001)
+
+    assert asyncio.run(profiler.run(_run())) == "done"
+    paths = profiler.write(tmp_path, "demo.profile")
+
+    assert [path.name for path in paths] == ["demo.profile.collapsed", "demo.profile.svg", "demo.profile.tasks.json"]
+    summary = json.loads(paths[2].read_text())
+    fetcher = next(row for row in summary["tasks"] if row["name"] == "_fetcher")
+    assert fetcher["tasks"] == 2
+    assert fetcher["compute_seconds"] >= 0.05
+    assert fetcher["await_seconds"] >= 0.08
+    assert any("test_profiling:_spin" in line for line in paths[0].read_text().splitlines())
+
+
+def test_flamegraph_and_top_frames_from_collapsed_stacks() -> None:
+    samples = {"main;parse;select": 6, "main;parse;validate": 3, "main;flush": 1}
+
+    svg = flamegraph_svg(samples, "run 1")
+    assert svg.startswith("<svg") and "parse (9 samples, 90.0%)" in svg
+    assert top_frames(samples, 2) == [("select", 6), ("validate", 3)]
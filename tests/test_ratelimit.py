@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from deepscraper.utils.ratelimit import FETCH, MemoryRateLimiter, RatePolicy, RateState, RedisRateLimiter
+
+POLICY = RatePolicy(initial=2.0, min_rate=0.5, max_rate=4.0, increase=1.0, decrease=0.5, burst=1.0, cooldown=5.0)
+
+
+def test_additive_increase_and_multiplicative_decrease() -> None:
+    state = RateState.initial(POLICY, now=0.0)
+
+    assert state.observe(POLICY, 1.0, status=200, latency=0.1) is None
+    assert state.rate == 2.5
+    for second in range(2, 10):
+        state.observe(POLICY, float(second), status=200, latency=0.1)
+    assert state.rate == POLICY.max_rate
+
+    assert state.observe(POLICY, 10.0, status=429, retry_after=3.0) == "429"
+    assert state.rate == 2.0 and state.blocked_until == 13.0
+    # A burst of throttled responses only counts once per cooldown.
+    assert state.observe(POLICY, 11.0, captcha=True) is None
+    assert state.rate == 2.0
+    assert state.observe(POLICY, 16.0, error=True) == "error"
+    assert state.rate == 1.0
+
+
+def test_latency_inflation_cuts_rate() -> None:
+    state = RateState.initial(POLICY, now=0.0)
+    for second in range(5):
+        state.observe(POLICY, float(second), status=200, latency=0.1)
+    rate = state.rate
+
+    reasons = [state.observe(POLICY, 5.0 + step, status=200, latency=2.0) for step in range(5)]
+    assert "latency" in reasons
+    assert state.rate < rate
+
+
+def test_latency_baselines_are_kept_per_kind() -> None:
+    state = RateState.initial(POLICY, now=0.0)
+    # Quick API calls interleaved with full page loads twenty times slower.
+    reasons = [
+        state.observe(POLICY, float(step), status=200, latency=0.05 if step % 2 else 1.0, kind=FETCH if step % 2 else "load")
+        for step in range(40)
+    ]
+    assert reasons == [None] * 40
+    assert state.baseline == {"load": 1.0, FETCH: 0.05}
+
+    assert "latency" in [state.observe(POLICY, 40.0 + step, status=200, latency=0.5) for step in range(10)]
+    restored = RateState.from_redis({key.encode(): value.encode() for key, value in state.to_redis().items()}, POLICY, 0.0)
+    assert restored == state
+
+
+def test_reservations_queue_callers_behind_each_other() -> None:
+    state = RateState.initial(POLICY, now=0.0)
+    waits = [state.reserve(POLICY, 0.0) for _ in range(3)]
+    assert waits == [0.0, 0.5, 1.0]
+
+
+def test_redis_limiter_falls_back_to_memory_when_unreachable() -> None:
+    async def _run() -> None:
+        limiter = RedisRateLimiter(Redis.from_url("redis://127.0.0.1:1/0", socket_connect_timeout=0.2), POLICY)
+        assert await limiter.acquire("https://shop.example/a") == 0.0
+        assert await limiter.feedback("https://shop.example/b", status=503) == 1.0
+        assert isinstance(limiter._fallback, MemoryRateLimiter)
+        assert (await limiter.rates())["shop.example"]["rate"] == 1.0
+        await limiter.aclose()
+
+    asyncio.run(_run())
+
+
+class FlakyRedis:
+    """Just enough of a Redis client for the limiter, failing while ``down``."""
+
+    def __init__(self) -> None:
+        self.down = True
+        self.hashes: Dict[str, Dict[bytes, bytes]] = {}
+
+    def pipeline(self, transaction: bool = True) -> "FlakyRedis":
+        return self
+
+    async def __aenter__(self) -> "FlakyRedis":
+        if self.down:
+            raise RedisConnectionError("connection refused")
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        pass
+
+    async def watch(self, key: str) -> None:
+        self._key = key
+
+    async def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        return dict(self.hashes.get(key, {}))
+
+    def multi(self) -> None:
+        pass
+
+    def hset(self, key: str, mapping: Dict[str, str]) -> None:
+        self.hashes[key] = {name.encode(): value.encode() for name, value in mapping.items()}
+
+    def expire(self, key: str, seconds: int) -> None:
+        pass
+
+    async def execute(self) -> None:
+        pass
+
+
+def test_redis_limiter_returns_to_redis_after_the_cooldown() -> None:
+    async def _run() -> None:
+        redis = FlakyRedis()
+        limiter = RedisRateLimiter(redis, POLICY)
+        await limiter.feedback("https://shop.example/a", status=503)
+        assert limiter._fallback is not None and not redis.hashes
+
+        redis.down = False
+        await limiter.feedback("https://shop.example/b", status=200)
+        assert limiter._fallback is not None and not redis.hashes  # still cooling down
+
+        limiter._retry_at = 0.0
+        await limiter.feedback("https://shop.example/c", status=200)
+        assert limiter._fallback is None and "deepscraper:rate:shop.example" in redis.hashes
+
+    asyncio.run(_run())
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from deepscraper.pipeline.models import Base, Page, Project, Run, SnapshotBlob
+from deepscraper.pipeline.pages import PageRecorder
+from deepscraper.utils.snapshots import FilesystemSnapshotStore, SnapshotStore
+
+
+@pytest.mark.asyncio
+async def test_identical_pages_are_stored_once(tmp_path: Path) -> None:
+    store = FilesystemSnapshotStore(tmp_path)
+    html = "<html><body>" + "<li>item</li>" * 200 + "</body></html>"
+
+    first = await store.store("shop", html)
+    second = await FilesystemSnapshotStore(tmp_path).store("shop", html)
+
+    assert first.created and not second.created
+    assert first.sha256 == second.sha256
+    assert first.stored_size < first.size
+    assert len(list(tmp_path.rglob("blobs/*/*"))) == 1
+    assert await store.load(first.key) == html
+
+
+@pytest.mark.asyncio
+async def test_project_dictionary_is_used_and_resolved_on_load(tmp_path: Path) -> None:
+    pytest.importorskip("zstandard")
+    store = FilesystemSnapshotStore(tmp_path)
+    samples = [f"<html><head><title>Product {n}</title></head><body class='catalog'>{n}</body></html>" for n in range(200)]
+    await store.train_dictionary("shop", samples, size=4096)
+
+    ref = await store.store("shop", samples[0].replace("Product 0", "Product 9999"))
+    assert ref.codec == "zstd+dict"
+    assert await FilesystemSnapshotStore(tmp_path).load(ref.key) == samples[0].replace("Product 0", "Product 9999")
+
+
+@pytest.mark.asyncio
+async def test_store_trains_a_project_dictionary_after_enough_pages(tmp_path: Path) -> None:
+    pytest.importorskip("zstandard")
+    store = FilesystemSnapshotStore(tmp_path, dict_samples=100)
+    pages = [f"<html><head><title>Product {n}</title></head><body class='catalog'>{n * 7}</body></html>" for n in range(101)]
+    codecs = [(await store.store("shop", html)).codec for html in pages]
+    assert set(codecs[:100]) == {"zstd"} and codecs[100] == "zstd+dict"
+
+
+class DeferredStore(SnapshotStore):
+    """Uploads in the background until released; the blob for ``fail`` never makes it."""
+
+    def __init__(self, fail: str) -> None:
+        super().__init__()
+        self.fail = fail
+        self.release = asyncio.Event()
+        self.blobs: Dict[str, bytes] = {}
+        self.uploads: Dict[str, "asyncio.Task[None]"] = {}
+
+    async def put_blob(self, key: str, data: bytes) -> None:
+        self.uploads[key] = asyncio.create_task(self._upload(key, data))
+
+    async def _upload(self, key: str, data: bytes) -> None:
+        await self.release.wait()
+        if self.fail in key:
+            raise OSError("upload failed")
+        self.blobs[key] = data
+
+    def pending_upload(self, key: str) -> Optional["asyncio.Task[None]"]:
+        task = self.uploads.get(key)
+        return task if task is not None and not task.done() else None
+
+    async def get_blob(self, key: str) -> Optional[bytes]:
+        return self.blobs.get(key)
+
+    async def exists(self, key: str) -> bool:
+        return key in self.blobs
+
+
+@pytest.mark.asyncio
+async def test_pages_reference_snapshots_only_after_upload() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    good, bad = "<html>kept</html>", "<html>lost</html>"
+    store = DeferredStore(fail=hashlib.sha256(bad.encode()).hexdigest())
+
+    async with sessions() as session:
+        project = Project(name="shop")
+        session.add(project)
+        await session.flush()
+        run = Run(project_id=project.id, plan={})
+        session.add(run)
+        await session.flush()
+        recorder = PageRecorder(session, run, "shop", store)
+        first = await recorder.record("https://shop.example/a", good)
+        again = await recorder.record("https://shop.example/b", good)
+        lost = await recorder.record("https://shop.example/c", bad)
+        await session.commit()
+        assert first.snapshot_sha256 is None and (await session.scalars(select(SnapshotBlob))).all() == []
+
+        store.release.set()
+        await recorder.close()
+        await session.commit()
+
+        assert first.snapshot_sha256 == again.snapshot_sha256 and first.snapshot_path in store.blobs
+        assert lost.snapshot_sha256 is None and recorder.detached == 1
+        blobs = (await session.scalars(select(SnapshotBlob.sha256))).all()
+        assert blobs == [first.snapshot_sha256]
+        # Recording the same blob again, as a second worker would, is not an error.
+        other = PageRecorder(session, run, "shop", store)
+        await other.record("https://shop.example/d", good)
+        await other.close()
+        await session.commit()
+        assert len((await session.scalars(select(Page))).all()) == 4
+    await engine.dispose()
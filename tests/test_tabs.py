@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+from deepscraper.crawl.frontier import Frontier
+from deepscraper.runner.tabs import TabPool
+
+
+class FakeRunner:
+    def __init__(self, recycle_after: int = 0) -> None:
+        self.tabs = 0
+        self.navigations = 0
+        self.recycles: List[int] = []
+        self.recycle_after = recycle_after
+        self.connected = True
+
+    async def new_tab(self) -> str:
+        self.tabs += 1
+        return f"tab-{self.tabs}"
+
+    async def recycle_reason(self) -> Optional[str]:
+        return "pages" if self.recycle_after and self.navigations >= self.recycle_after else None
+
+    async def recycle(self, reason: str) -> str:
+        self.recycles.append(self.navigations)
+        self.navigations = 0
+        return "fresh"
+
+
+def test_pool_pipelines_visits_and_follows_links() -> None:
+    runner = FakeRunner(recycle_after=4)
+    frontier = Frontier()
+    frontier.add("https://shop.example/list")
+    active = peak = 0
+    in_flight_at_recycle: List[int] = []
+    seen_pages = set()
+
+    async def visit(tab: dict, url: str, depth: int) -> bool:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        seen_pages.add(tab["page"])
+        runner.navigations += 1
+        await asyncio.sleep(0.01)
+        if depth == 0:
+            frontier.extend((f"https://shop.example/p/{index}" for index in range(10)), depth + 1)
+        active -= 1
+        return False
+
+    async def _recycle(reason: str) -> str:
+        in_flight_at_recycle.append(active)
+        return await FakeRunner.recycle(runner, reason)
+
+    runner.recycle = _recycle  # type: ignore[method-assign]
+    pool = TabPool(runner, max_tabs=3, interval=0)  # type: ignore[arg-type]
+    asyncio.run(pool.run("first", frontier, lambda page: {"page": page}, visit))  # type: ignore[arg-type]
+
+    assert pool.visits == 11 and not frontier
+    assert peak == 3
+    assert runner.recycles and in_flight_at_recycle == [0] * len(runner.recycles)
+    assert {"first", "fresh"} <= seen_pages
+
+
+def test_pool_stops_when_visit_asks_to() -> None:
+    frontier = Frontier()
+    frontier.extend(f"https://shop.example/p/{index}" for index in range(20))
+
+    async def visit(tab: str, url: str, depth: int) -> bool:
+        await asyncio.sleep(0)
+        return True
+
+    pool = TabPool(FakeRunner(), max_tabs=2, interval=0)  # type: ignore[arg-type]
+    asyncio.run(pool.run("first", frontier, lambda page: page, visit))  # type: ignore[arg-type]
+    assert pool.visits <= 2 and len(frontier) >= 18
+
+
+def test_pool_survives_failed_visits_until_the_browser_is_gone() -> None:
+    runner = FakeRunner()
+    frontier = Frontier()
+    frontier.extend(f"https://shop.example/p/{index}" for index in range(6))
+
+    async def visit(tab: str, url: str, depth: int) -> bool:
+        await asyncio.sleep(0)
+        if url.endswith(("/1", "/4")):
+            raise ValueError(f"broken page {url}")
+        return False
+
+    pool = TabPool(runner, max_tabs=2, interval=0)  # type: ignore[arg-type]
+    asyncio.run(pool.run("first", frontier, lambda page: page, visit))  # type: ignore[arg-type]
+    assert pool.visits == 6 and pool.failures == 2 and not frontier
+    frontier.close()
+
+    runner.connected = False
+    frontier = Frontier()
+    frontier.extend(f"https://shop.example/p/{index}" for index in range(6))
+    with pytest.raises(ValueError):
+        asyncio.run(TabPool(runner, max_tabs=2, interval=0).run("first", frontier, lambda page: page, visit))  # type: ignore[arg-type]
+    frontier.close()
+
+
+def test_cpu_backpressure_sheds_and_restores_tabs() -> None:
+    pool = TabPool(FakeRunner(), max_tabs=4, cpu_high=0.8, cpu_low=0.5, interval=0)  # type: ignore[arg-type]
+    assert [pool.adjust(0.95), pool.adjust(0.9), pool.adjust(0.7), pool.adjust(None)] == [3, 2, 2, 2]
+    for _ in range(5):
+        pool.adjust(0.95)
+    assert pool.limit == 1
+    assert [pool.adjust(0.2) for _ in range(4)] == [2, 3, 4, 4]
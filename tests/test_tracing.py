@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import List
+
+from deepscraper.utils import tracing
+from deepscraper.utils.tracing import (
+    FileExporter,
+    Span,
+    SpanExporter,
+    critical_path,
+    extract,
+    inject,
+    load_spans,
+    span,
+    spans_for_run,
+    summarize,
+)
+
+
+class MemoryExporter(SpanExporter):
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+def test_spans_nest_and_propagate_through_carrier() -> None:
+    exporter = MemoryExporter()
+    tracing.set_exporter(exporter)
+    try:
+        with span("api.submit_run", run_id=7) as root:
+            with span("queue.enqueue"):
+                carrier = inject({})
+        with span("job.run", parent=extract(carrier)):
+            pass
+    finally:
+        tracing.set_exporter(None)
+
+    enqueue, submit, job = exporter.spans
+    assert enqueue.parent_id == root.span_id
+    assert job.trace_id == root.trace_id and job.parent_id == enqueue.span_id
+    assert extract({"traceparent": "garbage"}) is None
+    with span("disabled") as noop:
+        noop.set_attribute("ignored", True)
+
+
+def _span(name: str, span_id: str, parent: str | None, start: float, end: float, **attributes) -> Span:
+    return Span(name, "t" * 32, span_id, parent, int(start * 1e9), int(end * 1e9), attributes=attributes)
+
+
+def test_critical_path_summary(tmp_path: Path) -> None:
+    path = tmp_path / "spans.jsonl"
+    exporter = FileExporter(path)
+    for item in [
+        _span("job.run", "a", None, 0, 10, run_id=3),
+        _span("browser.launch", "b", "a", 0, 2),
+        _span("browser.navigate", "c", "a", 2, 7),
+        _span("browser.captcha", "d", "c", 3, 6),
+        _span("db.commit", "e", "a", 8, 9),
+        _span("browser.extract", "f", "a", 7.5, 8.5),
+    ]:
+        exporter.export(item)
+    exporter.shutdown()
+
+    spans = spans_for_run(load_spans(path), 3)
+    summary = {name: round(seconds, 3) for name, seconds, _ in summarize(critical_path(spans))}
+    assert summary == {
+        "browser.captcha": 3.0,
+        "browser.launch": 2.0,
+        "browser.navigate": 2.0,
+        "job.run": 1.5,
+        "db.commit": 1.0,
+        "browser.extract": 0.5,
+    }
+    assert sum(summary.values()) == 10.0
+    assert spans_for_run(spans, 4) == []
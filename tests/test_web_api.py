@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import AsyncContextManager, AsyncIterator, Callable, Tuple
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from deepscraper.config import get_settings
+from deepscraper.pipeline.diff import make_item
+from deepscraper.pipeline.models import Base, Run
+from deepscraper.web import api
+
+
+async def _isolated_db(monkeypatch: pytest.MonkeyPatch) -> Tuple[AsyncEngine, Callable[[], AsyncContextManager[AsyncSession]]]:
+    """Point the API at a private in-memory database instead of ``POSTGRES_DSN``."""
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def scope() -> AsyncIterator[AsyncSession]:
+        async with factory() as session, session.begin():
+            yield session
+
+    monkeypatch.setattr(api, "session_scope", scope)
+    return engine, scope
+
+
+@pytest.mark.asyncio
+async def test_submit_run_and_page_through_items(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine, session_scope = await _isolated_db(monkeypatch)
+    submitted = []
+    monkeypatch.setattr(api, "enqueue", lambda job, *args, **kwargs: submitted.append(args) or SimpleNamespace(id="job-1"))
+    transport = httpx.ASGITransport(app=api.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/runs", json={"project": "api-shop", "url": "https://shop.example", "goal": "prices"})
+        assert response.status_code == 202
+        run_id = response.json()["id"]
+        assert submitted == [(run_id, 100)]
+        assert (await client.post("/runs", json={"project": "api-shop"})).status_code == 422
+
+        async with session_scope() as session:
+            session.add_all(make_item(run_id, {"sku": str(n)}) for n in range(5))
+            (await session.get(Run, run_id)).status = "completed"
+
+        first = (await client.get(f"/runs/{run_id}/items", params={"limit": 3})).json()
+        assert [item["sku"] for item in first["items"]] == ["0", "1", "2"]
+        rest = (await client.get(f"/runs/{run_id}/items", params={"cursor": first["next_cursor"], "limit": 3})).json()
+        assert [item["sku"] for item in rest["items"]] == ["3", "4"] and rest["next_cursor"] is None
+
+        summary = (await client.get(f"/runs/{run_id}")).json()
+        assert summary["status"] == "completed" and summary["items"] == 5
+
+        stream = await client.get(f"/runs/{run_id}/stream", params={"cursor": first["next_cursor"]})
+        assert [json.loads(line)["sku"] for line in stream.text.splitlines()] == ["3", "4"]
+
+        sse = await client.get(f"/runs/{run_id}/stream", params={"format": "sse"}, headers={"Last-Event-ID": str(first["next_cursor"])})
+        assert sse.text.count("data: {\"sku\"") == 2 and "event: end" in sse.text
+        assert (await client.get("/runs/999999")).status_code == 404
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_stream_of_a_stalled_run_ends_after_the_idle_timeout(monkeypatch: pytest.MonkeyPatch) -> None:
+    engine, session_scope = await _isolated_db(monkeypatch)
+    monkeypatch.setattr(api, "enqueue", lambda job, *args, **kwargs: SimpleNamespace(id="job-1"))
+    monkeypatch.setattr(api, "STREAM_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(get_settings(), "stream_idle_timeout", 0.05)
+    transport = httpx.ASGITransport(app=api.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        run_id = (await client.post("/runs", json={"project": "api-shop", "url": "https://shop.example", "goal": "prices"})).json()["id"]
+        async with session_scope() as session:
+            session.add(make_item(run_id, {"sku": "0"}))
+
+        sse = await client.get(f"/runs/{run_id}/stream", params={"format": "sse"})
+        assert sse.text.count("data: {\"sku\"") == 1
+        assert 'event: end\ndata: {"status": "queued"}' in sse.text
+    await engine.dispose()